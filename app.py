@@ -2,21 +2,44 @@
 
 import math
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import json
-import random
 import datetime
 import os
 import pandas as pd
-import matplotlib.pyplot as plt
 from datetime import datetime, date
-import time
+from contextlib import contextmanager
+import numpy as np
+
+from mealplan import (MEAL_SLOTS, PROFILE_MACROS, SLOT_DISTRIB, CompactPlan, LiveCatalog,
+                      PlanCache, PlanShopping, PlanTotals, StageProfiler, bars_svg,
+                      default_seed, deferred_html, donut_svg, foods_for_slot, new_seed,
+                      pie_svg, plan_key, plan_targets, scale_macros, slot_targets, trend_svg,
+                      workers_from_env)
 
 # ---------- Small helper for animated feedback ----------
 
 
-def show_loading(msg="Processing...", wait=1.5):
-    with st.spinner(msg):
-        time.sleep(wait)
+@contextmanager
+def show_progress(msg="Processing..."):
+    """Progress bar for a generator call; yields its progress callback.
+
+    The callback takes ``(done, total, best)`` — meals finished, meals in
+    total and the best meal score so far — as reported by the generators.
+    """
+    bar = st.progress(0.0, text=msg)
+
+    def report(done, total, best):
+        text = f"{msg} {done}/{total} meals"
+        if math.isfinite(best):
+            text += f" • best score {best:.1f}"
+        bar.progress(min(1.0, done / total) if total else 1.0, text=text)
+
+    try:
+        yield report
+    finally:
+        # i kad generisanje pukne, traka ne ostaje na strani
+        bar.empty()
     st.toast("✅ Done!")
 
 
@@ -24,6 +47,15 @@ def show_loading(msg="Processing...", wait=1.5):
 st.set_page_config(page_title="Meal Plan Generator",
                    page_icon="🥗", layout="wide")
 
+# ?profile=1 (ili MEALPLAN_PROFILE=1) meri faze ovog run-a; "cprofile",
+# "memory" ili "all" dodaju cProfile / tracemalloc snimak. Oba važe za ceo
+# proces (sve sesije), pa snimci rade samo iz MEALPLAN_PROFILE, ne iz URL-a
+if st.query_params.get("profile"):
+    PROFILER = StageProfiler.from_option(st.query_params.get("profile"), snapshots=False)
+else:
+    PROFILER = StageProfiler.from_option(os.environ.get("MEALPLAN_PROFILE"))
+PROFILER.start()
+
 # --- Session defaults (pre SVIH widgeta) ---
 DEFAULTS = {
     "days": 7,
@@ -42,28 +74,15 @@ if isinstance(_pending, dict):
     for k, v in _pending.items():
         st.session_state[k] = v
 
-# ---- Meal slots & labels (single source of truth) ----
-MEAL_SLOTS = ["breakfast", "lunch", "snack", "dinner"]
+# ---- Meal slots & labels (MEAL_SLOTS, raspodela i rasponi su u mealplan.planner) ----
 SLOT_LABELS = {
     "EN": {"breakfast": "Breakfast", "lunch": "Lunch", "snack": "Snack", "dinner": "Dinner"},
     "SR": {"breakfast": "Doručak", "lunch": "Ručak", "snack": "Užina", "dinner": "Večera"},
 }
-# raspodela dnevnih kcal (možeš menjati)
-SLOT_DISTRIB = {"breakfast": 0.25,
-                "lunch": 0.35, "snack": 0.10, "dinner": 0.30}
-
-# cilj kcal po obroku (meki rasponi — kao guardrails)
-SLOT_KCAL_RANGE = {
-    "breakfast": (300, 600),
-    "lunch":     (500, 850),
-    "snack":     (120, 300),
-    "dinner":    (500, 800),
-}
 
-# grupe koje važe kao "protein baza" za slane obroke
-# prepared često sadrži proteine (npr. “wrap”, “bolognese”)
-PROTEIN_GROUPS = {"meat", "fish", "plant_protein",
-                  "legumes", "eggs", "prepared"}
+# keš generisanih planova, zajednički za sve sesije na serveru
+PLAN_CACHE_SIZE = 256
+PLAN_CACHE_TTL = 60 * 60  # sekundi
 
 # ---------- i18n ----------
 if "LANG" not in st.session_state:
@@ -93,6 +112,7 @@ labels = {
         "bulk": "Bulk (+15% kcal, higher carbs)",
         "plan_header": "Plan — {days} days at {kcal} kcal/day (effective: {eff_kcal})",
         "download": "⬇️ Download as HTML",
+        "refresh": "🔄 Refresh",
         "tip": "Tip: Send the downloaded HTML via WhatsApp/Email, or host it on Netlify/GitHub Pages to share as a link.",
         "macros_error": "Protein % + Carbs % must be ≤ 100.",
         "about_header": "About this app",
@@ -107,6 +127,7 @@ labels = {
         "lock": "Lock",
         "regenerate": "Regenerate",
         "shopping_list": "🛒 Shopping list",
+        "show_shopping_table": "Show table",
         "download_shopping": "Download shopping list (CSV)",
         "locked_warn": "Meal is locked.",
         "no_items_yet": "No items yet — generate a plan first.",
@@ -122,12 +143,18 @@ labels = {
         "invalid_file": "Invalid file format (expected JSON object).",
         "failed_to_import": "Failed to import",
         "filters_strict": "Filters are too strict; re-adding all foods temporarily.",
+        "catalog_reloaded": "Food catalog updated; removed from your plan (no longer in it):",
+        "catalog_error": "Food catalog change not loaded, still using the previous one",
         "totals_header": "Totals for the whole plan",
         "daily_summary": "Daily summary",
         "print_pdf": "🖨️ Print / Save as PDF",
         "calc_estimator": "📊 Calories Estimator",
         "enter_preset_name": "Enter a preset name",
-        "show_macro_charts": "Show macro charts"
+        "show_macro_charts": "Show macro charts",
+        "engine": "Generator engine",
+        "engine_random": "Random search",
+        "engine_exact": "Exact (best match)",
+        "plan_seed": "Plan seed (add ?seed=… to the URL to get this plan again)"
     },
     "SR": {
         "title": "Generator jelovnika",
@@ -152,6 +179,7 @@ labels = {
         "bulk": "Suficit (+15% kcal, više UH)",
         "plan_header": "Plan — {days} dana @ {kcal} kcal/dan (efektivno: {eff_kcal})",
         "download": "⬇️ Preuzmi kao HTML",
+        "refresh": "🔄 Osveži",
         "tip": "Savjet: Pošalji HTML preko WhatsApp/E-mail ili hostuj na Netlify/GitHub Pages kao link.",
         "macros_error": "Zbir Proteini% + UH% mora biti ≤ 100.",
         "about_header": "O aplikaciji",
@@ -166,6 +194,7 @@ labels = {
         "lock": "Zaključaj",
         "regenerate": "Ponovo generiši",
         "shopping_list": "🛒 Lista za kupovinu",
+        "show_shopping_table": "Prikaži tabelu",
         "download_shopping": "Preuzmi listu za kupovinu (CSV)",
         "locked_warn": "Obrok je zaključan.",
         "no_items_yet": "Nema stavki — prvo generiši plan.",
@@ -181,12 +210,18 @@ labels = {
         "invalid_file": "Neispravan format fajla (očekivan je JSON objekat).",
         "failed_to_import": "Neuspješan uvoz",
         "filters_strict": "Filteri su previše striktni; privremeno vraćam sve namirnice.",
+        "catalog_reloaded": "Katalog namirnica je ažuriran; iz plana su uklonjene (više ih nema):",
+        "catalog_error": "Izmena kataloga nije učitana, koristi se prethodni",
         "totals_header": "Ukupno za ceo plan",
         "daily_summary": "Dnevni rezime",
         "print_pdf": "🖨️ Štampaj / Sačuvaj kao PDF",
         "calc_estimator": "📊 Procena kalorija",
         "enter_preset_name": "Unesite naziv preseta",
-        "show_macro_charts": "Prikaži makro grafikone"
+        "show_macro_charts": "Prikaži makro grafikone",
+        "engine": "Način generisanja",
+        "engine_random": "Nasumična pretraga",
+        "engine_exact": "Egzaktno (najbolje poklapanje)",
+        "plan_seed": "Seed plana (dodaj ?seed=… u URL da dobiješ isti plan)"
     },
 }
 def L(key): return labels[st.session_state.get("LANG", "EN")][key]
@@ -313,48 +348,27 @@ def pro_banner(title: str, subtitle: str):
 # call the function to inject the theme
 inject_pro_theme()
 
-# ---------- SAFE accessors for old/new item formats ----------
-
-
-def _kcal_of(x):
-    m = x.get("macros")
-    if isinstance(m, dict):
-        return float(m.get("kcal", x.get("kcal", 0)) or 0)
-    return float(x.get("kcal", 0) or 0)
-
-
-def _p_of(x):
-    m = x.get("macros")
-    if isinstance(m, dict):
-        return float(m.get("p", x.get("p", x.get("protein", 0))) or 0)
-    return float(x.get("p", x.get("protein", 0)) or 0)
-
-
-def _c_of(x):
-    m = x.get("macros")
-    if isinstance(m, dict):
-        return float(m.get("c", x.get("c", x.get("carbs", 0))) or 0)
-    return float(x.get("c", x.get("carbs", 0)) or 0)
-
-
-def _f_of(x):
-    m = x.get("macros")
-    if isinstance(m, dict):
-        return float(m.get("f", x.get("f", x.get("fat", 0))) or 0)
-    return float(x.get("f", x.get("fat", 0)) or 0)
-
 # ---------- Data IO ----------
 
 
-@st.cache_data(show_spinner=False)
-def load_foods(path):
-    with open(path, "r") as f:
-        return json.load(f)
+@st.cache_resource(show_spinner=False)
+def live_catalog(path):
+    # jedan deljeni (read-only) katalog + indeksi po fajlu; izmena fajla se
+    # učita u pozadini i zameni bez restarta (LiveCatalog);
+    # broj worker procesa: MEALPLAN_WORKERS (0 = u istom procesu)
+    return LiveCatalog(path, workers=workers_from_env())
 
 
 foods_path = os.path.join("data", "foods.json")
 try:
-    foods = load_foods(foods_path)
+    with PROFILER.stage("load foods"):
+        LIVE = live_catalog(foods_path)
+        # planer ovog rerun-a: ostaje isti do kraja, i ako se katalog zameni usput
+        PLANNER = LIVE.check()
+    FOOD_TABLE = PLANNER.table
+    FOOD_FILTERS = PLANNER.filters
+    # deljena lista iz tabele (cache_data bi vraćao novu kopiju na svaki rerun)
+    foods = FOOD_TABLE.foods
 except FileNotFoundError:
     st.error(
         f"❌ Missing foods file: `{foods_path}`. Create it or place your foods.json there.")
@@ -362,185 +376,31 @@ except FileNotFoundError:
 except json.JSONDecodeError:
     st.error(f"❌ Invalid JSON in `{foods_path}`. Please fix formatting.")
     st.stop()
+if LIVE.error:
+    st.warning(f"{L('catalog_error')}: {LIVE.error}")
 
-# ---------- Core helpers ----------
-
-
-def filter_by_diet(foods, diet):
-    if diet == "omnivore":
-        return foods
-    if diet == "vegetarian":
-        return [x for x in foods if "vegan" in x.get("tags", []) or "vegetarian" in x.get("tags", []) or x["group"] in ["grains", "fruit", "vegetables", "nuts", "legumes", "fat"]]
-    if diet == "vegan":
-        return [x for x in foods if "vegan" in x.get("tags", []) or x["group"] in ["grains", "fruit", "vegetables", "nuts", "legumes", "fat"]]
-    if diet == "gluten-free":
-        return [x for x in foods if "gluten-free" in x.get("tags", []) or x["group"] in ["protein", "fruit", "vegetables", "nuts", "legumes", "fat", "dairy"]]
-    return foods
-
-
-def macro_targets(total_kcal, protein_pct, carbs_pct, fat_pct):
-    protein_kcal = total_kcal * protein_pct
-    carbs_kcal = total_kcal * carbs_pct
-    fat_kcal = total_kcal * fat_pct
-
-    protein_g = protein_kcal / 4.0
-    carbs_g = carbs_kcal / 4.0
-    fat_g = fat_kcal / 9.0
-
-    targets = {
-        "kcal": float(total_kcal),
-        "p": protein_g,
-        "c": carbs_g,
-        "f": fat_g,
-        "protein_g": protein_g,
-        "carbs_g": carbs_g,
-        "fat_g": fat_g,
-    }
-    # cache a copy for downstream lookups that expect a nested "target" mapping
-    targets["target"] = {k: targets[k] for k in ("kcal", "p", "c", "f")}
-    return targets
-
-
-def score_meal(meal, targets):
-    # Sum macros safely (supports old and new formats)
-    kcal = sum(_kcal_of(i) for i in meal)
-    p = sum(_p_of(i) for i in meal)
-    c = sum(_c_of(i) for i in meal)
-    f = sum(_f_of(i) for i in meal)
-
-    tk = targets.get("kcal_meal", targets.get("kcal", 0.0))
-    tp = targets.get("p_meal",    targets.get("p",    0.0))
-    tc = targets.get("c_meal",    targets.get("c",    0.0))
-    tf = targets.get("f_meal",    targets.get("f",    0.0))
-
-    # Weighted absolute diffs
-    return abs(kcal - tk) + 2.0*abs(p - tp) + 1.0*abs(c - tc) + 2.0*abs(f - tf)
-
-
-def build_meal(foods, targets, max_items_per_meal=3):
-    if not foods:
-        return []
-
-    pool = list(foods)
-    best_meal, best_score = None, 1e9
-
-    for _ in range(200):
-        if not pool:
-            break
-
-        spread = max(2, int(random.gauss(2.5, 0.6)))
-        k = max(1, min(max_items_per_meal, spread, len(pool)))
-
-        if k == 0:
-            continue
-
-        meal_items = random.sample(pool, k=k)
-        if random.random() < 0.35 and pool and len(meal_items) < max_items_per_meal:
-            meal_items.append(random.choice(pool))
-
-        score = score_meal(meal_items, targets)
-        if score < best_score:
-            best_score, best_meal = score, meal_items
-
-    return best_meal or []
-
-
-def _norm_food(f):
-    f = dict(f)
-    f["macros"] = f.get("macros") or {
-        "kcal": f.get("kcal", 0),
-        "p": f.get("p", 0),
-        "c": f.get("c", 0),
-        "f": f.get("f", 0),
-    }
-    f["tags"] = f.get("tags", []) or []
-    f["slots"] = f.get("slots") or MEAL_SLOTS
-    f["portion"] = f.get("portion", 100)
-    f["unit"] = f.get("unit", "g")
-    f["group"] = f.get("group", "other")
-    return f
-
-
-def foods_for_slot(all_foods, slot):
-    pool = []
-    for f in all_foods:
-        f = _norm_food(f)
-        if slot in f["slots"]:
-            pool.append(f)
-    return pool or [_norm_food(f) for f in all_foods]
+# ---------- Core (mealplan.Planner; ovde samo profiler oko njega) ----------
 
+pool_mask = PLANNER.pool_mask
+meal_totals = PLANNER.meal_totals
+build_meal_for_slot = PLANNER.build_meal_for_slot
+build_meals_for_slots = PROFILER.timed("meal regeneration")(PLANNER.build_meals_for_slots)
+generate_plan = PLANNER.generate_plan
+suggest_swaps = PROFILER.timed("swap suggestions")(PLANNER.suggest_swaps)
+to_html = PROFILER.timed("to_html")(PLANNER.to_html)
 
-def scale_macros(total, frac):
-    # total expects dict with keys kcal/p/c/f
-    return {k: total[k] * frac for k in ("kcal", "p", "c", "f")}
 
+def export_html(plan, targets, title, prefs, cache):
+    """Deferred download payload for the HTML export.
 
-def slot_targets(total_target):
-    return {slot: scale_macros(total_target, SLOT_DISTRIB[slot]) for slot in MEAL_SLOTS}
-
-
-def build_meal_for_slot(pool, slot_target, slot, max_items_per_meal=3):
-    meal = build_meal(pool, slot_target, max_items_per_meal=max_items_per_meal)
-
-    # ako je ručak/večera, mora imati proteine
-    if slot in ("lunch", "dinner"):
-        has_protein = any((_norm_food(x).get("group")
-                          in PROTEIN_GROUPS) for x in meal)
-        if not has_protein:
-            candidates = [f for f in pool if f.get("group") in PROTEIN_GROUPS]
-            if candidates:
-                meal[-1] = random.choice(candidates)
-
-    lo, hi = SLOT_KCAL_RANGE[slot]
-    tries = 0
-    while not (lo <= sum(_kcal_of(x) for x in meal) <= hi) and tries < 3:
-        meal = build_meal(pool, slot_target,
-                          max_items_per_meal=max_items_per_meal)
-        tries += 1
-    return meal
-
-# ---------- HTML export (minimal, but robust) ----------
-
-
-def to_html(plan, targets, title, prefs, mode="web"):
-    """Return a minimal standalone HTML so downloads don't crash."""
-    lang = prefs.get("lang", "EN")
-    day_label = "Day" if lang == "EN" else "Dan"
-    carbs_label = "Carbs" if lang == "EN" else "UH"
-    fat_label = "Fat" if lang == "EN" else "Masti"
-
-    def _meal_html(meal, idx):
-        kcal = int(sum(_kcal_of(i) for i in meal))
-        p = int(sum(_p_of(i) for i in meal))
-        c = int(sum(_c_of(i) for i in meal))
-        f = int(sum(_f_of(i) for i in meal))
-        items = "".join(
-            [f"<li>{it.get('name', '?')} (~{int(it.get('portion_g', it.get('portion', 0)))} g)</li>" for it in meal])
-        return f"""
-        <div style="border:1px solid #e5e7eb; border-radius:10px; padding:10px; margin:8px 0;">
-          <div style="font-weight:700; margin-bottom:6px;">Meal {idx} • {kcal} kcal • P {p}g • {carbs_label} {c}g • {fat_label} {f}g</div>
-          <ul style="margin:0 0 0 18px;">{items}</ul>
-        </div>
-        """
-
-    days_html = []
-    for d_idx, day in enumerate(plan or [], start=1):
-        meals = []
-        for m_idx, meal in enumerate(day, start=1):
-            items = meal.get("items", []) if isinstance(meal, dict) else meal
-            meals.append(_meal_html(items, m_idx))
-        days_html.append(f"<h3>{day_label} {d_idx}</h3>" + "".join(meals))
-
-    body = "".join(days_html) if days_html else "<p>No items yet.</p>"
-
-    style = """
-    <style>
-      body{font-family:system-ui,-apple-system,Segoe UI,Roboto,Ubuntu,Cantarell,Inter,sans-serif; padding:18px;}
-      h1{margin:0 0 12px 0; font-size:20px}
-      h3{margin:18px 0 8px 0;}
-    </style>
+    Returns a no-argument callable for ``st.download_button``: the HTML is
+    only built when a button is clicked, from the plan as it is then (day
+    fragments edit it in place without rerunning the buttons), and kept in
+    ``cache`` under the plan's (uid, version). Web and print share the
+    markup, so both buttons and repeated downloads reuse one build until
+    the plan is edited.
     """
-    return f"<!doctype html><html><head><meta charset='utf-8'>{style}<title>{title}</title></head><body><h1>{title}</h1>{body}</body></html>"
+    return deferred_html(to_html, plan, targets, title, prefs, cache)
 
 
 # ---------- Header (lang picker + banner) ----------
@@ -681,23 +541,24 @@ with st.sidebar:
         effective_kcal = base_kcal
         st.write(f"{L('fat')}: **{int(fat_pct*100)}**")
     else:
-        if profile == L("cut"):
-            protein_pct, carbs_pct, fat_pct = 0.35, 0.35, 0.30
-            effective_kcal = int(base_kcal * 0.85)
-        elif profile == L("bulk"):
-            protein_pct, carbs_pct, fat_pct = 0.25, 0.50, 0.25
-            effective_kcal = int(base_kcal * 1.15)
-        else:
-            protein_pct, carbs_pct, fat_pct = 0.30, 0.40, 0.30
-            effective_kcal = base_kcal
+        _preset = "cut" if profile == L("cut") else "bulk" if profile == L("bulk") else "maintain"
+        protein_pct, carbs_pct, fat_pct, _kcal_factor = PROFILE_MACROS[_preset]
+        effective_kcal = int(base_kcal * _kcal_factor)
         st.session_state["protein_pct"] = protein_pct
         st.session_state["carbs_pct"] = carbs_pct
 
     max_items = st.slider(L("max_items"), 2, 5, st.session_state.get(
         "max_items", 3), key="max_items")
 
-    all_tags = sorted({t for f in foods for t in f.get("tags", [])})
-    all_groups = sorted({f["group"] for f in foods})
+    engine_options = ["random", "exact"]
+    engine = st.selectbox(L("engine"), engine_options,
+                          index=engine_options.index(
+                              st.session_state.get("engine", "random")),
+                          format_func=lambda e: L(f"engine_{e}"),
+                          key="engine")
+
+    all_tags = list(FOOD_TABLE.tag_names)
+    all_groups = list(FOOD_TABLE.group_names)
     exclude_tags = st.multiselect(L("allergens"), all_tags, default=st.session_state.get(
         "exclude_tags", []), key="exclude_tags")
     exclude_groups = st.multiselect(L("groups"),   all_groups, default=st.session_state.get(
@@ -734,7 +595,7 @@ with st.sidebar:
             if name:
                 profiles[name] = {
                     "days": days, "base_kcal": base_kcal, "meals": meals, "diet": diet, "profile": profile,
-                    "protein_pct": protein_pct, "carbs_pct": carbs_pct, "max_items": max_items,
+                    "protein_pct": protein_pct, "carbs_pct": carbs_pct, "max_items": max_items, "engine": engine,
                     "exclude_tags": exclude_tags, "exclude_groups": exclude_groups, "dislikes": dislikes,
                 }
                 _write_profiles(profiles)
@@ -790,6 +651,7 @@ prefs = {
     "fat_pct": 1.0 - protein_pct - carbs_pct if profile == L("custom") else fat_pct,
     "diet": diet,
     "max_items": max_items,
+    "engine": engine,
     "exclude_tags": exclude_tags,
     "exclude_groups": exclude_groups,
     "dislikes": dislikes,
@@ -827,138 +689,110 @@ if _saved:
 # ---------- Generate + render (ALWAYS runs) ----------
 
 
-def generate_plan(foods, days, prefs):
-    macros = macro_targets(
-        prefs["effective_kcal"], prefs["protein_pct"], prefs["carbs_pct"], prefs["fat_pct"])
-    meals_count = max(1, prefs["meals"])
-    macros["kcal_meal"] = prefs["effective_kcal"] / meals_count
-    macros["p_meal"] = macros["p"] / meals_count
-    macros["c_meal"] = macros["c"] / meals_count
-    macros["f_meal"] = macros["f"] / meals_count
-    macros["meals"] = meals_count
-
-    pool = filter_by_diet(foods, prefs["diet"])
-
-    if prefs["exclude_tags"]:
-        pool = [f for f in pool if not any(tag in f.get(
-            "tags", []) for tag in prefs["exclude_tags"])]
-    if prefs["exclude_groups"]:
-        pool = [f for f in pool if f["group"] not in prefs["exclude_groups"]]
-    if prefs["dislikes"]:
-        lowers = [x.strip().lower()
-                  for x in prefs["dislikes"].split(",") if x.strip()]
-        if lowers:
-            pool = [f for f in pool if not any(
-                tok in f["name"].lower() for tok in lowers)]
-    if len(pool) < 5:
-        st.warning(L("filters_strict"))
-        pool = filter_by_diet(foods, prefs["diet"])
-
-    # build a day using older approach (uniform meals)
-    def build_day(foods, targets, meals=4, max_items_per_meal=3):
-        best_day, best_score = None, 1e9
-        foods_list = list(foods)
-
-        for _ in range(400):
-            day, total_score, used = [], 0, set()
-            success = True
-
-            for _m in range(meals):
-                candidates = [
-                    f for f in foods_list if f["name"] not in used or random.random() < 0.4
-                ]
-                if not candidates:
-                    candidates = list(foods_list)
+# Compute pool & macros for reuse
+_macros_for_pool = plan_targets(prefs)
 
-                if not candidates:
-                    success = False
-                    break
+with PROFILER.stage("pool filtering"):
+    _pool_mask, _ = pool_mask(prefs)
+    _pool = FOOD_FILTERS.foods(_pool_mask)
 
-                spread = max(2, int(random.gauss(2.5, 0.6)))
-                k = max(1, min(max_items_per_meal, spread, len(candidates)))
-                if k == 0:
-                    success = False
-                    break
+# Keep pool/macros in session for callbacks
+st.session_state["_POOL"] = _pool
+st.session_state["_MACROS"] = _macros_for_pool
 
-                meal_items = random.sample(candidates, k=k)
-                if random.random() < 0.35 and candidates and len(meal_items) < max_items_per_meal:
-                    meal_items.append(random.choice(candidates))
+@st.cache_resource(show_spinner=False)
+def plan_cache():
+    return PlanCache(maxsize=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL)
 
-                total_score += score_meal(meal_items, targets)
-                for it in meal_items:
-                    used.add(it["name"])
-                day.append(meal_items)
 
-            if not success or len(day) != meals:
-                continue
+def cached_generate_plan(foods, prefs, seed=None, progress=None):
+    """generate_plan behind the shared plan cache.
 
-            if total_score < best_score:
-                best_score, best_day = total_score, day
+    Keyed by the normalized prefs, the seed and the catalog fingerprint.
+    The cache holds a CompactPlan (row ids + quantities); callers get their
+    own copy of its arrays, since the plan tab edits the active plan in place.
+    ``progress`` only hears from the generator on a cache miss.
+    """
+    seed = new_seed() if seed is None else int(seed)
+    key = plan_key(prefs, seed, FOOD_TABLE.fingerprint)
 
-        return best_day or []
+    @PROFILER.timed("generate_plan")
+    def build():
+        plan, macros = generate_plan(foods, prefs["days"], prefs, seed=seed, progress=progress)
+        return CompactPlan.from_nested(FOOD_TABLE, plan, MEAL_SLOTS), macros
 
-    plan = []
-    for _ in range(prefs["days"]):
-        day = build_day(
-            pool, macros, meals=prefs["meals"], max_items_per_meal=prefs["max_items"])
-        plan.append(day)
-    return plan, macros
+    plan, macros = plan_cache().get_or_create(key, build)
+    if macros.get("filters_relaxed"):
+        st.warning(L("filters_strict"))
+    return plan.copy(), dict(macros)
 
 
-# Compute pool & macros for reuse
-_macros_for_pool = macro_targets(
-    prefs["effective_kcal"], prefs["protein_pct"], prefs["carbs_pct"], prefs["fat_pct"])
-_meals_count = max(1, prefs["meals"])
-_macros_for_pool["kcal_meal"] = prefs["effective_kcal"]/_meals_count
-_macros_for_pool["p_meal"] = _macros_for_pool["p"] / _meals_count
-_macros_for_pool["c_meal"] = _macros_for_pool["c"] / _meals_count
-_macros_for_pool["f_meal"] = _macros_for_pool["f"] / _meals_count
-_macros_for_pool["meals"] = _meals_count
-
-_pool = filter_by_diet(foods, prefs["diet"])
-if prefs["exclude_tags"]:
-    _pool = [f for f in _pool if not any(tag in f.get(
-        "tags", []) for tag in prefs["exclude_tags"])]
-if prefs["exclude_groups"]:
-    _pool = [f for f in _pool if f["group"] not in prefs["exclude_groups"]]
-if prefs["dislikes"]:
-    _lowers = [x.strip().lower()
-               for x in prefs["dislikes"].split(",") if x.strip()]
-    if _lowers:
-        _pool = [f for f in _pool if not any(
-            tok in f["name"].lower() for tok in _lowers)]
-if len(_pool) < 5:
-    _pool = filter_by_diet(foods, prefs["diet"])
+def _query_seed():
+    # ?seed=123 u URL-u reprodukuje plan (uz iste prefs i katalog)
+    try:
+        return int(st.query_params.get("seed"))
+    except (TypeError, ValueError):
+        return None
 
-# Keep pool/macros in session for callbacks
-st.session_state["_POOL"] = _pool
-st.session_state["_MACROS"] = _macros_for_pool
 
 if "active_plan" not in st.session_state:
-    plan, macros = generate_plan(foods, prefs["days"], prefs)
+    # bez ?seed= prvi plan zavisi samo od prefs — isti preseti dolaze iz keša
+    seed = _query_seed()
+    if seed is None:
+        seed = default_seed(prefs, FOOD_TABLE.fingerprint)
+    plan, macros = cached_generate_plan(foods, prefs, seed=seed)
     st.session_state["active_plan"] = plan
     st.session_state["plan_macros"] = macros
 else:
     plan = st.session_state["active_plan"]
     macros = st.session_state.get("plan_macros", _macros_for_pool)
+    if plan.table is not FOOD_TABLE:
+        # katalog je ponovo učitan: plan prelazi na novu tabelu (po imenu)
+        plan, dropped = plan.rebind(FOOD_TABLE)
+        st.session_state["active_plan"] = plan
+        if dropped:
+            st.info(f"{L('catalog_reloaded')} {', '.join(sorted(set(dropped)))}")
+
+
+def _get_qty(d_idx, m_idx, i_idx, default=1.0):
+    # količine žive u CompactPlan-u aktivnog plana (1-based indeksi kao u UI)
+    plan = st.session_state.get("active_plan")
+    try:
+        return plan.qty_of(d_idx - 1, m_idx - 1, i_idx)
+    except (AttributeError, IndexError):
+        return float(default)
 
+def plan_totals():
+    """PlanTotals of the active plan; rebuilt only when a new plan is set.
 
-def _get_qty(d_idx, m_idx, i_idx, default=1.0, NS="plan_tab"):
-    key = f"{NS}_qty_{d_idx}_{m_idx}_{i_idx}"
-    return float(st.session_state.get(key, default))
+    Every edit of the active plan (qty, swap, regenerate) patches it in
+    place, so summaries read totals instead of summing items again.
+    """
+    plan = st.session_state.get("active_plan") or []
+    totals = st.session_state.get("plan_totals")
+    if totals is None or totals.plan is not plan:
+        totals = PlanTotals(plan, qty=getattr(plan, "qty_of", None))
+        st.session_state["plan_totals"] = totals
+    return totals
+
+
+def plan_shopping():
+    """PlanShopping of the active plan, patched next to plan_totals()."""
+    plan = st.session_state.get("active_plan")
+    shop = st.session_state.get("plan_shopping")
+    if shop is None or shop.plan is not plan:
+        shop = PlanShopping(plan)
+        st.session_state["plan_shopping"] = shop
+    return shop
 
 # ---------- Render helpers ----------
 
 
 def render_meal_card(meal, m_idx, lang="EN", d_idx=None):
-    kcal_m = int(sum((_kcal_of(i) * (_get_qty(d_idx, m_idx, j)
-                 if d_idx else 1.0)) for j, i in enumerate(meal)))
-    p = int(sum((_p_of(i) * (_get_qty(d_idx, m_idx, j) if d_idx else 1.0))
-            for j, i in enumerate(meal)))
-    c = int(sum((_c_of(i) * (_get_qty(d_idx, m_idx, j) if d_idx else 1.0))
-            for j, i in enumerate(meal)))
-    f = int(sum((_f_of(i) * (_get_qty(d_idx, m_idx, j) if d_idx else 1.0))
-            for j, i in enumerate(meal)))
+    if d_idx:
+        kcal_m, p, c, f = (int(v) for v in plan_totals().meal(d_idx - 1, m_idx - 1))
+    else:
+        kcal_m, p, c, f = (int(v) for v in meal_totals(meal))
 
     meal_label = "Meal" if lang == "EN" else "Obrok"
     carbs_label = "Carbs" if lang == "EN" else "UH"
@@ -988,71 +822,22 @@ def render_meal_card(meal, m_idx, lang="EN", d_idx=None):
     """
     return card
 
-# ---------- Smart substitutions helpers ----------
-
-
-def _food_vec(food):
-    group = (food.get("group") or "").strip().lower()
-    tags = [(t or "").strip().lower() for t in food.get("tags", [])]
-    return set([f"g::{group}"] + [f"t::{t}" for t in tags])
-
-
-def _sim(a: set, b: set) -> float:
-    if not a and not b:
-        return 1.0
-    u = len(a | b)
-    return (len(a & b) / u) if u else 0.0
-
-
-def _macro_close(a, b, tol=0.15):
-    for k in ("protein", "carbs", "fat"):
-        av = max(1e-6, float(a.get(k, 0)))
-        bv = max(1e-6, float(b.get(k, 0)))
-        if abs(bv - av) / av > tol:
-            return False
-    return True
-
-
-def suggest_swaps(item, pool, topk=5, tol=0.30):
-    pool = pool or []
-
-    def _get_kcal(x):
-        if isinstance(x, dict):
-            m = x.get("macros")
-            if isinstance(m, dict):
-                return float(m.get("kcal", x.get("kcal", 0) or 0))
-        return float(x.get("kcal", 0) or 0)
-    base_vec = _food_vec(item)
-    base_name = (item.get("name") or "").strip().lower()
-    cands = []
-    for f in pool:
-        if (f.get("name") or "").strip().lower() == base_name:
-            continue
-        if not _macro_close(item, f, tol=tol):
-            continue
-        sim = _sim(base_vec, _food_vec(f))
-        kcal_gap = abs(_get_kcal(f) - _get_kcal(item))
-        score = sim - (kcal_gap / 800.0)
-        cands.append((score, f))
-    cands.sort(key=lambda x: x[0], reverse=True)
-    return [f for _, f in cands[:topk]]
-
 # ---------- Macro math ----------
 
 
+def _day_macros(day, d_idx=None):
+    # dan iz aktivnog plana: gotov zbir iz PlanTotals
+    if d_idx:
+        return plan_totals().day(d_idx - 1)
+    return PLANNER.day_totals(day)
+
+
 def macros_of_day(day, d_idx=None):
-    P = C = F = 0
-    for m_idx, meal in enumerate(day, start=1):
-        items = meal.get("items", []) if isinstance(meal, dict) else meal
-        for i_idx, it in enumerate(items):
-            qty_key = f"plan_tab_qty_{d_idx}_{m_idx}_{i_idx}" if d_idx else None
-            qty = float(st.session_state.get(qty_key, 1.0)) if qty_key else 1.0
-            P += _p_of(it) * qty
-            C += _c_of(it) * qty
-            F += _f_of(it) * qty
+    _, P, C, F = (float(v) for v in _day_macros(day, d_idx))
     return P, C, F
 
 
+@PROFILER.timed("charts + summaries")
 def render_summary(kcal: float, P: float, C: float, F: float,
                    title="Daily summary", lang="EN", show_donut=False):
     """Dark summary: card + 3 progress bars + (optional) donut chart + smart tip (EN/SR)."""
@@ -1123,42 +908,8 @@ def render_summary(kcal: float, P: float, C: float, F: float,
     # donut (opciono)
     if show_donut and right is not None:
         with right:
-            fig, ax = plt.subplots(figsize=(2.6, 2.6))
-
-            # 🎨 prilagođene boje (blago pastelne, tamne teme)
-            colors = ["#60a5fa", "#facc15", "#34d399"]  # plava / žuta / zelena
-
-            wedges, texts, autotexts = ax.pie(
-                [P, C, F],
-                labels=lbls,
-                colors=colors,
-                autopct="%1.0f%%",
-                startangle=90,
-                pctdistance=0.76,
-                labeldistance=1.10,
-                wedgeprops=dict(
-                    width=0.40, edgecolor="#111827", linewidth=1.0),
-            )
-
-            for t in autotexts:
-                t.set_color("#111827")
-                t.set_fontsize(9)
-                t.set_weight("bold")
-
-            for t in texts:
-                t.set_fontsize(9)
-                t.set_color("#9ca3af")
-
-            ax.axis("equal")
-
-            # tekst u centru: label + kcal vrednost
-            ax.text(0, 0.08, center_label, ha="center",
-                    va="center", fontsize=9, color="#9ca3af")
-            ax.text(0, -0.08, f"{int(kcal)}", ha="center",
-                    va="center", fontsize=14, color="#e5e7eb", weight="bold")
-
-            st.pyplot(fig, bbox_inches="tight")
-            plt.close(fig)
+            # SVG iz keša (po zaokruženim makroima), bez matplotlib-a
+            st.image(donut_svg(kcal, P, C, F, labels=lbls, center_label=center_label))
 
     # smart tip
     if abs(rp - 0.35) < 0.05 and abs(rc - 0.40) < 0.05 and abs(rf - 0.25) < 0.05:
@@ -1180,37 +931,33 @@ def render_summary(kcal: float, P: float, C: float, F: float,
 
 
 def day_totals(day, d_idx=None):
-    kcal = P = C = F = 0
-    for m_idx, meal in enumerate(day, start=1):
-        items = meal.get("items", []) if isinstance(meal, dict) else meal
-        for i_idx, it in enumerate(items):
-            qty = _get_qty(d_idx, m_idx, i_idx) if d_idx else 1.0
-            kcal += _kcal_of(it) * qty
-            P += _p_of(it) * qty
-            C += _c_of(it) * qty
-            F += _f_of(it) * qty
+    kcal, P, C, F = _day_macros(day, d_idx)
     return int(kcal), int(P), int(C), int(F)
 
 
 # ---------- Header & Command bar ----------
 st.subheader(L("plan_header").format(
     days=prefs["days"], kcal=prefs["kcal"], eff_kcal=prefs["effective_kcal"]))
+if macros.get("seed") is not None:
+    st.caption(f"{L('plan_seed')}: `{macros['seed']}`")
 
 title = f"Meal Plan — {prefs['days']} days • {int(prefs['kcal'])} kcal"
 c1, c2, c3 = st.columns([1, 1, 1])
 with c1:
     if st.button(L("generate_new"), key="cmd_generate", width="stretch"
                  ):
-        plan, macros = generate_plan(foods, prefs["days"], prefs)
+        with show_progress("🍽 Generating plan...") as progress:
+            plan, macros = cached_generate_plan(foods, prefs, progress=progress)
         st.session_state["active_plan"] = plan
         st.session_state["plan_macros"] = macros
         st.rerun()
 
+# HTML se pravi tek na klik (i jednom po verziji plana za oba dugmeta)
+plan_html = export_html(st.session_state.get("active_plan", []), macros, title, prefs,
+                        st.session_state.setdefault("_export_cache", {}))
 with c2:
-    web_html = to_html(st.session_state.get(
-        "active_plan", []), macros, title, prefs, mode="web")
     st.download_button(label=L("download"),
-                       data=(web_html or "").encode("utf-8"),
+                       data=plan_html,
                        file_name=f"meal_plan_{datetime.now().strftime('%Y%m%d_%H%M')}.html",
                        mime="text/html",
                        key="cmd_dl_web",
@@ -1218,10 +965,8 @@ with c2:
                        disabled=not bool(plan))
 
 with c3:
-    print_html = to_html(st.session_state.get(
-        "active_plan", []), macros, title, prefs, mode="print")
     st.download_button(label=L("print_pdf"),
-                       data=(print_html or "").encode("utf-8"),
+                       data=plan_html,
                        file_name=f"meal_plan_print_{datetime.now().strftime('%Y%m%d_%H%M')}.html",
                        mime="text/html",
                        key="cmd_dl_print",
@@ -1241,21 +986,13 @@ with q3:
                 key="quick_veg", help="No meat/fish/seafood")
 
 # Re-derive filtered pool for quick filters (non-destructive)
-_pool_quick = list(_pool)
-try:
-    if st.session_state.get("quick_no_dairy"):
-        _pool_quick = [f for f in _pool_quick if "dairy" not in set(
-            f.get("tags", [])) and "milk" not in set(f.get("tags", []))]
-    if st.session_state.get("quick_no_pork"):
-        _pool_quick = [
-            f for f in _pool_quick if "pork" not in set(f.get("tags", []))]
-    if st.session_state.get("quick_veg"):
-        _pool_quick = [f for f in _pool_quick if f.get("group", "").lower(
-        ) not in {"meat", "fish", "seafood"} and "meat" not in set(f.get("tags", []))]
-except Exception:
-    pass
-if len(_pool_quick) < 5:
-    _pool_quick = list(_pool)
+_quick = [name for name, key in (("no_dairy", "quick_no_dairy"), ("no_pork", "quick_no_pork"),
+                                 ("vegetarian", "quick_veg")) if st.session_state.get(key)]
+_pool_quick = _pool
+if _quick:
+    _quick_mask = _pool_mask & FOOD_FILTERS.mask(quick=_quick)
+    if np.count_nonzero(_quick_mask) >= 5:
+        _pool_quick = FOOD_FILTERS.foods(_quick_mask)
 
 # --- Tabs: Plan / Summary / Analytics / Presets ---
 tab_plan, tab_summary, tab_analytics, tab_presets = st.tabs([
@@ -1265,67 +1002,72 @@ tab_plan, tab_summary, tab_analytics, tab_presets = st.tabs([
     "🗂 " + L("presets")
 ])
 
-with tab_summary:
-    if plan:
-        rows = []
-        for d_idx, day in enumerate(plan, start=1):
-            kcal, P, C, F = day_totals(day, d_idx)
-            rows.append({"Day" if lang_choice == "EN" else "Dan": d_idx,
-                        "kcal": kcal, "P": P, "C": C, "F": F})
-        df_days = pd.DataFrame(rows)
-        st.dataframe(df_days, width="stretch"
-                     )
-        csv_bytes = df_days.to_csv(index=False).encode("utf-8")
-        csv_name = f"daily_summary_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
-        st.download_button("⬇️ CSV", data=csv_bytes, file_name=csv_name,
-                           mime="text/csv", width="stretch"
-                           )
+def _refresh_button(key):
+    # izmene u danima osvežavaju samo svoj fragment; ovi delovi (zbirovi su
+    # već ažurni, delta) se osvežavaju sledećim punim run-om ili ovim
+    # dugmetom — klik na widget u fragmentu ponovo izvršava samo taj fragment
+    st.button(L("refresh"), key=key, type="tertiary")
 
-        # Mini kcal trend
-        fig, ax = plt.subplots(figsize=(5, 2.2))
-        ax.plot(range(1, len(rows)+1), [r["kcal"]
-                for r in rows], marker="o", linewidth=2)
-        ax.axhline(prefs.get("effective_kcal", 2000),
-                   linestyle="--", linewidth=1, alpha=0.7)
-        ax.set_xlabel('Day' if lang_choice == "EN" else 'Dan')
-        ax.set_ylabel('kcal')
-        ax.set_title('Kcal trend' if lang_choice == "EN" else 'Trend kcal')
-        st.pyplot(fig, bbox_inches="tight")
-        plt.close(fig)
-    else:
-        st.caption(L("no_items_yet"))
 
-with tab_analytics:
+@st.fragment
+def render_daily_summary():
+    """Summary tab: per-day totals table, CSV and kcal trend (a fragment)."""
+    plan_now = st.session_state.get("active_plan", [])
+    if not plan_now:
+        st.caption(L("no_items_yet"))
+        return
+    _refresh_button("refresh_summary")
+    rows = []
+    for d_idx, day in enumerate(plan_now, start=1):
+        kcal, P, C, F = day_totals(day, d_idx)
+        rows.append({"Day" if lang_choice == "EN" else "Dan": d_idx,
+                    "kcal": kcal, "P": P, "C": C, "F": F})
+    df_days = pd.DataFrame(rows)
+    st.dataframe(df_days, width="stretch"
+                 )
+    csv_bytes = df_days.to_csv(index=False).encode("utf-8")
+    csv_name = f"daily_summary_{datetime.now().strftime('%Y%m%d_%H%M')}.csv"
+    st.download_button("⬇️ CSV", data=csv_bytes, file_name=csv_name,
+                       mime="text/csv", width="stretch"
+                       )
+
+    # Mini kcal trend
+    st.image(trend_svg([r["kcal"] for r in rows], ref=prefs.get("effective_kcal", 2000),
+                       title='Kcal trend' if lang_choice == "EN" else 'Trend kcal',
+                       xlabel='Day' if lang_choice == "EN" else 'Dan', ylabel='kcal'))
+
+
+@st.fragment
+def render_analytics():
+    """Analytics tab: kcal per day and the average macro split (a fragment)."""
     st.subheader("Macro & Calorie Overview")
-    if plan:
-        kcal_list, protein_list, carbs_list, fat_list = [], [], [], []
-        for d_idx, day in enumerate(plan, start=1):
-            kcal, P, C, F = day_totals(day, d_idx)
-            kcal_list.append(kcal)
-            protein_list.append(P)
-            carbs_list.append(C)
-            fat_list.append(F)
-
-        fig, ax = plt.subplots()
-        ax.bar(range(1, len(kcal_list)+1), kcal_list)
-        ax.set_title("Calories per day")
-        ax.set_xlabel("Day")
-        ax.set_ylabel("kcal")
-        st.pyplot(fig)
-        plt.close(fig)
-
-        avg_P = sum(protein_list)/len(protein_list)
-        avg_C = sum(carbs_list)/len(carbs_list)
-        avg_F = sum(fat_list)/len(fat_list)
-
-        fig2, ax2 = plt.subplots(figsize=(2.2, 2.2))
-        ax2.pie([avg_P, avg_C, avg_F], labels=["Protein", "Carbs", "Fat"],
-                autopct="%1.0f%%", startangle=90, pctdistance=0.78)
-        ax2.axis("equal")
-        st.pyplot(fig2, bbox_inches="tight")
-        plt.close(fig2)
-    else:
+    plan_now = st.session_state.get("active_plan", [])
+    if not plan_now:
         st.caption(L("no_items_yet"))
+        return
+    _refresh_button("refresh_analytics")
+    kcal_list, protein_list, carbs_list, fat_list = [], [], [], []
+    for d_idx, day in enumerate(plan_now, start=1):
+        kcal, P, C, F = day_totals(day, d_idx)
+        kcal_list.append(kcal)
+        protein_list.append(P)
+        carbs_list.append(C)
+        fat_list.append(F)
+
+    st.image(bars_svg(kcal_list, title="Calories per day", xlabel="Day", ylabel="kcal"))
+
+    avg_P = sum(protein_list)/len(protein_list)
+    avg_C = sum(carbs_list)/len(carbs_list)
+    avg_F = sum(fat_list)/len(fat_list)
+
+    st.image(pie_svg([avg_P, avg_C, avg_F], labels=["Protein", "Carbs", "Fat"]))
+
+
+with tab_summary:
+    render_daily_summary()
+
+with tab_analytics:
+    render_analytics()
 
 with tab_presets:
     st.caption(
@@ -1358,6 +1100,201 @@ with tab_presets:
         st.success("✅ Presets imported successfully.")
         st.rerun()
 
+# ---------- Plan tab: one fragment per day ----------
+
+
+def _rerun_day():
+    # u fragment rerun-u osveži samo taj dan; ako je klik stigao kroz pun
+    # rerun (npr. AppTest), scope="fragment" nije dozvoljen pa ide cela app
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
+
+@st.fragment
+def render_plan_day(d_idx, show_charts):
+    """One day of the plan tab (toolbar, meal cards, day summary).
+
+    Runs as a fragment: +/-, swaps, lock, per-meal and per-day regenerate
+    only re-execute this day, not the whole script. The whole-plan summary,
+    summary tabs and shopping list are fragments of their own and catch up
+    on their refresh button or the next full run. The day is read from
+    session state because a fragment rerun reuses the original arguments.
+    """
+    NS = "plan_tab"  # namespace za ključeve widget-a
+    active = st.session_state["active_plan"]
+    d0 = d_idx - 1
+    day = active[d0]
+
+    # ---------- TOOLBAR (Regenerate / Reset) ----------
+    with st.container():
+        c_reg, c_rst = st.columns(
+            [1, 1], vertical_alignment="bottom")
+
+        with c_reg:
+            if st.button("🔁 Regenerate this day", key=f"regen_day_{d_idx}", width="stretch"
+                         ):
+                eff = prefs.get("effective_kcal", 2000)
+                pp = prefs.get("protein_pct", 0.30)
+                cp = prefs.get("carbs_pct", 0.40)
+                fp = prefs.get("fat_pct", 0.30)
+                total_target = {"kcal": float(eff),
+                                "p": float(eff * pp / 4.0),
+                                "c": float(eff * cp / 4.0),
+                                "f": float(eff * fp / 9.0)}
+                targets = slot_targets(total_target)
+                pool_all = st.session_state.get("_POOL", [])
+                requests = [((d_idx, m_idx), foods_for_slot(pool_all, slot), targets[slot], slot)
+                            for m_idx, slot in enumerate(MEAL_SLOTS, start=1)]
+                with show_progress("🔄 Regenerating this day...") as progress:
+                    new_meals = build_meals_for_slots(
+                        requests, max_items_per_meal=prefs["max_items"],
+                        engine=prefs.get("engine", "random"), progress=progress)
+                active.set_day(d0, [(FOOD_TABLE.rows_of(items), slot)
+                                    for slot, items in zip(MEAL_SLOTS, new_meals)])
+                plan_totals().set_day(d0, active[d0])
+                plan_shopping().set_day(d0)
+                _rerun_day()
+
+        with c_rst:
+            if st.button("🧹 Reset quantities", key=f"reset_qty_day_{d_idx}", width="stretch"
+                         ):
+                active.reset_qty(d0)
+                plan_totals().set_day(d0, day)
+                plan_shopping().set_day(d0)
+                _rerun_day()
+
+    # ---------- Meals for the day ----------
+    for m_idx, meal in enumerate(day, start=1):
+        if isinstance(meal, dict):
+            slot = meal.get(
+                "slot", MEAL_SLOTS[(m_idx - 1) % len(MEAL_SLOTS)])
+            items = meal.get("items", [])
+        else:
+            slot = MEAL_SLOTS[(m_idx - 1) % len(MEAL_SLOTS)]
+            items = meal
+
+        LBL = SLOT_LABELS[st.session_state.get("LANG", "EN")]
+        st.markdown(f"**{LBL.get(slot, slot.title())}**")
+
+        st.markdown(
+            render_meal_card(
+                items, m_idx, lang=lang_choice, d_idx=d_idx),
+            unsafe_allow_html=True
+        )
+
+        for i_idx, item in enumerate(items):
+            current = active.qty_of(d0, m_idx - 1, i_idx)
+
+            c1, c2, c3 = st.columns(
+                [1, 1, 6], vertical_alignment="center")
+
+            with c1:
+                if st.button("\u2212", key=f"{NS}_btn_dec_{d_idx}_{m_idx}_{i_idx}", type="secondary"):
+                    active.set_qty(d0, m_idx - 1, i_idx, max(0.5, current - 0.5))
+                    plan_totals().set_qty(d0, m_idx - 1, i_idx, active.qty_of(d0, m_idx - 1, i_idx))
+                    plan_shopping().set_qty(d0, m_idx - 1, i_idx, active.qty_of(d0, m_idx - 1, i_idx))
+                    _rerun_day()
+
+            with c2:
+                if st.button("\uFF0B", key=f"{NS}_btn_plus_{d_idx}_{m_idx}_{i_idx}", type="secondary"):
+                    active.set_qty(d0, m_idx - 1, i_idx, current + 0.5)
+                    plan_totals().set_qty(d0, m_idx - 1, i_idx, active.qty_of(d0, m_idx - 1, i_idx))
+                    plan_shopping().set_qty(d0, m_idx - 1, i_idx, active.qty_of(d0, m_idx - 1, i_idx))
+                    _rerun_day()
+
+            with c3:
+                pool_all = st.session_state.get("_POOL", [])
+                slot_pool = foods_for_slot(pool_all, slot)
+                sugs = suggest_swaps(item, slot_pool) or []
+
+                st.caption(f"{item.get('name', '?')} × {current}")
+
+                if sugs:
+                    sel_label = "Suggest swap" if lang_choice == "EN" else "Predlog zamene"
+                    alt_names = ["—"] + \
+                        [a.get("name", "") for a in sugs]
+                    sel_alt = st.selectbox(
+                        sel_label, alt_names, key=f"suggest_{d_idx}_{m_idx}_{i_idx}")
+
+                    if sel_alt != "—":
+                        new_item = next(a for a in sugs if a.get(
+                            "name", "") == sel_alt)
+                        # zamena je samo drugi red tabele; količina ostaje
+                        row = FOOD_TABLE.row_of(new_item)
+                        if row >= 0:
+                            active.set_item(d0, m_idx - 1, i_idx, row)
+                        plan_totals().set_meal(d0, m_idx - 1, active.items(d0, m_idx - 1))
+                        plan_shopping().set_meal(d0, m_idx - 1)
+                        st.toast("✨ Swapped" if lang_choice ==
+                                 "EN" else "✨ Zamenjeno")
+                        _rerun_day()
+
+        # kontrole za jedan obrok (lock / regenerate)
+        ctrl_cols = st.columns([1, 1, 2])
+        lock_key = f"{NS}_lock_{d_idx}_{m_idx}"
+        regen_key = f"{NS}_regen_{d_idx}_{m_idx}"
+
+        with ctrl_cols[0]:
+            st.checkbox(L("lock"), key=lock_key,
+                        value=st.session_state.get(lock_key, False))
+            active.set_locked(d0, m_idx - 1, st.session_state.get(lock_key, False))
+
+        with ctrl_cols[1]:
+            if st.button(L("regenerate"), key=regen_key):
+                if not active.locked(d0, m_idx - 1):
+                    pool_all = st.session_state.get("_POOL", [])
+                    slot_pool = foods_for_slot(pool_all, slot)
+
+                    total_target = st.session_state.get("_MACROS", {}).get("target", {
+                        "kcal": float(prefs.get("effective_kcal", 2000)),
+                        "p": float(prefs.get("effective_kcal", 2000) * prefs.get("protein_pct", 0.30) / 4.0),
+                        "c": float(prefs.get("effective_kcal", 2000) * prefs.get("carbs_pct", 0.40) / 4.0),
+                        "f": float(prefs.get("effective_kcal", 2000) * prefs.get("fat_pct", 0.30) / 9.0),
+                    })
+                    tgt = scale_macros(
+                        total_target, SLOT_DISTRIB.get(slot, 0.25))
+
+                    new_meal = build_meal_for_slot(
+                        slot_pool, tgt, slot, max_items_per_meal=prefs.get(
+                            "max_items", 3),
+                        engine=prefs.get("engine", "random")
+                    )
+
+                    if new_meal:
+                        active.set_meal(d0, m_idx - 1, FOOD_TABLE.rows_of(new_meal),
+                                        active.slot(d0, m_idx - 1))
+                        plan_totals().set_meal(d0, m_idx - 1, active.items(d0, m_idx - 1))
+                        plan_shopping().set_meal(d0, m_idx - 1)
+
+                        st.toast(
+                            "🔁 Meal regenerated" if lang_choice == "EN" else "🔁 Obrok regenerisan")
+                        _rerun_day()
+                else:
+                    st.warning(L("locked_warn"))
+
+    # === Day summary (posle svih obroka; 1× po danu) ===
+    if show_charts:
+        kcal_d, P_d, C_d, F_d = day_totals(day, d_idx=d_idx)
+        title_pc = ("Day {0} summary".format(
+            d_idx) if lang_choice == "EN" else f"Dan {d_idx} — sažetak")
+        render_summary(kcal_d, P_d, C_d, F_d, title=title_pc,
+                       lang=lang_choice, show_donut=True)
+
+
+@st.fragment
+def render_plan_summary():
+    """Whole-plan summary under the days (a fragment, see _refresh_button)."""
+    _refresh_button("refresh_plan_summary")
+    plan_kcal, plan_P, plan_C, plan_F = plan_totals().total
+
+    ttl_title = ("Whole plan summary" if lang_choice ==
+                 "EN" else "Sažetak celog plana")
+    render_summary(plan_kcal, plan_P, plan_C, plan_F,
+                   title=ttl_title, lang=lang_choice, show_donut=True)
+
+
 with tab_plan:
     if not plan:
         st.markdown(f"""
@@ -1368,7 +1305,8 @@ with tab_plan:
         """, unsafe_allow_html=True)
         if st.button(L("generate_new"), key="btn_generate_from_empty", width="stretch"
                      ):
-            plan, macros = generate_plan(foods, prefs["days"], prefs)
+            with show_progress("🍽 Generating plan...") as progress:
+                plan, macros = cached_generate_plan(foods, prefs, progress=progress)
             st.session_state["active_plan"] = plan
             st.session_state["plan_macros"] = macros
             st.rerun()
@@ -1382,7 +1320,6 @@ with tab_plan:
                      help="Rebuild every meal that isn't locked (respecting Breakfast/Lunch/Snack/Dinner)",
                      width="stretch"
                      ):
-            show_loading("🔄 Regenerating full plan...", wait=1.2)
             plan_cur = st.session_state.get("active_plan", [])
 
             eff = prefs.get("effective_kcal", 2000)
@@ -1395,284 +1332,125 @@ with tab_plan:
                             "f": float(eff * fp / 9.0)}
             slot_tgts = slot_targets(total_target)
 
+            # skupi sve otključane (dan, obrok) parove pa ih generiši zajedno
+            slot_pools, requests, where = {}, [], []
             for d_idx, day in enumerate(plan_cur, start=1):
                 for m_idx, meal in enumerate(day, start=1):
-                    if st.session_state.get(f"{NS}_lock_{d_idx}_{m_idx}", False):
+                    if plan_cur.locked(d_idx - 1, m_idx - 1):
                         continue
                     if isinstance(meal, dict):
                         slot = meal.get(
                             "slot", MEAL_SLOTS[(m_idx - 1) % len(MEAL_SLOTS)])
-                        items_now = meal.get("items", [])
                     else:
                         slot = MEAL_SLOTS[(m_idx - 1) % len(MEAL_SLOTS)]
-                        items_now = meal
-                    pool = foods_for_slot(_pool_quick, slot)
-                    new_items = build_meal_for_slot(pool=pool, slot_target=slot_tgts[slot],
-                                                    slot=slot, max_items_per_meal=prefs.get("max_items", 3))
-                    if isinstance(meal, dict):
-                        plan_cur[d_idx - 1][m_idx -
-                                            1] = {"slot": slot, "items": new_items}
-                    else:
-                        plan_cur[d_idx - 1][m_idx - 1] = new_items
+                    if slot not in slot_pools:
+                        slot_pools[slot] = foods_for_slot(_pool_quick, slot)
+                    requests.append(((d_idx, m_idx), slot_pools[slot], slot_tgts[slot], slot))
+                    where.append((d_idx, m_idx, slot, isinstance(meal, dict)))
+
+            with show_progress("🔄 Regenerating full plan...") as progress:
+                new_meals = build_meals_for_slots(
+                    requests, max_items_per_meal=prefs.get("max_items", 3),
+                    engine=prefs.get("engine", "random"), progress=progress)
+            for (d_idx, m_idx, slot, as_dict), new_items in zip(where, new_meals):
+                plan_cur.set_meal(d_idx - 1, m_idx - 1, FOOD_TABLE.rows_of(new_items),
+                                  slot if as_dict else None)
+                plan_totals().set_meal(d_idx - 1, m_idx - 1, plan_cur.items(d_idx - 1, m_idx - 1))
+                plan_shopping().set_meal(d_idx - 1, m_idx - 1)
 
             st.session_state["active_plan"] = plan_cur
             st.toast("🔄 Plan regenerated (unlocked meals).")
             st.rerun()
 
         # === Day by day render ===
-        NS = "plan_tab"  # namespace za qty/lock ključeve
-
-        for d_idx, day in enumerate(plan, start=1):
-            with st.expander(f"{labels[lang_choice]['day']} {d_idx}"):
-
-                # ---------- TOOLBAR (Regenerate / Reset) ----------
-                with st.container():
-                    c_reg, c_rst = st.columns(
-                        [1, 1], vertical_alignment="bottom")
-
-                    with c_reg:
-                        if st.button("🔁 Regenerate this day", key=f"regen_day_{d_idx}", width="stretch"
-                                     ):
-                            show_loading(
-                                "🔄 Regenerating this day...", wait=1.0)
-                            eff = prefs.get("effective_kcal", 2000)
-                            pp = prefs.get("protein_pct", 0.30)
-                            cp = prefs.get("carbs_pct", 0.40)
-                            fp = prefs.get("fat_pct", 0.30)
-                            total_target = {"kcal": float(eff),
-                                            "p": float(eff * pp / 4.0),
-                                            "c": float(eff * cp / 4.0),
-                                            "f": float(eff * fp / 9.0)}
-                            targets = slot_targets(total_target)
-                            pool_all = st.session_state.get("_POOL", [])
-                            new_day = []
-                            for slot in MEAL_SLOTS:
-                                pool = foods_for_slot(pool_all, slot)
-                                items = build_meal_for_slot(
-                                    pool, targets[slot], slot, max_items_per_meal=prefs["max_items"])
-                                new_day.append({"slot": slot, "items": items})
-                            st.session_state["active_plan"][d_idx - 1] = new_day
-                            st.rerun()
-
-                    with c_rst:
-                        if st.button("🧹 Reset quantities", key=f"reset_qty_day_{d_idx}", width="stretch"
-                                     ):
-                            for m_idx, meal in enumerate(day, start=1):
-                                items = meal.get("items", []) if isinstance(
-                                    meal, dict) else meal
-                                for i_idx, _ in enumerate(items):
-                                    st.session_state.pop(
-                                        f"{NS}_qty_{d_idx}_{m_idx}_{i_idx}", None)
-                            st.rerun()
-
-                # ---------- Meals for the day ----------
-                for m_idx, meal in enumerate(day, start=1):
-                    if isinstance(meal, dict):
-                        slot = meal.get(
-                            "slot", MEAL_SLOTS[(m_idx - 1) % len(MEAL_SLOTS)])
-                        items = meal.get("items", [])
-                    else:
-                        slot = MEAL_SLOTS[(m_idx - 1) % len(MEAL_SLOTS)]
-                        items = meal
-
-                    LBL = SLOT_LABELS[st.session_state.get("LANG", "EN")]
-                    st.markdown(f"**{LBL.get(slot, slot.title())}**")
-
-                    st.markdown(
-                        render_meal_card(
-                            items, m_idx, lang=lang_choice, d_idx=d_idx),
-                        unsafe_allow_html=True
-                    )
-
-                    for i_idx, item in enumerate(items):
-                        qkey = f"{NS}_qty_{d_idx}_{m_idx}_{i_idx}"
-                        current = float(st.session_state.get(qkey, 1.0))
-
-                        c1, c2, c3 = st.columns(
-                            [1, 1, 6], vertical_alignment="center")
-
-                        with c1:
-                            if st.button("\u2212", key=f"{NS}_btn_dec_{d_idx}_{m_idx}_{i_idx}", type="secondary"):
-                                st.session_state[qkey] = max(
-                                    0.5, current - 0.5)
-                                st.rerun()
-
-                        with c2:
-                            if st.button("\uFF0B", key=f"{NS}_btn_plus_{d_idx}_{m_idx}_{i_idx}", type="secondary"):
-                                st.session_state[qkey] = current + 0.5
-                                st.rerun()
-
-                        with c3:
-                            pool_all = st.session_state.get("_POOL", [])
-                            slot_pool = foods_for_slot(pool_all, slot)
-                            sugs = suggest_swaps(item, slot_pool) or []
-
-                            st.caption(
-                                f"{item.get('name', '?')} × {st.session_state.get(qkey, 1.0)}")
-
-                            if sugs:
-                                sel_label = "Suggest swap" if lang_choice == "EN" else "Predlog zamene"
-                                alt_names = ["—"] + \
-                                    [a.get("name", "") for a in sugs]
-                                sel_alt = st.selectbox(
-                                    sel_label, alt_names, key=f"suggest_{d_idx}_{m_idx}_{i_idx}")
-
-                                if sel_alt != "—":
-                                    new_item = next(a for a in sugs if a.get(
-                                        "name", "") == sel_alt)
-                                    qty_now = float(
-                                        st.session_state.get(qkey, 1.0))
-
-                                    base_item = _norm_food(new_item)
-                                    replacement = dict(base_item)
-                                    replacement["macros"] = dict(
-                                        base_item.get("macros", {}))
-                                    replacement["tags"] = list(
-                                        base_item.get("tags", []))
-                                    replacement["group"] = base_item.get(
-                                        "group", item.get("group", ""))
-                                    replacement["portion"] = base_item.get(
-                                        "portion", item.get("portion", 0))
-                                    replacement["unit"] = base_item.get(
-                                        "unit", item.get("unit", ""))
-                                    replacement["portion_g"] = new_item.get(
-                                        "portion_g",
-                                        item.get(
-                                            "portion_g",
-                                            item.get("portion", replacement.get("portion", 0))
-                                        )
-                                    )
-
-                                    if isinstance(st.session_state["active_plan"][d_idx-1][m_idx-1], dict):
-                                        st.session_state["active_plan"][d_idx-1][m_idx-1]["items"][i_idx] = replacement
-                                    else:
-                                        st.session_state["active_plan"][d_idx-1][m_idx-1][i_idx] = replacement
-
-                                    st.session_state[qkey] = qty_now
-                                    st.toast("✨ Swapped" if lang_choice ==
-                                             "EN" else "✨ Zamenjeno")
-                                    st.rerun()
-
-                    # kontrole za jedan obrok (lock / regenerate)
-                    ctrl_cols = st.columns([1, 1, 2])
-                    lock_key = f"{NS}_lock_{d_idx}_{m_idx}"
-                    regen_key = f"{NS}_regen_{d_idx}_{m_idx}"
-
-                    with ctrl_cols[0]:
-                        st.checkbox(L("lock"), key=lock_key,
-                                    value=st.session_state.get(lock_key, False))
-
-                    with ctrl_cols[1]:
-                        if st.button(L("regenerate"), key=regen_key):
-                            if not st.session_state.get(lock_key, False):
-                                pool_all = st.session_state.get("_POOL", [])
-                                slot_pool = foods_for_slot(pool_all, slot)
-
-                                total_target = st.session_state.get("_MACROS", {}).get("target", {
-                                    "kcal": float(prefs.get("effective_kcal", 2000)),
-                                    "p": float(prefs.get("effective_kcal", 2000) * prefs.get("protein_pct", 0.30) / 4.0),
-                                    "c": float(prefs.get("effective_kcal", 2000) * prefs.get("carbs_pct", 0.40) / 4.0),
-                                    "f": float(prefs.get("effective_kcal", 2000) * prefs.get("fat_pct", 0.30) / 9.0),
-                                })
-                                tgt = scale_macros(
-                                    total_target, SLOT_DISTRIB.get(slot, 0.25))
-
-                                new_meal = build_meal_for_slot(
-                                    slot_pool, tgt, slot, max_items_per_meal=prefs.get(
-                                        "max_items", 3)
-                                )
-
-                                if new_meal:
-                                    if isinstance(st.session_state["active_plan"][d_idx-1][m_idx-1], dict):
-                                        st.session_state["active_plan"][d_idx-1][m_idx-1] = {
-                                            "slot": slot, "items": new_meal}
-                                    else:
-                                        st.session_state["active_plan"][d_idx -
-                                                                        1][m_idx-1] = new_meal
-
-                                    st.toast(
-                                        "🔁 Meal regenerated" if lang_choice == "EN" else "🔁 Obrok regenerisan")
-                                    st.rerun()
-                            else:
-                                st.warning(L("locked_warn"))
-
-                # === Day summary (posle svih obroka; 1× po danu) ===
-                if show_charts:
-                    kcal_d, P_d, C_d, F_d = day_totals(day, d_idx=d_idx)
-                    title_pc = ("Day {0} summary".format(
-                        d_idx) if lang_choice == "EN" else f"Dan {d_idx} — sažetak")
-                    render_summary(kcal_d, P_d, C_d, F_d, title=title_pc,
-                                   lang=lang_choice, show_donut=True)
+        with PROFILER.stage("plan days"):
+            for d_idx in range(1, len(plan) + 1):
+                with st.expander(f"{labels[lang_choice]['day']} {d_idx}"):
+                    render_plan_day(d_idx, show_charts)
 
         # === Whole plan summary (jednom, posle svih dana) ===
         if show_charts:
-            plan_kcal = plan_P = plan_C = plan_F = 0
-            for d_i, dday in enumerate(plan, start=1):
-                k, p, c, f = day_totals(dday, d_idx=d_i)
-                plan_kcal += k
-                plan_P += p
-                plan_C += c
-                plan_F += f
-
-            ttl_title = ("Whole plan summary" if lang_choice ==
-                         "EN" else "Sažetak celog plana")
-            render_summary(plan_kcal, plan_P, plan_C, plan_F,
-                           title=ttl_title, lang=lang_choice, show_donut=True)
+            render_plan_summary()
 
 
 # === Shopping List (aggregated) ===
-with st.expander(L("shopping_list"), expanded=False):
+@st.fragment
+def render_shopping_list():
+    """Shopping list expander body (a fragment, see _refresh_button).
+
+    Expanders render their body even when collapsed, so the table is
+    behind a toggle: entries() and the dataframe are only built while it
+    is on. The CSV is built on download.
+    """
     plan_now = st.session_state.get("active_plan", [])
-    if plan_now:
-        rows = []
-        NS = "plan_tab"
-        for d_idx, day in enumerate(plan_now, start=1):
-            for m_idx, meal in enumerate(day, start=1):
-                items = meal.get("items", []) if isinstance(
-                    meal, dict) else meal
-                for i_idx, it in enumerate(items):
-                    qkey = f"{NS}_qty_{d_idx}_{m_idx}_{i_idx}"
-                    q = float(st.session_state.get(qkey, 1.0))
-                    pg = float(
-                        it.get("portion_g", it.get("portion", 0)) or 0.0)
-                    rows.append({"name": it.get("name", "Item"),
-                                "qty": q, "grams": pg * q})
-        if rows:
-            df = pd.DataFrame(rows).groupby("name", as_index=False).agg(
-                {"qty": "sum", "grams": "sum"})
-            df["qty"] = df["qty"].round(2)
-            df["grams"] = df["grams"].round(0).astype(int)
-            df["kg"] = (df["grams"] / 1000.0).round(2)
-            df = df.sort_values("name")
-
-            _lang = st.session_state.get("LANG", "EN")
-            df_disp = df.rename(columns={
-                "name": "Item" if _lang == "EN" else "Namirnica",
-                "qty":  "Qty" if _lang == "EN" else "Količina",
-                "grams": "Grams" if _lang == "EN" else "Grami",
-                "kg":   "Kg" if _lang == "EN" else "Kg"
-            })
-            st.dataframe(df_disp, width="stretch"
-                         )
-
-            csv = df_disp.to_csv(index=False).encode("utf-8")
-            st.download_button(label=L("download_shopping"),
-                               data=csv, file_name="shopping_list.csv",
-                               mime="text/csv", key="dl_shop_csv",
-                               width="stretch"
-                               )
-
-            total_items = len(df_disp)
-            total_kg = float(df["kg"].sum())
-            st.caption((f"Total items: {total_items} • Approx. weight: {total_kg:.2f} kg")
-                       if _lang == "EN" else f"Ukupno stavki: {total_items} • Približno: {total_kg:.2f} kg")
-        else:
-            st.caption(L("no_items_yet"))
-    else:
+    if not plan_now:
         st.caption(L("no_items_yet"))
+        return
+    _lang = st.session_state.get("LANG", "EN")
+    header = ("Item", "Qty", "Grams", "Kg") if _lang == "EN" else \
+        ("Namirnica", "Količina", "Grami", "Kg")
+    # zbir po namirnici se održava deltama (plan_shopping); ovde se samo čita
+    shop = plan_shopping()
+    if st.toggle(L("show_shopping_table"), key="shop_show_table"):
+        _refresh_button("refresh_shopping")
+        with PROFILER.stage("shopping list"):
+            entries = shop.entries()
+        if not entries:
+            st.caption(L("no_items_yet"))
+            return
+        st.dataframe({h: [e[j] for e in entries] for j, h in enumerate(header)},
+                     width="stretch")
+        total_items = len(entries)
+        total_kg = sum(e[3] for e in entries)
+        st.caption((f"Total items: {total_items} • Approx. weight: {total_kg:.2f} kg")
+                   if _lang == "EN" else f"Ukupno stavki: {total_items} • Približno: {total_kg:.2f} kg")
+
+    st.download_button(label=L("download_shopping"),
+                       data=lambda: shop.to_csv(header).encode("utf-8"),
+                       file_name="shopping_list.csv",
+                       mime="text/csv", key="dl_shop_csv",
+                       width="stretch"
+                       )
+
+
+with st.expander(L("shopping_list"), expanded=False):
+    render_shopping_list()
 
 st.info(L("tip"))
 
+
+def render_profiler_panel(prof):
+    """Debug expander with this run's stage timings (and snapshots)."""
+    prof.finish()
+    with st.expander(f"🛠 Profiler — {1000 * prof.total:.0f} ms this run", expanded=False):
+        rows = prof.rows()
+        st.dataframe({"Stage": [r[0] for r in rows], "Calls": [r[1] for r in rows],
+                      "ms": [round(r[2], 1) for r in rows],
+                      "% of run": [round(r[3], 1) for r in rows]}, width="stretch")
+        st.caption("Nested stages are counted in both; fragment reruns aren't included.")
+        if prof.cprofile_refused:
+            st.caption("Another profiler is active in this process; no cProfile snapshot.")
+        if prof.memory_refused:
+            st.caption("tracemalloc is already tracing (another run?); no memory snapshot.")
+        top = prof.memory_top()
+        if top:
+            st.caption(f"tracemalloc peak: {prof.raw()['memory_peak_kib']:.0f} KiB")
+            st.dataframe({"Where": [t[0] for t in top], "KiB": [round(t[1], 1) for t in top],
+                          "Blocks": [t[2] for t in top]}, width="stretch")
+        text = prof.cprofile_text()
+        if text:
+            st.code(text, language=None)
+        st.download_button("⬇️ Raw stats (JSON)", data=prof.to_json(), file_name="profile.json",
+                           mime="application/json", key="dl_profile_json")
+        if text:
+            st.download_button("⬇️ cProfile (.prof)", data=prof.cprofile_bytes(),
+                               file_name="profile.prof", mime="application/octet-stream",
+                               key="dl_profile_prof")
+
+
+if PROFILER.enabled:
+    render_profiler_panel(PROFILER)
+
 # --- Auto-save current preferences ---
 prefs["effective_kcal"] = st.session_state.get(
     "effective_kcal", prefs.get("effective_kcal", prefs.get("kcal", base_kcal)))
@@ -0,0 +1,288 @@
+# benchmarks/bench.py — micro-benchmarks of the planning hot paths
+#
+#   python -m benchmarks.bench                      # foods.json + 1k/10k/100k
+#   python -m benchmarks.bench --catalogs foods,1k --out bench.json
+#   python -m benchmarks.bench --save-baseline      # pre izmene, na ovoj mašini
+#   python -m benchmarks.bench --compare benchmarks/baseline.json
+#
+# Sintetički katalozi su namirnice iz foods.json sa pomerenim makroima i
+# izmešanim tagovima (isti seed => isti katalog), da bi indeksi imali posla.
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from mealplan import (CATALOG_EXT, CompactPlan, FilterIndex, FoodTable, MappedFoodTable,
+                      PlanShopping, Planner, PlanTotals, ShoppingList, SwapIndex, load_foods,
+                      plan_targets, write_catalog)
+
+FOODS_PATH = os.path.join("data", "foods.json")
+# lokalni fajl (u .gitignore): vremena važe samo za mašinu na kojoj su snimljena
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+
+CATALOG_SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+# (dani, obroka, stavki) — najveći je 14 x 6 x 5
+PLAN_SIZES = ((7, 3, 3), (14, 6, 5))
+
+# ćelije (parova hrane) iznad kojih se SwapIndex za ceo katalog preskače
+SWAP_MAX_CELLS = 2e8
+
+
+def synthetic_foods(base, n, seed=0):
+    """``n`` foods derived from ``base``: jittered macros, shuffled tags."""
+    rng = np.random.default_rng(seed)
+    tags = sorted({t for f in base for t in f.get("tags", [])})
+    out = []
+    for i in range(n):
+        src = base[i % len(base)]
+        scale = float(rng.uniform(0.7, 1.3))
+        macros = {k: round(float(v) * scale * float(rng.uniform(0.9, 1.1)), 1)
+                  for k, v in (src.get("macros") or {}).items()}
+        extra = list(rng.choice(tags, size=int(rng.integers(0, 3)), replace=False))
+        out.append(dict(src, name=f"{src['name']} #{i}", macros=macros,
+                        tags=sorted(set(src.get("tags", [])) | set(extra))))
+    return out
+
+
+def prefs_for(days=7, meals=3, max_items=3, kcal=2000.0):
+    return {"days": days, "meals": meals, "max_items": max_items, "effective_kcal": kcal,
+            "protein_pct": 0.30, "carbs_pct": 0.40, "fat_pct": 0.30, "diet": "omnivore",
+            "exclude_tags": [], "exclude_groups": [], "dislikes": ""}
+
+
+def random_plan(table, days, meals, items, seed=0):
+    """CompactPlan of random rows (shape only matters for totals/shopping)."""
+    rng = np.random.default_rng(seed)
+    n_meals = days * meals
+    rows = rng.integers(0, len(table), n_meals * items)
+    qty = rng.choice([0.5, 1.0, 1.5, 2.0], size=len(rows))
+    meal_ptr = np.arange(n_meals + 1) * items
+    day_ptr = np.arange(days + 1) * meals
+    return CompactPlan(table, rows, qty, meal_ptr, day_ptr, np.zeros(n_meals))
+
+
+def measure(fn, repeat=5, min_time=0.05, setup=None, single=1.0):
+    """Min / median ms per call over ``repeat`` rounds; fast calls are
+    looped until a round takes ``min_time`` seconds, and a call slower than
+    ``single`` seconds is timed just once (100k-food plans)."""
+    if setup is not None:
+        setup()
+    t0 = time.perf_counter()
+    fn()
+    first = time.perf_counter() - t0
+    if first >= single:
+        return {"min_ms": 1000.0 * first, "median_ms": 1000.0 * first, "loops": 1, "rounds": 1}
+    loops = max(1, int(min_time / first)) if first > 0 else 1000
+    times = []
+    for _ in range(repeat):
+        total = 0.0
+        for _ in range(loops):
+            if setup is not None:
+                setup()
+            t0 = time.perf_counter()
+            fn()
+            total += time.perf_counter() - t0
+        times.append(1000.0 * total / loops)
+    return {"min_ms": min(times), "median_ms": statistics.median(times), "loops": loops,
+            "rounds": repeat}
+
+
+def bench_catalog(name, foods, repeat, plans, with_exact):
+    """All cases for one catalog; yields result dicts."""
+    n = len(foods)
+    info = {"catalog": name, "foods": n}
+
+    def case(label, fn, plan=None, setup=None):
+        res = measure(fn, repeat=repeat, setup=setup)
+        row = dict(info, case=label, plan=plan, **res)
+        print(f"  {label:<34} {plan or '':<8} {res['median_ms']:>10.3f} ms", file=sys.stderr)
+        return row
+
+    yield case("food_table_build", lambda: FoodTable(foods))
+    table = FoodTable(foods)
+    yield case("filter_index_build", lambda: FilterIndex(table))
+    # isti katalog kompajliran (.mpcat): otvaranje preko mmap-a + indeks nad njim
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_catalog(table, os.path.join(tmp, "foods" + CATALOG_EXT))
+        yield case("catalog_open[mpcat]", lambda: MappedFoodTable(path))
+        mapped = MappedFoodTable(path)
+        yield case("filter_index_build[mpcat]", lambda: FilterIndex(mapped))
+    # isti put kao app.py: Planner nad tabelom (u istom procesu)
+    planner = Planner(table)
+    index = planner.filters
+
+    def cold():
+        index._memo.clear()
+    yield case("filter_by_diet", lambda: planner.filter_by_diet(planner.foods, "vegetarian"),
+               setup=cold)
+    yield case("filter_by_diet[memo]",
+               lambda: planner.filter_by_diet(planner.foods, "vegetarian"))
+    yield case("filter_dislikes", lambda: index.dislikes.rows("jaja, pavlaka, tuna"),
+               setup=lambda: index.dislikes._memo.clear())
+
+    tg = plan_targets(prefs_for())
+    rng = np.random.default_rng(1)
+    pool = index.pool(np.ones(n, dtype=bool))
+    yield case("build_meal", lambda: planner.build_meal(pool, tg, 3, rng=rng))
+
+    lunch = pool.for_slot("lunch")
+    slot_tg = {k: v * 0.35 for k, v in plan_targets(prefs_for(meals=1)).items()
+               if k in ("kcal", "p", "c", "f")}
+    yield case("build_meal_for_slot",
+               lambda: planner.build_meal_for_slot(lunch, slot_tg, "lunch", 3, rng=rng))
+    if with_exact:
+        yield case("build_meal_for_slot[exact]", lambda: planner.build_meal_for_slot(
+            lunch, slot_tg, "lunch", 3, engine="exact"))
+
+    for days, meals, items in plans:
+        shape = f"{days}x{meals}x{items}"
+        prefs = prefs_for(days, meals, items)
+        yield case("generate_plan", lambda: planner.generate_plan(
+            planner.foods, days, prefs, seed=7), plan=shape)
+
+        plan = random_plan(table, days, meals, items)
+        nested = list(plan)
+        yield case("day_totals[build]", lambda: PlanTotals(nested, qty=plan.qty_of), plan=shape)
+        totals = PlanTotals(nested, qty=plan.qty_of)
+        yield case("day_totals[set_qty]", lambda: totals.set_qty(0, 0, 0, 1.5), plan=shape)
+        yield case("shopping[build]", lambda: PlanShopping(plan).entries(), plan=shape)
+        shop = PlanShopping(plan)
+        yield case("shopping[set_qty]", lambda: shop.set_qty(0, 0, 0, 1.5), plan=shape)
+        others = [random_plan(table, days, meals, items, seed=s) for s in range(4)]
+        yield case("shopping[merge 4 plans]",
+                   lambda: ShoppingList.of_plans(table, others).entries(), plan=shape)
+
+    if float(n) * n <= SWAP_MAX_CELLS:
+        yield case("suggest_swaps[index build]", lambda: SwapIndex(pool))
+    if float(len(lunch)) ** 2 > SWAP_MAX_CELLS:
+        print(f"  suggest_swaps skipped: {len(lunch)}-food slot pool", file=sys.stderr)
+    else:
+        item = lunch[0]
+        outside = dict(item, name="benchmark item", kcal=123)
+        planner.suggest_swaps(item, lunch)     # indeks slota se gradi jednom
+        yield case("suggest_swaps[lookup]", lambda: planner.suggest_swaps(item, lunch))
+        yield case("suggest_swaps[new item]", lambda: planner.suggest_swaps(outside, lunch))
+
+
+def run(catalogs, repeat=5, plans=PLAN_SIZES, exact_max=1_000):
+    base = load_foods(FOODS_PATH)
+    results = []
+    for name in catalogs:
+        foods = base if name == "foods" else synthetic_foods(base, CATALOG_SIZES[name])
+        print(f"{name} ({len(foods)} foods)", file=sys.stderr)
+        results.extend(bench_catalog(name, foods, repeat, plans, len(foods) <= exact_max))
+    return {
+        "meta": dict(environment(),
+                     created=datetime.now(timezone.utc).isoformat(timespec="seconds")),
+        "results": results,
+    }
+
+
+def environment():
+    """What a stored run's timings depend on (the ``meta`` of results)."""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def meta_mismatch(baseline, env=None):
+    """``[(key, baseline value, current value)]`` where the baseline was
+    recorded in a different environment (missing keys count too)."""
+    env = environment() if env is None else env
+    meta = baseline.get("meta") or {}
+    return [(k, meta.get(k), v) for k, v in env.items() if meta.get(k) != v]
+
+
+def _key(row):
+    return (row["case"], row["catalog"], row.get("plan"))
+
+
+def compare(current, baseline, threshold=1.25, min_delta=0.05):
+    """Rows of ``(key, base ms, now ms, ratio, slower)`` over the cases both
+    runs have, on the median round. A case is slower only when both its
+    median and its best round are above ``threshold`` and the median lost at
+    least ``min_delta`` ms: one noisy round or a microsecond case jittering
+    by 30% is not a regression."""
+    base = {_key(r): r for r in baseline["results"]}
+    out = []
+    for row in current["results"]:
+        ref = base.get(_key(row))
+        if ref is None:
+            continue
+        old, new = ref["median_ms"], row["median_ms"]
+        ratio = new / max(old, 1e-9)
+        best = row["min_ms"] / max(ref["min_ms"], 1e-9)
+        slow = ratio > threshold and best > threshold and new - old >= min_delta
+        out.append((_key(row), old, new, ratio, slow))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Planning core micro-benchmarks")
+    ap.add_argument("--catalogs", default="foods,1k,10k,100k",
+                    help="comma-separated: foods, 1k, 10k, 100k")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--out", help="write results JSON here (default: stdout)")
+    ap.add_argument("--compare", metavar="BASELINE",
+                    help="compare against a stored results JSON; exit 1 on regressions")
+    ap.add_argument("--threshold", type=float, default=1.25,
+                    help="time ratio counted as a regression (default 1.25)")
+    ap.add_argument("--min-delta", type=float, default=0.05,
+                    help="ignore slowdowns smaller than this many ms (default 0.05)")
+    ap.add_argument("--save-baseline", action="store_true",
+                    help=f"also write the results to {BASELINE_PATH} (local, not committed)")
+    args = ap.parse_args(argv)
+
+    catalogs = [c.strip() for c in args.catalogs.split(",") if c.strip()]
+    unknown = [c for c in catalogs if c != "foods" and c not in CATALOG_SIZES]
+    if unknown:
+        ap.error(f"unknown catalogs: {', '.join(unknown)}")
+
+    current = run(catalogs, repeat=args.repeat)
+    text = json.dumps(current, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text)
+    elif not args.compare:
+        print(text)
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            f.write(text)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        diff = meta_mismatch(baseline, {k: current["meta"][k] for k in environment()})
+        if diff:
+            # tuđa mašina / verzije: razlike u vremenu ne znače regresiju
+            print(f"warning: {args.compare} was recorded in another environment; "
+                  "record a baseline on this machine (--out) before trusting the ratios",
+                  file=sys.stderr)
+            for k, old, new in diff:
+                print(f"  {k}: {old} -> {new}", file=sys.stderr)
+        rows = compare(current, baseline, args.threshold, args.min_delta)
+        bad = 0
+        for (case, catalog, plan), base_ms, now_ms, ratio, slow in rows:
+            bad += slow
+            flag = "  REGRESSION" if slow else ""
+            print(f"{catalog:<6} {case:<34} {plan or '':<8} {base_ms:>10.3f} -> "
+                  f"{now_ms:>10.3f} ms  x{ratio:.2f}{flag}")
+        print(f"{len(rows)} compared, {bad} slower than x{args.threshold:.2f}")
+        return 1 if bad else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+# benchmarks/loadtest.py — latency of the local plan service under load
+#
+#   python -m mealplan.service --workers auto &
+#   python -m benchmarks.loadtest --concurrency 16 --requests 400
+#   python -m benchmarks.loadtest --spawn --workers 4 --endpoint meal,swaps
+#
+# Svaki klijent drži jednu keep-alive vezu i šalje zahteve jedan za drugim;
+# --concurrency je broj istovremenih klijenata.
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+PREFS = {"days": 7, "meals": 3, "base_kcal": 2000, "diet": "omnivore", "profile": "maintain",
+         "max_items": 3, "dislikes": "eggs"}
+DIETS = ("omnivore", "vegetarian", "vegan", "gluten-free")
+SLOTS = ("breakfast", "lunch", "snack", "dinner")
+
+
+def make_payloads(endpoint, rng, names):
+    """Request body for ``endpoint`` with varied prefs (so the plan cache
+    only helps as much as it would for real clients)."""
+    prefs = dict(PREFS, diet=rng.choice(DIETS), base_kcal=rng.randrange(1500, 3001, 50))
+    if endpoint == "plan":
+        return {"prefs": prefs, "seed": rng.randrange(1 << 31)}
+    if endpoint == "meal":
+        return {"prefs": prefs, "slot": rng.choice(SLOTS)}
+    if endpoint == "swaps":
+        return {"prefs": dict(prefs, diet="omnivore"), "item": rng.choice(names),
+                "slot": rng.choice(SLOTS)}
+    if endpoint == "shopping":
+        return {"plan": [[rng.sample(names, 3) for _ in range(3)] for _ in range(7)]}
+    raise ValueError(f"unknown endpoint: {endpoint}")
+
+
+async def _request(reader, writer, host, path, body):
+    data = json.dumps(body).encode("utf-8")
+    writer.write((f"POST {path} HTTP/1.1\r\nHost: {host}\r\n"
+                  "Content-Type: application/json\r\n"
+                  f"Content-Length: {len(data)}\r\n\r\n").encode("latin-1") + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, jobs, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while jobs:
+            path, body = jobs.pop()
+            t0 = time.perf_counter()
+            status = await _request(reader, writer, host, path, body)
+            latencies.setdefault(path, []).append(1000.0 * (time.perf_counter() - t0))
+            if status != 200:
+                errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def _call(host, port, method, path, body=None):
+    """One request on its own connection; returns the decoded JSON body."""
+    async def call():
+        reader, writer = await asyncio.open_connection(host, port)
+        data = b"" if body is None else json.dumps(body).encode("utf-8")
+        writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n"
+                      f"Content-Length: {len(data)}\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+        raw = await reader.read()
+        writer.close()
+        return json.loads(raw.split(b"\r\n\r\n", 1)[1])
+    return asyncio.run(call())
+
+
+def sample_names(host, port):
+    """Food names for swaps/shopping requests, from one plan of the service
+    (it has no catalog listing)."""
+    plan = _call(host, port, "POST", "/plan", {"prefs": PREFS, "seed": 1})["plan"]
+    return sorted({it["name"] for day in plan for meal in day for it in meal})
+
+
+def percentile(values, q):
+    """``q``-th percentile (0-100), nearest rank."""
+    values = sorted(values)
+    k = max(0, min(len(values) - 1, -(-len(values) * q // 100) - 1))
+    return values[int(k)]
+
+
+def summary(latencies, elapsed):
+    rows = []
+    for path, ms in sorted(latencies.items()):
+        rows.append({"endpoint": path, "requests": len(ms),
+                     "p50_ms": percentile(ms, 50), "p90_ms": percentile(ms, 90),
+                     "p99_ms": percentile(ms, 99), "max_ms": max(ms),
+                     "mean_ms": statistics.fmean(ms)})
+    total = sum(len(ms) for ms in latencies.values())
+    return {"requests": total, "seconds": elapsed,
+            "rps": total / elapsed if elapsed > 0 else 0.0, "endpoints": rows}
+
+
+async def run(host, port, endpoints, n_requests, concurrency, seed=0, names=()):
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n_requests):
+        endpoint = endpoints[i % len(endpoints)]
+        jobs.append((f"/{endpoint}", make_payloads(endpoint, rng, names)))
+    jobs.reverse()
+    latencies, errors = {}, {}
+    t0 = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, jobs, latencies, errors)
+                           for _ in range(concurrency)))
+    out = summary(latencies, time.perf_counter() - t0)
+    out["errors"] = errors
+    return out
+
+
+def _wait_ready(host, port, proc, timeout=60.0):
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if proc.poll() is not None:
+            raise SystemExit("service exited during startup")
+        try:
+            return _call(host, port, "GET", "/health")
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("service did not start in time")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Load test of the local plan service")
+    ap.add_argument("--url", default="http://127.0.0.1:8765")
+    ap.add_argument("--endpoint", default="plan,meal,swaps,shopping",
+                    help="comma-separated mix of: plan, meal, swaps, shopping")
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--spawn", action="store_true",
+                    help="start `python -m mealplan.service` on the URL's port for the run")
+    ap.add_argument("--workers", default="auto", help="worker processes for --spawn")
+    ap.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = ap.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname or "127.0.0.1", url.port or 80
+    endpoints = [e.strip() for e in args.endpoint.split(",") if e.strip()]
+    proc = None
+    if args.spawn:
+        proc = subprocess.Popen([sys.executable, "-m", "mealplan.service", "--host", host,
+                                 "--port", str(port), "--workers", args.workers])
+    try:
+        health = _wait_ready(host, port, proc) if proc else _call(host, port, "GET", "/health")
+        res = asyncio.run(run(host, port, endpoints, args.requests, args.concurrency,
+                              args.seed, sample_names(host, port)))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    res.update(concurrency=args.concurrency, service=health)
+    if args.json:
+        print(json.dumps(res, indent=2))
+        return 1 if res["errors"] else 0
+    print(f"{res['requests']} requests, concurrency {args.concurrency}, "
+          f"{health['workers']} workers, {health['foods']} foods: "
+          f"{res['rps']:.1f} req/s over {res['seconds']:.1f} s")
+    for row in res["endpoints"]:
+        print(f"  {row['endpoint']:<10} n={row['requests']:<5} p50 {row['p50_ms']:8.1f} ms  "
+              f"p90 {row['p90_ms']:8.1f} ms  p99 {row['p99_ms']:8.1f} ms  "
+              f"max {row['max_ms']:8.1f} ms")
+    if res["errors"]:
+        print(f"  non-200 responses: {res['errors']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
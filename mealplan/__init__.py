@@ -0,0 +1,130 @@
+"""Planning core for the Meal Plan Generator (no Streamlit imports here).
+
+Names are loaded lazily: ``import mealplan`` only reads this file, and the
+submodule (with NumPy) is imported the first time one of its names is used.
+"""
+
+import importlib
+
+# podmodul -> imena koja paket izvozi
+_EXPORTS = {
+    "table": ("MACRO_KEYS", "SCORE_WEIGHTS", "FoodTable", "item_macros", "score_totals",
+              "target_vector"),
+    "cache": ("PlanCache", "default_seed", "normalize_prefs", "plan_key"),
+    "catalog": ("CATALOG_EXT", "MEAL_SLOTS", "CatalogFoods", "MappedFoodTable", "catalog_path",
+                "compile_catalog", "is_fresh", "load_foods", "load_table", "normalize_food",
+                "write_catalog"),
+    "charts": ("bars_svg", "chart_cache_info", "donut_svg", "pie_svg", "trend_svg"),
+    "dislikes": ("SR_TERMS", "SR_WORDS", "DislikeMatcher", "dislike_tokens", "expand_token", "fold",
+                 "fold_names"),
+    "exact": ("exact_meal_rows",),
+    "filters": ("DIET_RULES", "QUICK_FILTERS", "FilterIndex", "FoodPool"),
+    "live": ("LiveCatalog",),
+    "parallel": ("build_days", "build_slot_meals", "get_executor", "parse_workers",
+                 "shutdown_executor", "workers_from_env"),
+    "plan": ("CompactPlan",),
+    "planner": ("PROFILE_MACROS", "PROTEIN_GROUPS", "SLOT_DISTRIB", "SLOT_KCAL_RANGE",
+                "WARM_SWAPS_MAX", "Planner", "deferred_html", "foods_for_slot", "macro_targets",
+                "plan_targets", "scale_macros", "slot_targets"),
+    "profiler": ("StageProfiler",),
+    "rng": ("as_generator", "as_random", "new_seed", "sub_seed", "task_rng"),
+    "search": ("best_day_rows", "best_meal_rows", "meal_scores", "sample_meals",
+               "slot_meal_rows"),
+    "shopping": ("PlanShopping", "ShoppingList"),
+    "swaps": ("SwapIndex", "food_features", "food_kcal", "swap_index"),
+    "totals": ("PlanTotals", "meal_items"),
+}
+_MODULE_OF = {name: mod for mod, names in _EXPORTS.items() for name in names}
+
+__all__ = [
+    "CATALOG_EXT",
+    "DIET_RULES",
+    "MACRO_KEYS",
+    "MEAL_SLOTS",
+    "PROFILE_MACROS",
+    "PROTEIN_GROUPS",
+    "QUICK_FILTERS",
+    "SCORE_WEIGHTS",
+    "SLOT_DISTRIB",
+    "SLOT_KCAL_RANGE",
+    "SR_TERMS",
+    "SR_WORDS",
+    "WARM_SWAPS_MAX",
+    "CatalogFoods",
+    "CompactPlan",
+    "DislikeMatcher",
+    "FilterIndex",
+    "FoodPool",
+    "FoodTable",
+    "LiveCatalog",
+    "MappedFoodTable",
+    "PlanCache",
+    "PlanShopping",
+    "PlanTotals",
+    "Planner",
+    "ShoppingList",
+    "StageProfiler",
+    "SwapIndex",
+    "as_generator",
+    "as_random",
+    "bars_svg",
+    "best_day_rows",
+    "best_meal_rows",
+    "build_days",
+    "build_slot_meals",
+    "catalog_path",
+    "chart_cache_info",
+    "compile_catalog",
+    "default_seed",
+    "deferred_html",
+    "dislike_tokens",
+    "donut_svg",
+    "exact_meal_rows",
+    "expand_token",
+    "fold",
+    "fold_names",
+    "food_features",
+    "food_kcal",
+    "foods_for_slot",
+    "get_executor",
+    "is_fresh",
+    "item_macros",
+    "load_foods",
+    "load_table",
+    "macro_targets",
+    "meal_items",
+    "meal_scores",
+    "new_seed",
+    "normalize_food",
+    "normalize_prefs",
+    "parse_workers",
+    "pie_svg",
+    "plan_key",
+    "plan_targets",
+    "sample_meals",
+    "scale_macros",
+    "score_totals",
+    "shutdown_executor",
+    "slot_meal_rows",
+    "slot_targets",
+    "sub_seed",
+    "swap_index",
+    "target_vector",
+    "task_rng",
+    "trend_svg",
+    "workers_from_env",
+    "write_catalog",
+]
+
+
+def __getattr__(name):
+    mod = _MODULE_OF.get(name)
+    if mod is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{mod}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
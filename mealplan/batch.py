@@ -0,0 +1,341 @@
+# mealplan/batch.py — generate plans for a whole roster of client profiles
+#
+#   python -m mealplan.batch roster.jsonl --out batch_out --workers auto
+#   python -m mealplan.batch roster.csv --out batch_out --no-html
+#
+# Izlaz (--out): results.jsonl (jedan red po profilu, dopisuje se čim je plan
+# gotov), shopping/<id>.csv i html/<id>.html. Prekinut posao se nastavlja istom
+# komandom: profili koji već imaju red u results.jsonl se preskaču, a oni sa
+# greškom se ponovo pokreću (stari red sa greškom se briše). Id koji se ponovi
+# u rosteru dobija red sa greškom, a ne pravi drugi plan.
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .cache import default_seed
+from .parallel import _mp_context, parse_workers, workers_from_env
+from .plan import CompactPlan
+from .planner import MEAL_SLOTS, PROFILE_MACROS, Planner
+from .shopping import ShoppingList
+
+FOODS_PATH = os.path.join("data", "foods.json")
+RESULTS_NAME = "results.jsonl"
+
+# polja preseta (kao u _write_profiles) i njihove podrazumevane vrednosti
+PROFILE_DEFAULTS = {
+    "days": 7,
+    "base_kcal": 2000,
+    "meals": 3,
+    "diet": "omnivore",
+    "profile": None,
+    "max_items": 3,
+    "engine": "random",
+    "exclude_tags": [],
+    "exclude_groups": [],
+    "dislikes": "",
+    "lang": "EN",
+}
+_INT_FIELDS = ("days", "meals", "max_items")
+_FLOAT_FIELDS = ("base_kcal", "effective_kcal", "protein_pct", "carbs_pct", "fat_pct")
+_LIST_FIELDS = ("exclude_tags", "exclude_groups")
+
+# nazivi profila iz sidebar-a (EN i SR) -> ključ preseta
+_PROFILE_WORDS = {
+    "custom": "custom", "prilagođeno": "custom",
+    "cut": "cut", "deficit": "cut",
+    "maintain": "maintain", "održavanje": "maintain",
+    "bulk": "bulk", "suficit": "bulk",
+}
+
+# planer, izlazni folder i opcije instalirani u svakom worker procesu
+_WORKER = None
+
+
+def _profile_key(value):
+    word = str(value).strip().lower().split(" ")[0]
+    key = _PROFILE_WORDS.get(word)
+    if key is None:
+        raise ValueError(f"unknown profile: {value!r}")
+    return key
+
+
+def _list_field(value):
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    value = str(value or "").strip()
+    if value.startswith("["):
+        return [str(v) for v in json.loads(value)]
+    return [v.strip() for v in re.split(r"[;|]", value) if v.strip()]
+
+
+def profile_prefs(record):
+    """generate_plan prefs of one roster record (the preset fields).
+
+    ``profile`` "cut" / "maintain" / "bulk" (or its sidebar label) sets
+    the macro split and scales ``base_kcal``; "custom", or no profile with
+    ``protein_pct`` / ``carbs_pct`` given, uses the record's own split.
+    ``effective_kcal`` overrides the daily target. Raises ``ValueError``
+    on bad values.
+    """
+    prefs = dict(PROFILE_DEFAULTS)
+    prefs.update({k: v for k, v in record.items() if v is not None and v != ""})
+    for k in _INT_FIELDS:
+        prefs[k] = int(float(prefs[k]))
+    for k in _FLOAT_FIELDS:
+        if k in prefs:
+            prefs[k] = float(prefs[k])
+    for k in _LIST_FIELDS:
+        prefs[k] = _list_field(prefs[k])
+    prefs["dislikes"] = str(prefs["dislikes"])
+
+    profile = prefs["profile"]
+    if profile is None:
+        profile = "custom" if "protein_pct" in prefs or "carbs_pct" in prefs else "maintain"
+    profile = _profile_key(profile)
+    base = prefs["base_kcal"]
+    if profile == "custom":
+        p, c = prefs.get("protein_pct", 0.30), prefs.get("carbs_pct", 0.40)
+        if p + c > 1.0:
+            raise ValueError("protein_pct + carbs_pct must be <= 1")
+        f, kcal = prefs.get("fat_pct", 1.0 - p - c), base
+    else:
+        p, c, f, factor = PROFILE_MACROS[profile]
+        kcal = int(base * factor)
+    prefs.update(profile=profile, protein_pct=p, carbs_pct=c, fat_pct=f,
+                 kcal=base, effective_kcal=prefs.get("effective_kcal", kcal))
+    if prefs["days"] < 1 or prefs["meals"] < 1 or prefs["max_items"] < 1:
+        raise ValueError("days, meals and max_items must be >= 1")
+    return prefs
+
+
+def read_profiles(path):
+    """``(id, record)`` pairs of a roster, read lazily.
+
+    ``.csv`` (one column per field; tags/groups separated by ";"),
+    ``.json`` (the app's presets file: name -> preset, or a list) or
+    JSON Lines. The id is the record's "id" or "name", else its 1-based
+    position.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if ext == ".csv":
+            records = csv.DictReader(f)
+        elif ext == ".json":
+            data = json.load(f)
+            records = ([dict(v, name=k) for k, v in data.items()]
+                       if isinstance(data, dict) else data)
+        else:
+            records = (json.loads(line) for line in f if line.strip())
+        for n, record in enumerate(records, start=1):
+            pid = record.get("id") or record.get("name") or n
+            yield str(pid), record
+
+
+def _file_id(pid):
+    """File name stem of a profile id; unique per id.
+
+    Ids that had to be changed ("a b" -> "a_b") or differ only in case
+    (case-insensitive file systems) get a short hash of the id, so they
+    can't overwrite another profile's files.
+    """
+    name = re.sub(r"[^\w.-]+", "_", pid).strip("._") or "profile"
+    if name != pid.lower():
+        name += "-" + hashlib.sha1(pid.encode("utf-8")).hexdigest()[:8]
+    return name
+
+
+def _write_atomic(path, write):
+    tmp = path + ".part"
+    with open(tmp, "w", encoding="utf-8", newline="") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+def _install_worker(planner, out_dir, html, shopping):
+    global _WORKER
+    _WORKER = (planner, out_dir, html, shopping)
+
+
+def _error_row(pid, e):
+    return {"id": pid, "error": f"{type(e).__name__}: {e}"}
+
+
+def _run_profile(job):
+    """One profile: plan + files on disk; returns its results.jsonl record.
+
+    Any exception (bad record, planning, writing the files) becomes an
+    error row, so one profile can't stop the batch.
+    """
+    try:
+        return _plan_profile(*job)
+    except Exception as e:
+        return _error_row(job[0], e)
+
+
+def _plan_profile(pid, record):
+    planner, out_dir, html, shopping = _WORKER
+    t0 = time.perf_counter()
+    prefs = profile_prefs(record)
+    seed = record.get("seed")
+    seed = default_seed(prefs, planner.table.fingerprint) if seed in (None, "") else int(seed)
+    plan, macros = planner.generate_plan(planner.foods, prefs["days"], prefs, seed=seed)
+
+    out = {"id": pid, "seed": seed, "days": prefs["days"], "meals": prefs["meals"],
+           "effective_kcal": prefs["effective_kcal"]}
+    if macros.get("filters_relaxed"):
+        out["filters_relaxed"] = True
+    out["plan"] = [[[it["name"] for it in meal] for meal in day] for day in plan]
+    out["day_totals"] = [[round(float(v), 1) for v in planner.day_totals(day)] for day in plan]
+    name = _file_id(pid)
+    if shopping:
+        shop = ShoppingList(planner.table).add_plan(
+            CompactPlan.from_nested(planner.table, plan, MEAL_SLOTS))
+        path = os.path.join(out_dir, "shopping", name + ".csv")
+        _write_atomic(path, lambda f: f.write(shop.to_csv()))
+        out["shopping"] = os.path.relpath(path, out_dir)
+    if html:
+        title = f"Meal Plan — {pid} — {prefs['days']} days • {int(prefs['kcal'])} kcal"
+        path = os.path.join(out_dir, "html", name + ".html")
+        _write_atomic(path, lambda f: planner.write_html(plan, macros, title, prefs, f))
+        out["html"] = os.path.relpath(path, out_dir)
+    out["ms"] = round(1000.0 * (time.perf_counter() - t0), 1)
+    return out
+
+
+def done_ids(results_path):
+    """Ids already in results.jsonl (without errors).
+
+    Prepares the file for a resumed run: a last line cut off by an
+    interruption and the error rows (those profiles are retried) are
+    dropped, so every profile ends up with one row.
+    """
+    if not os.path.exists(results_path):
+        return set()
+    with open(results_path, "rb") as f:
+        data = f.read()
+    lines = data.splitlines(keepends=True)
+    done, keep = set(), []
+    for line in lines:
+        try:
+            row = json.loads(line) if line.endswith(b"\n") else None
+        except ValueError:
+            row = None
+        if row is not None and "error" not in row:
+            done.add(str(row["id"]))
+            keep.append(line)
+    if len(keep) < len(lines):
+        tmp = results_path + ".part"
+        with open(tmp, "wb") as f:
+            f.writelines(keep)
+        os.replace(tmp, results_path)
+    return done
+
+
+def _result(fut, pid):
+    # _run_profile ne baca; ovo je pao sam worker (npr. BrokenProcessPool)
+    try:
+        return fut.result()
+    except Exception as e:
+        return _error_row(pid, e)
+
+
+def run(profiles, out_dir, foods_path=FOODS_PATH, workers=0, html=True, shopping=True,
+        window=None, log=sys.stderr):
+    """Generate every profile of ``profiles`` not yet in ``out_dir``.
+
+    Profiles are read lazily and at most ``window`` of them (default 4 per
+    worker) are in flight, so memory doesn't grow with the roster; each
+    result is appended to results.jsonl (and its files written) as soon as
+    it's ready. Returns a summary dict.
+    """
+    for sub in ("shopping", "html"):
+        os.makedirs(os.path.join(out_dir, sub), exist_ok=True)
+    results_path = os.path.join(out_dir, RESULTS_NAME)
+    done = done_ids(results_path)
+    planner = Planner.load(foods_path, workers=0)
+    window = max(1, window or 4 * max(1, workers))
+    stats = {"done": 0, "failed": 0, "skipped": 0}
+
+    def jobs():
+        listed = set()
+        for n, (pid, record) in enumerate(read_profiles(profiles), start=1):
+            if pid in listed:
+                # isti id bi prepisao fajlove i red prvog profila
+                record_row(_error_row(pid, ValueError(f"duplicate id (roster entry {n})")))
+                continue
+            listed.add(pid)
+            if pid in done:
+                stats["skipped"] += 1
+                continue
+            yield pid, record
+
+    t0 = time.perf_counter()
+    with open(results_path, "a", encoding="utf-8") as results:
+        def record_row(row):
+            results.write(json.dumps(row, ensure_ascii=False) + "\n")
+            results.flush()
+            key = "failed" if "error" in row else "done"
+            stats[key] += 1
+            if "error" in row:
+                print(f"{row['id']}: {row['error']}", file=log)
+            n = stats["done"] + stats["failed"]
+            if n % 100 == 0:
+                print(f"{n} plans, {n / (time.perf_counter() - t0):.1f}/s", file=log)
+
+        if workers <= 0:
+            _install_worker(planner, out_dir, html, shopping)
+            for job in jobs():
+                record_row(_run_profile(job))
+        else:
+            # fork: planer (tabela + indeksi) se deli copy-on-write, ne pikluje se
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context(),
+                                     initializer=_install_worker,
+                                     initargs=(planner, out_dir, html, shopping)) as ex:
+                pending = {}    # future -> id
+                for job in jobs():
+                    pending[ex.submit(_run_profile, job)] = job[0]
+                    if len(pending) >= window:
+                        finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for fut in finished:
+                            record_row(_result(fut, pending.pop(fut)))
+                for fut in wait(pending).done:
+                    record_row(_result(fut, pending[fut]))
+
+    elapsed = time.perf_counter() - t0
+    stats.update(seconds=round(elapsed, 3),
+                 plans_per_sec=round(stats["done"] / elapsed, 2) if elapsed > 0 else 0.0)
+    return stats
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate meal plans for a roster of profiles")
+    ap.add_argument("profiles", help="roster file: .jsonl, .csv or the app's presets .json")
+    ap.add_argument("--out", default="batch_out", help="output folder (default: batch_out)")
+    ap.add_argument("--foods", default=FOODS_PATH, help=f"food catalog (default: {FOODS_PATH})")
+    ap.add_argument("--workers", type=parse_workers, default=None,
+                    help="worker processes, a number or 'auto' (default: MEALPLAN_WORKERS)")
+    ap.add_argument("--window", type=int, default=None,
+                    help="profiles in flight at once (default: 4 per worker)")
+    ap.add_argument("--no-html", action="store_true", help="skip the HTML exports")
+    ap.add_argument("--no-shopping", action="store_true", help="skip the shopping lists")
+    args = ap.parse_args(argv)
+
+    workers = workers_from_env() if args.workers is None else args.workers
+
+    stats = run(args.profiles, args.out, foods_path=args.foods, workers=workers,
+                html=not args.no_html, shopping=not args.no_shopping, window=args.window)
+    print(f"{stats['done']} plans in {stats['seconds']:.1f} s "
+          f"({stats['plans_per_sec']:.2f} plans/s), {stats['failed']} failed, "
+          f"{stats['skipped']} already done", file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
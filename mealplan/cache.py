@@ -0,0 +1,121 @@
+# mealplan/cache.py — bounded LRU/TTL cache for generated plans
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+# polja iz prefs koja stvarno utiču na generate_plan (lang, profile... ne)
+PLAN_PREF_KEYS = ("days", "effective_kcal", "meals", "protein_pct", "carbs_pct",
+                  "fat_pct", "diet", "max_items", "engine", "exclude_tags",
+                  "exclude_groups", "dislikes")
+
+
+def normalize_prefs(prefs):
+    """Canonical form of the plan-relevant prefs (order/case/rounding-insensitive)."""
+    out = {}
+    for k in PLAN_PREF_KEYS:
+        v = prefs.get(k)
+        if k in ("protein_pct", "carbs_pct", "fat_pct", "effective_kcal"):
+            v = round(float(v or 0), 4)
+        elif k in ("days", "meals", "max_items"):
+            v = int(v or 0)
+        elif k in ("exclude_tags", "exclude_groups"):
+            v = sorted(str(x) for x in (v or []))
+        elif k == "dislikes":
+            v = sorted({t.strip().lower() for t in str(v or "").split(",") if t.strip()})
+        elif k == "engine":
+            v = v or "random"
+        out[k] = v
+    return out
+
+
+def plan_key(prefs, seed=None, fingerprint=""):
+    """Stable hash of (normalized prefs, seed, catalog fingerprint)."""
+    payload = json.dumps([normalize_prefs(prefs), seed, fingerprint],
+                         sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def default_seed(prefs, fingerprint=""):
+    """Seed used when none is given, derived from the prefs themselves.
+
+    Everyone landing with the same prefs gets the same first plan, so it
+    can be served from the cache.
+    """
+    return int(plan_key(prefs, None, fingerprint)[:15], 16)
+
+
+class PlanCache:
+    """Thread-safe LRU cache with a per-entry time-to-live.
+
+    Eviction policy: an entry expires ``ttl`` seconds after it was stored
+    (checked lazily on access); when the cache holds ``maxsize`` entries
+    the least recently used one is dropped. ``stats()`` reports hits,
+    misses, evictions and expirations.
+    """
+
+    def __init__(self, maxsize=256, ttl=3600.0, clock=time.monotonic):
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expired = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                stored, value = entry
+                if self.ttl is None or self._clock() - stored <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expired += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """Cached value for ``key``, calling ``factory()`` on a miss.
+
+        The factory runs outside the lock, so two concurrent misses on the
+        same key may both compute; the last one wins.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "expired": self.expired,
+            }
@@ -0,0 +1,379 @@
+# mealplan/catalog.py — food catalog: JSON source and the compiled columnar file
+#
+#   python -m mealplan.catalog compile data/foods.json      # -> data/foods.mpcat
+#   python -m mealplan.catalog info data/foods.mpcat
+#
+# JSON ostaje izvor (ručno se menja); .mpcat je izveden iz njega i nije u git-u.
+# Format: MAGIC, dužina zaglavlja (u64), JSON zaglavlje, pa sirovi NumPy nizovi
+# poravnati na 64 bajta. Otvara se preko mmap-a: ništa se ne parsira ni kopira,
+# a procesi koji otvore isti fajl (ili ga nasleđuju kroz fork) dele stranice.
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import sys
+from collections.abc import Sequence
+from functools import cached_property
+
+import numpy as np
+
+from .dislikes import fold_names
+from .table import FoodTable
+
+MEAL_SLOTS = ["breakfast", "lunch", "snack", "dinner"]
+
+MAGIC = b"MPCAT\x00\x00\x01"
+VERSION = 1
+CATALOG_EXT = ".mpcat"
+_ALIGN = 64
+_SEP = "\x00"
+
+# polja namirnice koja imaju svoju kolonu; sve ostalo ide u "extra" (JSON po redu)
+_CORE_KEYS = ("name", "group", "macros", "portion", "unit", "tags", "slots")
+
+
+def normalize_food(f):
+    """Copy of a catalog entry with every field the planner reads filled in."""
+    f = dict(f)
+    f["macros"] = f.get("macros") or {
+        "kcal": f.get("kcal", 0),
+        "p": f.get("p", 0),
+        "c": f.get("c", 0),
+        "f": f.get("f", 0),
+    }
+    f["tags"] = f.get("tags", []) or []
+    f["slots"] = f.get("slots") or MEAL_SLOTS
+    f["portion"] = f.get("portion", 100)
+    f["unit"] = f.get("unit", "g")
+    f["group"] = f.get("group", "other")
+    return f
+
+
+def load_foods(path):
+    # normalizuje se jednom ovde, ostatak koda čita gotova polja
+    with open(path, "r") as f:
+        return [normalize_food(x) for x in json.load(f)]
+
+
+def catalog_path(source):
+    """Compiled file next to a JSON catalog (``foods.json`` -> ``foods.mpcat``)."""
+    return os.path.splitext(source)[0] + CATALOG_EXT
+
+
+def _file_sha1(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_stamp(path):
+    """Size, mtime and content hash of a source file (stored in the header)."""
+    st = os.stat(path)
+    return {"path": os.path.basename(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+            "sha1": _file_sha1(path)}
+
+
+def _num(x):
+    # 100.0 -> 100, da rekonstruisani dict izgleda kao izvorni JSON
+    return int(x) if x.is_integer() else x
+
+
+def _strings(values):
+    """(ptr int64, utf-8 bytes uint8) of a list of strings."""
+    data = [v.encode("utf-8") for v in values]
+    ptr = np.zeros(len(data) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(b) for b in data])
+    return ptr, np.frombuffer(b"".join(data), dtype=np.uint8)
+
+
+def _columns(table):
+    """Arrays of the compiled file plus the header fields that go with them."""
+    foods = table.foods
+    n = len(table)
+
+    nutrients = []
+    for f in foods:
+        for k in f.get("macros") or {}:
+            if k not in nutrients:
+                nutrients.append(k)
+    nut = np.full((len(nutrients), n), np.nan)
+    for i, f in enumerate(foods):
+        for k, v in (f.get("macros") or {}).items():
+            nut[nutrients.index(k), i] = float(v or 0)
+
+    units = sorted({str(f.get("unit", "")) for f in foods})
+    unit_code = {u: i for i, u in enumerate(units)}
+    extras = [{k: v for k, v in f.items() if k not in _CORE_KEYS} for f in foods]
+    name_ptr, name_bytes = _strings(table.names)
+    extra_ptr, extra_bytes = _strings(
+        [json.dumps(e, ensure_ascii=False) if e else "" for e in extras])
+    text, starts = fold_names(table.names, _SEP)
+    _, fold_bytes = _strings([text])
+
+    arrays = {
+        "macros": table.macros,
+        "portion": table.portion,
+        "group": table.group,
+        "tag_ptr": table.tag_ptr, "tag_idx": table.tag_idx,
+        "slot_ptr": table.slot_ptr, "slot_idx": table.slot_idx,
+        "nutrients": nut,
+        "portion_raw": np.array([float(f["portion"]) if "portion" in f else np.nan
+                                 for f in foods], dtype=np.float64),
+        "unit": np.fromiter((unit_code[str(f.get("unit", ""))] for f in foods),
+                            dtype=np.int32, count=n),
+        "name_ptr": name_ptr, "name_bytes": name_bytes,
+        "extra_ptr": extra_ptr, "extra_bytes": extra_bytes,
+        "fold_starts": starts.astype(np.int64), "fold_bytes": fold_bytes,
+    }
+    header = {
+        "version": VERSION,
+        "foods": n,
+        "fingerprint": table.fingerprint,
+        "group_names": table.group_names,
+        "tag_names": table.tag_names,
+        "slot_names": table.slot_names,
+        "unit_names": units,
+        "nutrients": nutrients,
+        "no_unit": [i for i, f in enumerate(foods) if "unit" not in f],
+    }
+    return header, arrays
+
+
+def write_catalog(table, path, source=None):
+    """Write ``table`` as a compiled catalog file (atomically: temp + rename).
+
+    ``source`` is the stamp of the JSON it came from (``source_stamp``).
+    """
+    header, arrays = _columns(table)
+    header["source"] = source
+    # pomeraji zavise od dužine zaglavlja, a zaglavlje od pomeraja: fiksna tačka
+    offsets = {}
+    while True:
+        header["arrays"] = {k: [str(a.dtype), list(a.shape), offsets.get(k, 0)]
+                            for k, a in arrays.items()}
+        head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+        pos = -(-(len(MAGIC) + 8 + len(head)) // _ALIGN) * _ALIGN
+        new = {}
+        for k, a in arrays.items():
+            new[k] = pos
+            pos = -(-(pos + a.nbytes) // _ALIGN) * _ALIGN
+        if new == offsets:
+            break
+        offsets = new
+
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + len(head).to_bytes(8, "little") + head)
+        for k, a in arrays.items():
+            f.write(b"\x00" * (offsets[k] - f.tell()))
+            f.write(np.ascontiguousarray(a).tobytes())
+    os.replace(tmp, path)
+    return path
+
+
+def compile_catalog(source, path=None):
+    """Compile a JSON catalog to its ``.mpcat`` file; returns the file's path."""
+    path = path or catalog_path(source)
+    stamp = source_stamp(source)
+    return write_catalog(FoodTable(load_foods(source)), path, source=stamp)
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a compiled food catalog")
+        size = int.from_bytes(f.read(8), "little")
+        header = json.loads(f.read(size))
+    if header.get("version") != VERSION:
+        raise ValueError(f"{path}: catalog format {header.get('version')}, expected {VERSION}")
+    return header
+
+
+def is_fresh(path, source):
+    """True if the compiled ``path`` was built from the current ``source``.
+
+    Same size and mtime as recorded is enough; otherwise (file copied,
+    touched) the content hash decides.
+    """
+    try:
+        stamp = read_header(path).get("source") or {}
+        st = os.stat(source)
+    except (OSError, ValueError):
+        return False
+    if stamp.get("size") != st.st_size:
+        return False
+    return stamp.get("mtime_ns") == st.st_mtime_ns or stamp.get("sha1") == _file_sha1(source)
+
+
+class CatalogFoods(Sequence):
+    """The food dicts of a compiled catalog, built per row on first access.
+
+    Each dict is created once and cached, so the same row always gives the
+    same (shared, read-only by convention) object, like ``FoodTable.foods``.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self._cache = [None] * len(table)
+
+    def __len__(self):
+        return len(self._cache)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        f = self._cache[i]
+        if f is None:
+            f = self._cache[i] = self.table.food_at(i)
+        return f
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class MappedFoodTable(FoodTable):
+    """FoodTable of a compiled ``.mpcat`` file, memory-mapped.
+
+    Opening reads only the header; the columns are read-only NumPy views
+    of the mapping. Names are decoded on first use and food dicts per row
+    (``CatalogFoods``), so a process that never touches a food never pays
+    for it. Forked workers share the mapping with the parent.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        header = read_header(path)
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header = header
+        self.n = header["foods"]
+        self.source = header.get("source")
+        self._fingerprint = header["fingerprint"]
+        self.group_names = tuple(header["group_names"])
+        self.tag_names = tuple(header["tag_names"])
+        self.slot_names = tuple(header["slot_names"])
+        self.unit_names = tuple(header["unit_names"])
+        self.nutrient_names = tuple(header["nutrients"])
+        self._no_unit = frozenset(header.get("no_unit", ()))
+
+        cols = {}
+        for k, (dtype, shape, offset) in header["arrays"].items():
+            count = math.prod(shape)
+            cols[k] = np.frombuffer(self._mm, dtype=dtype, count=count,
+                                    offset=offset).reshape(shape)
+        self._cols = cols
+        self.macros = cols["macros"]
+        self.kcal, self.p, self.c, self.f = self.macros
+        self.portion = cols["portion"]
+        self.group = cols["group"]
+        self.tag_ptr, self.tag_idx = cols["tag_ptr"], cols["tag_idx"]
+        self.slot_ptr, self.slot_idx = cols["slot_ptr"], cols["slot_idx"]
+        self.foods = CatalogFoods(self)
+
+    def __len__(self):
+        return self.n
+
+    def __reduce__(self):
+        # spawn: drugi proces ponovo mapira isti fajl umesto da ga pikluje
+        return (MappedFoodTable, (self.path,))
+
+    def _string(self, key, i):
+        ptr = self._cols[key + "_ptr"]
+        return bytes(self._cols[key + "_bytes"][ptr[i]:ptr[i + 1]]).decode("utf-8")
+
+    @cached_property
+    def names(self):
+        ptr = self._cols["name_ptr"]
+        text = bytes(self._cols["name_bytes"]).decode("utf-8")
+        if len(text) == ptr[-1]:    # samo ASCII: pomeraji bajtova == pomeraji znakova
+            return tuple(sys.intern(text[a:b]) for a, b in zip(ptr[:-1].tolist(), ptr[1:].tolist()))
+        return tuple(sys.intern(self._string("name", i)) for i in range(self.n))
+
+    @cached_property
+    def name_index(self):
+        index = {}
+        for i, name in enumerate(self.names):
+            index.setdefault(name, i)
+        return index
+
+    def folded_names(self):
+        """Folded-name text and offsets for ``DislikeMatcher`` (precompiled)."""
+        return bytes(self._cols["fold_bytes"]).decode("utf-8"), self._cols["fold_starts"]
+
+    @cached_property
+    def _rows(self):
+        # kolone kao Python liste (jednom po procesu) — dict po redu bez NumPy skalara
+        cols = self._cols
+        return {k: cols[k].tolist() for k in ("group", "unit", "portion_raw", "tag_ptr",
+                                              "tag_idx", "slot_ptr", "slot_idx", "extra_ptr")
+                } | {"nutrients": cols["nutrients"].T.tolist()}
+
+    def food_at(self, i):
+        """Food dict of row ``i``, as ``load_foods`` gave it when compiling."""
+        rows = self._rows
+        f = {
+            "name": self.names[i],
+            "group": self.group_names[rows["group"][i]],
+            "macros": {k: _num(v) for k, v in zip(self.nutrient_names, rows["nutrients"][i])
+                       if not math.isnan(v)},
+        }
+        portion = rows["portion_raw"][i]
+        if not math.isnan(portion):
+            f["portion"] = _num(portion)
+        if i not in self._no_unit:
+            f["unit"] = self.unit_names[rows["unit"][i]]
+        ptr, idx = rows["tag_ptr"], rows["tag_idx"]
+        f["tags"] = [self.tag_names[t] for t in idx[ptr[i]:ptr[i + 1]]]
+        ptr, idx = rows["slot_ptr"], rows["slot_idx"]
+        f["slots"] = [self.slot_names[t] for t in idx[ptr[i]:ptr[i + 1]]]
+        ptr = rows["extra_ptr"]
+        if ptr[i + 1] > ptr[i]:
+            f.update(json.loads(bytes(self._cols["extra_bytes"][ptr[i]:ptr[i + 1]])))
+        return f
+
+
+def load_table(path):
+    """FoodTable of a catalog path: a ``.mpcat`` file is memory-mapped, a
+    JSON file uses its compiled sibling when that one is up to date and is
+    parsed otherwise."""
+    if path.endswith(CATALOG_EXT):
+        return MappedFoodTable(path)
+    compiled = catalog_path(path)
+    if os.path.exists(compiled) and is_fresh(compiled, path):
+        return MappedFoodTable(compiled)
+    return FoodTable(load_foods(path))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compile / inspect the food catalog")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compile", help="JSON catalog -> memory-mapped .mpcat file")
+    c.add_argument("source", help="foods.json")
+    c.add_argument("-o", "--out", default=None, help="output file (default: next to source)")
+    i = sub.add_parser("info", help="print the header of a compiled catalog")
+    i.add_argument("path")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "compile":
+        path = compile_catalog(args.source, args.out)
+        header = read_header(path)
+        print(f"{path}: {header['foods']} foods, {os.path.getsize(path)} bytes, "
+              f"catalog {header['fingerprint']}", file=sys.stderr)
+        return 0
+    header = read_header(args.path)
+    header.pop("arrays")
+    header.pop("no_unit", None)
+    header["fresh"] = bool(header.get("source")) and is_fresh(
+        args.path, os.path.join(os.path.dirname(args.path), header["source"]["path"]))
+    print(json.dumps(header, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+# mealplan/charts.py — small inline SVG charts (donut, trend, bars)
+
+import math
+from functools import lru_cache
+from html import escape
+
+# paleta iz tamne teme (ista kao raniji donut)
+MACRO_COLORS = ("#60a5fa", "#facc15", "#34d399")
+TEXT = "#9ca3af"
+STRONG = "#e5e7eb"
+EDGE = "#111827"
+LINE = "#60a5fa"
+GRID = "#374151"
+
+CHART_CACHE_SIZE = 512
+
+
+def _r(x, nd=1):
+    return round(float(x), nd)
+
+
+def _svg(width, height, body):
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+            f'viewBox="0 0 {width} {height}" font-family="sans-serif">{body}</svg>')
+
+
+def _text(x, y, s, size=11, color=TEXT, anchor="middle", weight="normal"):
+    return (f'<text x="{x:.1f}" y="{y:.1f}" font-size="{size}" fill="{color}" '
+            f'text-anchor="{anchor}" dominant-baseline="middle" font-weight="{weight}">'
+            f'{escape(str(s))}</text>')
+
+
+def _point(cx, cy, r, a):
+    return cx + r * math.cos(a), cy - r * math.sin(a)
+
+
+def _wedge(cx, cy, ro, ri, a0, a1, color):
+    """Ring (or pie, ri == 0) segment from a0 to a1, counter-clockwise."""
+    if a1 - a0 >= 2 * math.pi - 1e-9:
+        if ri <= 0:
+            return f'<circle cx="{cx}" cy="{cy}" r="{ro}" fill="{color}" stroke="{EDGE}"/>'
+        return (f'<circle cx="{cx}" cy="{cy}" r="{(ro + ri) / 2:.2f}" fill="none" '
+                f'stroke="{color}" stroke-width="{ro - ri:.2f}"/>')
+    large = 1 if a1 - a0 > math.pi else 0
+    x0, y0 = _point(cx, cy, ro, a0)
+    x1, y1 = _point(cx, cy, ro, a1)
+    d = f"M{x0:.2f},{y0:.2f} A{ro},{ro} 0 {large} 0 {x1:.2f},{y1:.2f} "
+    if ri > 0:
+        x2, y2 = _point(cx, cy, ri, a1)
+        x3, y3 = _point(cx, cy, ri, a0)
+        d += f"L{x2:.2f},{y2:.2f} A{ri},{ri} 0 {large} 1 {x3:.2f},{y3:.2f} Z"
+    else:
+        d += f"L{cx},{cy} Z"
+    return f'<path d="{d}" fill="{color}" stroke="{EDGE}" stroke-width="1"/>'
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _pie(values, labels, colors, hole, center, total, size):
+    # sa strane ima mesta za natpise (i duže srpske)
+    width = size + 100
+    cx, cy = width / 2, size / 2
+    ro = size * 0.36
+    ri = ro * hole
+    s = sum(v for v in values if v > 0)
+    parts = []
+    if s <= 0:
+        parts.append(_wedge(cx, cy, ro, ri, 0, 2 * math.pi, GRID))
+    else:
+        a = math.pi / 2   # počinje gore, ide suprotno od kazaljke (kao matplotlib)
+        for v, label, color in zip(values, labels, colors):
+            if v <= 0:
+                continue
+            span = 2 * math.pi * v / s
+            parts.append(_wedge(cx, cy, ro, ri, a, a + span, color))
+            mid = a + span / 2
+            px, py = _point(cx, cy, (ro + ri) / 2 if ri > 0 else ro * 0.62, mid)
+            parts.append(_text(px, py, f"{100 * v / s:.0f}%", 10, EDGE, weight="bold"))
+            lx, ly = _point(cx, cy, ro * 1.12, mid)
+            side = math.cos(mid)
+            anchor = "start" if side > 0.2 else "end" if side < -0.2 else "middle"
+            parts.append(_text(lx, ly, label, 10, TEXT, anchor))
+            a += span
+    if center is not None:
+        parts.append(_text(cx, cy - 8, center, 9, TEXT))
+        parts.append(_text(cx, cy + 8, total, 14, STRONG, weight="bold"))
+    return _svg(width, size, "".join(parts))
+
+
+def donut_svg(kcal, P, C, F, labels=("Protein", "Carbs", "Fat"), center_label="Total kcal",
+              size=220):
+    """Macro donut with the kcal total in the middle (memoized on rounded inputs)."""
+    return _pie((_r(P), _r(C), _r(F)), tuple(labels), MACRO_COLORS, 0.6,
+                center_label, str(int(kcal)), int(size))
+
+
+def pie_svg(values, labels, colors=MACRO_COLORS, size=180):
+    """Plain pie chart (memoized on rounded inputs)."""
+    return _pie(tuple(_r(v) for v in values), tuple(labels), tuple(colors), 0.0,
+                None, None, int(size))
+
+
+def _axes(values, ref, width, height, title, xlabel, ylabel):
+    """Plot frame shared by the line and bar charts: (parts, x(i), y(v), y0)."""
+    left, right, top, bottom = 48, 12, 26 if title else 10, 34
+    pw, ph = width - left - right, height - top - bottom
+    hi = max(list(values) + ([ref] if ref is not None else []) + [1.0])
+    lo = 0.0
+    hi *= 1.08
+    n = max(1, len(values))
+
+    def x(i):
+        return left + pw * (i + 0.5) / n
+
+    def y(v):
+        return top + ph * (1 - (v - lo) / (hi - lo))
+
+    parts = [f'<line x1="{left}" y1="{top + ph}" x2="{left + pw}" y2="{top + ph}" '
+             f'stroke="{GRID}"/>',
+             f'<line x1="{left}" y1="{top}" x2="{left}" y2="{top + ph}" stroke="{GRID}"/>']
+    for k in range(5):
+        v = lo + (hi - lo) * k / 4
+        parts.append(_text(left - 6, y(v), f"{v:.0f}", 9, TEXT, "end"))
+        if k:
+            parts.append(f'<line x1="{left}" y1="{y(v):.1f}" x2="{left + pw}" y2="{y(v):.1f}" '
+                         f'stroke="{GRID}" stroke-width="0.5" opacity="0.6"/>')
+    step = max(1, -(-n // 14))
+    for i in range(0, n, step):
+        parts.append(_text(x(i), top + ph + 12, i + 1, 9, TEXT))
+    if title:
+        parts.append(_text(width / 2, 12, title, 12, STRONG))
+    if xlabel:
+        parts.append(_text(left + pw / 2, height - 8, xlabel, 10, TEXT))
+    if ylabel:
+        parts.append(f'<text x="12" y="{top + ph / 2:.1f}" font-size="10" fill="{TEXT}" '
+                     f'text-anchor="middle" transform="rotate(-90 12 {top + ph / 2:.1f})">'
+                     f'{escape(ylabel)}</text>')
+    return parts, x, y, top + ph
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _line(values, ref, title, xlabel, ylabel, width, height):
+    parts, x, y, _ = _axes(values, ref, width, height, title, xlabel, ylabel)
+    if ref is not None:
+        # bez dana linija cilja ide preko prazne ose (ne u x(-1))
+        parts.append(f'<line x1="{x(0) - 10:.1f}" y1="{y(ref):.1f}" '
+                     f'x2="{x(max(len(values) - 1, 0)) + 10:.1f}" y2="{y(ref):.1f}" '
+                     f'stroke="{TEXT}" stroke-dasharray="5,4" opacity="0.7"/>')
+    if values:
+        pts = " ".join(f"{x(i):.1f},{y(v):.1f}" for i, v in enumerate(values))
+        parts.append(f'<polyline points="{pts}" fill="none" stroke="{LINE}" stroke-width="2"/>')
+    parts.extend(f'<circle cx="{x(i):.1f}" cy="{y(v):.1f}" r="3" fill="{LINE}"/>'
+                 for i, v in enumerate(values))
+    return _svg(width, height, "".join(parts))
+
+
+def trend_svg(values, ref=None, title="", xlabel="", ylabel="", width=480, height=210):
+    """Line chart of per-day values with an optional dashed target line."""
+    return _line(tuple(_r(v, 0) for v in values), None if ref is None else _r(ref, 0),
+                 title, xlabel, ylabel, int(width), int(height))
+
+
+@lru_cache(maxsize=CHART_CACHE_SIZE)
+def _bars(values, title, xlabel, ylabel, width, height):
+    parts, x, y, base = _axes(values, None, width, height, title, xlabel, ylabel)
+    bw = 0.7 * (x(1) - x(0)) if len(values) > 1 else 40
+    for i, v in enumerate(values):
+        top = y(max(v, 0.0))
+        parts.append(f'<rect x="{x(i) - bw / 2:.1f}" y="{top:.1f}" width="{bw:.1f}" '
+                     f'height="{max(0.0, base - top):.1f}" fill="{LINE}"/>')
+    return _svg(width, height, "".join(parts))
+
+
+def bars_svg(values, title="", xlabel="", ylabel="", width=480, height=260):
+    """Bar chart of per-day values."""
+    return _bars(tuple(_r(v, 0) for v in values), title, xlabel, ylabel, int(width), int(height))
+
+
+def chart_cache_info():
+    """lru_cache stats of the chart renderers."""
+    return {f.__name__.lstrip("_"): f.cache_info()._asdict() for f in (_pie, _line, _bars)}
@@ -0,0 +1,228 @@
+# mealplan/dislikes.py — compiled matcher for the "dislikes" filter
+
+import re
+import unicodedata
+
+import numpy as np
+
+# srpska ćirilica -> latinica (pre skidanja dijakritika)
+_CYRILLIC = dict(zip(
+    "абвгдђежзијклљмнњопрстћуфхцчџш",
+    ["a", "b", "v", "g", "d", "đ", "e", "ž", "z", "i", "j", "k", "l", "lj", "m", "n",
+     "nj", "o", "p", "r", "s", "t", "ć", "u", "f", "h", "c", "č", "dž", "š"]))
+
+# koreni srpskih reči (već "presavijeni") -> engleske reči iz imena namirnica;
+# reč se proširuje samo kao koren + srpski nastavak (_ENDINGS: "pavlaka",
+# "piletinu", "svinjsko"), engleska reč se traži kao cela reč (+ množina),
+# a "*" na kraju znači "bilo koji nastavak"
+SR_TERMS = {
+    "pavlak": ("cream",),
+    "mlek": ("milk",),
+    "mlec": ("milk",),
+    "jogurt": ("yogurt", "skyr"),
+    "maslac": ("butter",),
+    "puter": ("butter",),
+    "pilet": ("chicken",),
+    "curet": ("turkey",),
+    "govedin": ("beef",),
+    "junetin": ("beef",),
+    "svinj": ("pork", "ham"),
+    "sunk": ("ham",),
+    "losos": ("salmon",),
+    "tunjevin": ("tuna",),
+    "bakalar": ("cod",),
+    "skamp": ("shrimp",),
+    "kozic": ("shrimp",),
+    "pirinac": ("rice",),
+    "pirinc": ("rice",),
+    "ovas": ("oat",),
+    "hleb": ("bread", "toast", "pita"),
+    "tost": ("toast",),
+    "testenin": ("pasta", "spaghetti", "noodle"),
+    "spaget": ("spaghetti",),
+    "krompir": ("potato",),
+    "batat": ("sweet potato",),
+    "paradajz": ("tomato",),
+    "krastav": ("cucumber",),
+    "spanac": ("spinach",),
+    "brokol": ("broccoli",),
+    "karfiol": ("cauliflower",),
+    "tikvic": ("zucchini",),
+    "patlidzan": ("eggplant",),
+    "sargarep": ("carrot",),
+    "kukuruz": ("corn",),
+    "boranij": ("green beans",),
+    "pasulj": ("beans",),
+    "sociv": ("lentil",),
+    "leblebij": ("chickpea",),
+    "naut": ("chickpea",),
+    "kikiriki": ("peanut",),
+    "badem": ("almond",),
+    "orah": ("walnut", "nuts"),
+    "oras": ("walnut", "nuts"),
+    "indijsk": ("cashew",),
+    "susam": ("sesame", "tahini"),
+    "banan": ("banana",),
+    "jabuk": ("apple",),
+    "borovnic": ("blueberr*",),
+    "jagod": ("strawberr*",),
+    "malin": ("raspberr*",),
+    "bobic": ("berr*", "blueberr*", "strawberr*", "raspberr*"),
+    "avokad": ("avocado",),
+    "cokolad": ("chocolate",),
+    "maslinov": ("olive",),
+    "salat": ("salad",),
+    "corb": ("soup",),
+    "tofu": ("tofu",),
+    "humus": ("hummus",),
+    "kroasan": ("croissant",),
+    "palacink": ("pancake",),
+    "pecurk": ("mushroom",),
+    "gljiv": ("mushroom",),
+}
+
+# padeži, množina, pridevi i "-ina" imenice posle korena iz SR_TERMS
+_ENDINGS = frozenset((
+    "", "a", "e", "i", "o", "u", "om", "em", "ima", "ama",
+    "ovi", "ove", "ova", "ovima", "evi", "eve", "eva", "evima",
+    "ni", "na", "no", "ne", "nog", "nom", "ski", "ska", "sko", "ske",
+    "ac", "ci", "ca", "ce", "ina", "ine", "inu", "inom", "etina", "etine", "etinu",
+))
+
+# kratki koreni se sudaraju sa engleskim i drugim rečima ("sirloin", "ribeye",
+# "medium", "cijena", "sosa"), pa za njih važe samo ovde nabrojani oblici
+SR_WORDS = {
+    **dict.fromkeys(("jaje", "jaja", "jajeta", "jajetom", "jajima"), ("egg",)),
+    **dict.fromkeys(("sir", "sira", "siru", "sirom", "sirevi", "sireve", "sirevima",
+                     "sirni", "sirna", "sirne"),
+                    ("cheese", "feta", "mozzarella", "parmesan")),
+    **dict.fromkeys(("riba", "ribe", "ribi", "ribu", "ribom", "ribama", "riblji", "riblja",
+                     "riblje"), ("salmon", "tuna", "cod", "fish")),
+    **dict.fromkeys(("pile", "pileci", "pileca", "pilece", "pileceg"), ("chicken",)),
+    **dict.fromkeys(("riza", "rize", "rizu", "rizom"), ("rice",)),
+    **dict.fromkeys(("ovsa", "ovsom", "ovseni", "ovsena", "ovseno", "ovsene", "ovsenih",
+                     "zob", "zobi", "zobom", "zobeni", "zobena", "zobene"), ("oat",)),
+    **dict.fromkeys(("cija", "cije", "ciju", "cijom"), ("chia",)),
+    **dict.fromkeys(("med", "meda", "medu", "medom"), ("honey",)),
+    **dict.fromkeys(("ulje", "ulja", "ulju", "uljem"), ("oil",)),
+    **dict.fromkeys(("supa", "supe", "supu", "supom"), ("soup",)),
+    **dict.fromkeys(("sos", "sosu", "sosom", "sosovi", "sosove"), ("sauce",)),
+}
+# najduži koren se proverava prvi ("pirinac" pre "pirinc")
+_STEMS = sorted(SR_TERMS, key=len, reverse=True)
+
+
+def fold(text):
+    """Lowercase, Serbian Cyrillic -> Latin, no diacritics (č/ć -> c, đ -> dj)."""
+    text = "".join(_CYRILLIC.get(ch, ch) for ch in str(text).lower())
+    text = text.replace("đ", "dj")
+    text = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def dislike_tokens(dislikes):
+    """Canonical tokens of a comma-separated dislikes string (sorted, unique)."""
+    return tuple(sorted({fold(t).strip() for t in str(dislikes or "").split(",")} - {""}))
+
+
+def _expand_word(word):
+    terms = SR_WORDS.get(word)
+    if terms is not None:
+        return terms
+    for stem in _STEMS:
+        if word.startswith(stem) and word[len(stem):] in _ENDINGS:
+            return SR_TERMS[stem]
+    return ()
+
+
+def expand_token(token):
+    """English words for a one-word (folded) token: a known word from
+    ``SR_WORDS`` or a ``SR_TERMS`` stem plus a Serbian ending. A token of
+    several words is a phrase and isn't translated ("kikiriki puter" is not
+    every food with butter)."""
+    return () if " " in token else _expand_word(token)
+
+
+def _word_pattern(terms):
+    """One regex for whole English words (with plural), "x*" = any ending."""
+    parts = []
+    for term in sorted(set(terms)):
+        if term.endswith("*"):
+            parts.append(re.escape(term[:-1]) + r"\w*")
+        else:
+            parts.append(re.escape(term) + r"(?:s|es)?\b")
+    return re.compile(r"\b(?:" + "|".join(parts) + ")") if parts else None
+
+
+def fold_names(names, sep="\x00"):
+    """(joined folded names, start offset of each) — the matcher's text index."""
+    folded = [fold(name) for name in names]
+    lengths = np.fromiter((len(s) + 1 for s in folded), dtype=np.int64, count=len(folded))
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(folded) else lengths
+    return sep.join(folded), starts
+
+
+class DislikeMatcher:
+    """Folded name index of a FoodTable for the dislikes filter.
+
+    All names are folded once and joined into one string. Each typed token
+    is found as a substring with ``str.find`` over that string (a token of
+    several words only as that whole phrase), English words for one-word
+    Serbian tokens (see ``expand_token``; a word that already is a word of
+    some name is left alone) with one compiled word regex, and the hit
+    offsets are mapped back to rows. Results are memoized per
+    distinct dislikes input (after tokenizing/folding, so "Jaja, pavlaka"
+    == "pavlaka,jaja").
+    """
+
+    _SEP = "\x00"
+
+    def __init__(self, table, memo_size=256):
+        self.table = table
+        # kompajlirani katalog (catalog.py) već nosi presavijena imena
+        prebuilt = getattr(table, "folded_names", None)
+        if prebuilt is not None:
+            self.text, self.starts = prebuilt()
+        else:
+            self.text, self.starts = fold_names(table.names, self._SEP)
+        self._memo = {}
+        self._memo_size = memo_size
+
+    def _hits(self, token):
+        hits, text, i = [], self.text, self.text.find(token)
+        while i >= 0:
+            hits.append(i)
+            i = text.find(token, i + 1)
+        return hits
+
+    def _is_name_word(self, word):
+        return re.search(r"\b" + re.escape(word) + r"(?:s|es)?\b", self.text) is not None
+
+    def rows(self, dislikes):
+        """Sorted row ids whose name contains any dislike (read-only)."""
+        key = dislike_tokens(dislikes)
+        hit = self._memo.get(key)
+        if hit is not None:
+            return hit
+        hits = [i for tok in key for i in self._hits(tok)]
+        # reč koja već postoji kao reč u imenima je engleska, ne prevodi se
+        words = _word_pattern(term for tok in key if not self._is_name_word(tok)
+                              for term in expand_token(tok))
+        if words is not None:
+            hits.extend(m.start() for m in words.finditer(self.text))
+        rows = np.unique(np.searchsorted(self.starts, np.asarray(hits, dtype=np.int64),
+                                         side="right") - 1).astype(np.intp)
+        rows.flags.writeable = False
+        if len(self._memo) >= self._memo_size:
+            self._memo.clear()
+        self._memo[key] = rows
+        return rows
+
+    def mask(self, dislikes):
+        """Boolean mask of the disliked rows (None when nothing is disliked)."""
+        rows = self.rows(dislikes)
+        if not len(rows):
+            return None
+        out = np.zeros(len(self.table), dtype=bool)
+        out[rows] = True
+        return out
@@ -0,0 +1,225 @@
+# mealplan/exact.py — exact branch-and-bound meal solver
+
+import itertools
+
+import numpy as np
+
+from .table import SCORE_WEIGHTS, target_vector
+
+# koliko kandidat-obroka (ćelija) jedna pretraga sme da oceni; budžet rada
+# umesto sata, pa isti ulaz uvek daje isti odgovor (i pod opterećenjem)
+MAX_CELLS = 1_000_000
+
+# širina beam pretrage za početno rešenje (gornju granicu)
+_BEAM = 8
+
+# koliko delimičnih obroka se proširuje odjednom (pa se granica ponovo proverava)
+_CHUNK = 64
+
+# svi znakovi (±1) po makrou, pomnoženi težinama: pravci dualnih granica
+_DIRECTIONS = np.array(list(itertools.product((-1.0, 1.0), repeat=4))) * SCORE_WEIGHTS
+
+
+def _suffix_top(q, r_max):
+    """(r_max + 1, rows, n + 1): for every row and start ``s``, the sum of
+    the r largest entries (clipped at 0) among positions >= s.
+
+    Uses T_r(s) = max over j >= s of q_j + T_{r-1}(j + 1) (j being the first
+    food taken), so each r is one reversed running maximum.
+    """
+    q = np.clip(q, 0.0, None)
+    rows, n = q.shape
+    out = np.zeros((r_max + 1, rows, n + 1))
+    for r in range(1, r_max + 1):
+        cand = q + out[r - 1][:, 1:]
+        out[r][:, :n] = np.maximum.accumulate(cand[:, ::-1], axis=1)[:, ::-1]
+    return out
+
+
+class _Search:
+    """Branch-and-bound over meals as increasing position tuples.
+
+    Partial meals are extended by one later food, ``_CHUNK`` of them at a
+    time in a single (4, chunk * n) pass, best bound first and depth-first,
+    so complete meals found early cut the chunks after them. A partial meal
+    is kept only if its lower bound beats the incumbent. Two per-item
+    bounds, both over at most ``r`` more foods from the positions after its
+    last one:
+
+    * box: every macro separately gets its r largest / smallest additions;
+    * projections: for any ``y`` with ``|y_m| <= w_m``, the weighted L1 error
+      is at least ``y·(S - t) + y·X``, and ``y·X`` is at least the sum of the
+      r most negative per-item values ``y·v_k`` (all 16 sign patterns of
+      ``y = ±w`` are tried). This ties the macros to the same foods.
+
+    A beam search ranked by those bounds seeds the incumbent, so most
+    branches are cut at the first level.
+    """
+
+    def __init__(self, values, tvec, max_items, kcal_range, require, max_cells):
+        self.values = values
+        self.n = values.shape[1]
+        self.tvec = tvec[:, None]
+        self.max_items = max_items
+        self.kcal_lo, self.kcal_hi = kcal_range or (-np.inf, np.inf)
+        self.require = require
+        self.max_cells = max_cells
+        r_max = max_items - 1
+        self.add_hi = _suffix_top(values, r_max)                     # (r+1, 4, n+1)
+        self.add_lo = -_suffix_top(-values, r_max)
+        self.reduce = _suffix_top(-(_DIRECTIONS @ values), r_max)    # (r+1, 16, n+1)
+        # ima li još "obaveznih" (npr. proteinskih) namirnica od pozicije s
+        self.req_left = np.append(np.cumsum(require[::-1])[::-1] > 0, False)
+        self.best_score = np.inf
+        self.best = None
+        self.truncated = False
+        self.cells = 0
+
+    def _extend(self, sums, has, lo=0):
+        """Every (partial meal, food at position >= ``lo``) pair, flattened
+        to F * (n - lo) columns."""
+        child = (sums[:, :, None] + self.values[:, None, lo:]).reshape(4, -1)
+        ch_has = (has[:, None] | self.require[None, lo:]).ravel()
+        scores = SCORE_WEIGHTS @ np.abs(child - self.tvec)
+        self.cells += scores.size
+        return child, ch_has, scores
+
+    def _offer(self, scores, ok, paths):
+        """Take the best ``ok`` candidate as incumbent if it beats it;
+        ``paths(i)`` gives the position list of flat candidate ``i``."""
+        scores = np.where(ok, scores, np.inf)
+        i = int(np.argmin(scores))
+        if scores[i] < self.best_score:
+            self.best_score = float(scores[i])
+            self.best = sorted(paths(i))
+
+    def _feasible(self, sums, has_req):
+        return (sums[0] >= self.kcal_lo) & (sums[0] <= self.kcal_hi) & has_req
+
+    def _bound(self, sums, start, r):
+        """Lower bound on the score of any meal ``sums`` plus at most ``r``
+        more foods from positions >= ``start``; also whether its kcal can
+        still land in range."""
+        lo = sums + self.add_lo[r][:, start]
+        hi = sums + self.add_hi[r][:, start]
+        box = SCORE_WEIGHTS @ np.maximum(0.0, np.maximum(lo - self.tvec, self.tvec - hi))
+        proj = (_DIRECTIONS @ (sums - self.tvec) - self.reduce[r][:, start]).max(axis=0)
+        reachable = (lo[0] <= self.kcal_hi) & (hi[0] >= self.kcal_lo)
+        return np.maximum(box, proj), reachable
+
+    def beam(self, width=_BEAM):
+        """Beam over meal sizes 1..max_items, for an early incumbent: partial
+        meals are ranked by their bound (how well they can still be
+        completed), then by score."""
+        n = self.n
+        sums = np.zeros((4, 1))
+        has = np.zeros(1, dtype=bool)
+        paths = np.zeros((1, 0), dtype=np.intp)
+        for depth in range(1, self.max_items + 1):
+            child, ch_has, scores = self._extend(sums, has)
+            taken = np.zeros((len(paths), n), dtype=bool)
+            taken[np.arange(len(paths))[:, None], paths] = True
+            taken = taken.ravel()
+            self._offer(scores, ~taken & self._feasible(child, ch_has),
+                        lambda i: [*paths[i // n].tolist(), i % n])
+            if depth == self.max_items:
+                break
+            bound, reachable = self._bound(child, [0], self.max_items - depth)
+            bound[taken | ~reachable] = np.inf
+            pick = np.lexsort((scores, bound))[:width]
+            pick = pick[np.isfinite(bound[pick])]
+            if pick.size == 0:
+                break
+            sums, has = child[:, pick], ch_has[pick]
+            paths = np.concatenate([paths[pick // n], (pick % n)[:, None]], axis=1)
+
+    def run(self):
+        self.beam()
+        if self.max_items > 1:
+            # nivo 1: pojedinačne namirnice (beam ih je već ocenio)
+            last = np.arange(self.n)
+            self.descend(self.values, last, self.require, last[:, None], self.max_items - 1)
+
+    def descend(self, sums, last, has, paths, r):
+        """Extend partial meals that may take ``r`` more foods, best bound
+        first and ``_CHUNK`` at a time, depth-first: complete meals found in
+        one chunk tighten the cut for the next."""
+        n = self.n
+        bound, reachable = self._bound(sums, last + 1, r)
+        reachable &= has | self.req_left[last + 1]
+        keep = np.flatnonzero(reachable & (bound < self.best_score) & (last + 1 < n))
+        keep = keep[np.argsort(bound[keep], kind="stable")]
+        for start in range(0, keep.size, _CHUNK):
+            part = keep[start:start + _CHUNK]
+            part = part[bound[part] < self.best_score]
+            if part.size == 0:
+                break   # sortirano po granici: ni ostali ne mogu bolje
+            # kolone pre najranijeg mogućeg nastavka se ni ne računaju
+            lo = int(last[part].min()) + 1
+            w = n - lo
+            room = (self.max_cells - self.cells) // w
+            if part.size > room:
+                self.truncated = True
+                part = part[:max(0, room)]
+                if part.size == 0:
+                    return
+            child, ch_has, scores = self._extend(sums[:, part], has[part], lo)
+            valid = (np.arange(lo, n)[None, :] > last[part][:, None]).ravel()
+            self._offer(scores, valid & self._feasible(child, ch_has),
+                        lambda i: [*paths[part[i // w]].tolist(), lo + i % w])
+            if r > 1:
+                idx = np.flatnonzero(valid)
+                pos = lo + idx % w
+                self.descend(child[:, idx], pos, ch_has[idx],
+                             np.concatenate([paths[part[idx // w]], pos[:, None]], axis=1),
+                             r - 1)
+            if self.truncated:
+                return
+
+
+def exact_meal_rows(table, rows, targets, max_items=3, kcal_range=None,
+                    require=None, max_cells=MAX_CELLS):
+    """Minimum-``score_meal`` meal of 1..``max_items`` distinct pool foods.
+
+    Branch-and-bound over pool positions: each partial meal is bounded by
+    the best error its macro totals could still reach with the remaining
+    slots, and branches whose kcal can no longer land in ``kcal_range`` are
+    cut. ``require`` is an optional bool mask over the pool; at least one of
+    those foods must be in the meal (e.g. a protein base for lunch/dinner).
+
+    If no meal satisfies ``kcal_range`` the search is repeated without it,
+    then without ``require``, like the retry loop in ``build_meal_for_slot``.
+    The work is capped at ``max_cells`` scored candidate meals (not wall
+    time), so the same inputs always give the same meal; past the cap the
+    best meal found so far is returned.
+
+    Returns ``(positions, score, optimal)``.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    if len(rows) == 0 or max_items <= 0:
+        return [], float("inf"), True
+    # najkaloričnije prve: sufiksi su tada "lakši" pa su granice tešnje
+    order = np.argsort(-table.kcal[rows], kind="stable")
+    values = table.macros[:, rows[order]]
+    tvec = target_vector(targets)
+    anything = np.ones(len(rows), dtype=bool)
+    if require is not None:
+        require = np.asarray(require, dtype=bool)
+        if not require.any():
+            require = None
+
+    attempts = [(kcal_range, require)]
+    if kcal_range is not None:
+        attempts.append((None, require))
+    if require is not None:
+        attempts.append((None, None))
+    # i posle isteka budžeta svaki pokušaj oceni bar beam i sve pojedinačne
+    # namirnice, pa poslednji (bez ograničenja) uvek nešto vrati
+    for kr, req in attempts:
+        search = _Search(values, tvec, max_items, kr,
+                         anything if req is None else req[order], max_cells)
+        search.run()
+        if search.best is not None:
+            best = sorted(int(order[j]) for j in search.best)
+            return best, search.best_score, not search.truncated
+    return [], float("inf"), False
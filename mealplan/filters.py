@@ -0,0 +1,186 @@
+# mealplan/filters.py — bitset index for diet / tag / group / quick filters
+
+import numpy as np
+
+from .dislikes import DislikeMatcher
+
+# (tagovi koji propuštaju, grupe koje propuštaju) — isto kao filter_by_diet
+DIET_RULES = {
+    "vegetarian": (("vegan", "vegetarian"),
+                   ("grains", "fruit", "vegetables", "nuts", "legumes", "fat")),
+    "vegan": (("vegan",),
+              ("grains", "fruit", "vegetables", "nuts", "legumes", "fat")),
+    "gluten-free": (("gluten-free",),
+                    ("protein", "fruit", "vegetables", "nuts", "legumes", "fat", "dairy")),
+}
+
+# brzi filteri iz plan taba: (isključeni tagovi, isključene grupe bez obzira na velika slova)
+QUICK_FILTERS = {
+    "no_dairy": (("dairy", "milk"), ()),
+    "no_pork": (("pork",), ()),
+    "vegetarian": (("meat",), ("meat", "fish", "seafood")),
+}
+
+_WORD = 64
+
+
+def _bitsets(codes_per_row, n_bits):
+    """(n, words) uint64 matrix with bit ``c`` set for every code of a row."""
+    words = max(1, -(-n_bits // _WORD))
+    bits = np.zeros((len(codes_per_row), words), dtype=np.uint64)
+    for i, codes in enumerate(codes_per_row):
+        for c in codes:
+            bits[i, c // _WORD] |= np.uint64(1) << np.uint64(c % _WORD)
+    return bits
+
+
+def _csr_bitsets(ptr, idx, n_bits):
+    """``_bitsets`` of CSR codes (row i has ``idx[ptr[i]:ptr[i+1]]``), vectorized."""
+    words = max(1, -(-n_bits // _WORD))
+    bits = np.zeros((len(ptr) - 1, words), dtype=np.uint64)
+    if len(idx):
+        rows = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+        idx = np.asarray(idx, dtype=np.int64)
+        np.bitwise_or.at(bits, (rows, idx // _WORD),
+                         np.left_shift(np.uint64(1), (idx % _WORD).astype(np.uint64)))
+    return bits
+
+
+class FoodPool(tuple):
+    """Read-only pool of foods that remembers its FoodTable rows.
+
+    Built by ``FilterIndex.pool``; ``for_slot`` views are computed once per
+    slot and shared by every caller holding the same pool.
+    """
+
+    def __new__(cls, index, rows):
+        foods = index.table.foods
+        self = super().__new__(cls, (foods[i] for i in rows))
+        self.index = index
+        self.rows = rows
+        self._slots = {}
+        # izvedene strukture vezane za baš ovaj pool (npr. indeks zamena)
+        self.memo = {}
+        return self
+
+    def __reduce__(self):
+        # van procesa je to običan tuple (indeks se ne serijalizuje)
+        return (tuple, (tuple(self),))
+
+    def for_slot(self, slot):
+        """Foods of the pool that fit ``slot`` (the whole pool if none do)."""
+        sub = self._slots.get(slot)
+        if sub is None:
+            keep = self.index.slot_mask(slot)[self.rows]
+            if not keep.any():
+                sub = self
+            else:
+                rows = self.rows[keep]
+                rows.flags.writeable = False
+                sub = FoodPool(self.index, rows)
+            self._slots[slot] = sub
+        return sub
+
+
+class FilterIndex:
+    """Tags and groups of a FoodTable compiled to per-food bitmasks.
+
+    Any combination of diet, excluded tags/groups and quick filters resolves
+    to a boolean row mask with a couple of AND/ANY operations over the bit
+    matrices; results are memoized per combination and returned read-only.
+    """
+
+    def __init__(self, table, memo_size=1024):
+        self.table = table
+        n = len(table)
+        self.tag_code = {t: i for i, t in enumerate(table.tag_names)}
+        self.group_code = {g: i for i, g in enumerate(table.group_names)}
+        self.tag_bits = _csr_bitsets(table.tag_ptr, table.tag_idx, len(table.tag_names))
+        self.group_bits = _csr_bitsets(np.arange(n + 1), table.group, len(table.group_names))
+        # slotovi po namirnici; bez "slots" namirnica ide u svaki slot
+        self.slot_names = table.slot_names
+        self.slot_code = {s: i for i, s in enumerate(self.slot_names)}
+        self.slot_bits = _csr_bitsets(table.slot_ptr, table.slot_idx, len(self.slot_names))
+        self.any_slot = np.diff(table.slot_ptr) == 0
+        self._slot_masks = {}
+        self._pools = {}
+        # imena za "ne sviđa mi se" (presavijena jednom, po katalogu)
+        self.dislikes = DislikeMatcher(table)
+        self._memo = {}
+        self._memo_size = memo_size
+
+    @staticmethod
+    def _query(bits, codes, names):
+        q = np.zeros(bits.shape[1], dtype=np.uint64)
+        for name in names:
+            c = codes.get(name)
+            if c is not None:
+                q[c // _WORD] |= np.uint64(1) << np.uint64(c % _WORD)
+        return q
+
+    def _any(self, bits, codes, names):
+        """Rows that have at least one of ``names`` (tags or groups)."""
+        q = self._query(bits, codes, names)
+        if not q.any():
+            return np.zeros(len(bits), dtype=bool)
+        return (bits & q).any(axis=1)
+
+    def _groups_ci(self, names):
+        wanted = {g.lower() for g in names}
+        return [g for g in self.table.group_names if g.lower() in wanted]
+
+    def mask(self, diet="omnivore", exclude_tags=(), exclude_groups=(), quick=()):
+        """Boolean mask of the foods that pass all the given filters."""
+        key = (diet, frozenset(exclude_tags or ()), frozenset(exclude_groups or ()),
+               frozenset(quick or ()))
+        hit = self._memo.get(key)
+        if hit is not None:
+            return hit
+
+        keep = np.ones(len(self.table), dtype=bool)
+        rule = DIET_RULES.get(diet)
+        if rule is not None:
+            tags, groups = rule
+            keep &= (self._any(self.tag_bits, self.tag_code, tags)
+                     | self._any(self.group_bits, self.group_code, groups))
+        if key[1]:
+            keep &= ~self._any(self.tag_bits, self.tag_code, key[1])
+        if key[2]:
+            keep &= ~self._any(self.group_bits, self.group_code, key[2])
+        for name in key[3]:
+            tags, groups = QUICK_FILTERS[name]
+            keep &= ~self._any(self.tag_bits, self.tag_code, tags)
+            if groups:
+                keep &= ~self._any(self.group_bits, self.group_code, self._groups_ci(groups))
+
+        keep.flags.writeable = False
+        if len(self._memo) >= self._memo_size:
+            self._memo.clear()
+        self._memo[key] = keep
+        return keep
+
+    def slot_mask(self, slot):
+        """Boolean mask of the foods usable in ``slot`` (read-only, memoized)."""
+        keep = self._slot_masks.get(slot)
+        if keep is None:
+            keep = self.any_slot | self._any(self.slot_bits, self.slot_code, (slot,))
+            keep.flags.writeable = False
+            self._slot_masks[slot] = keep
+        return keep
+
+    def pool(self, mask):
+        """``FoodPool`` of the rows in ``mask``, shared per distinct mask."""
+        key = np.packbits(mask).tobytes()
+        pool = self._pools.get(key)
+        if pool is None:
+            rows = np.flatnonzero(mask)
+            rows.flags.writeable = False
+            pool = FoodPool(self, rows)
+            if len(self._pools) >= self._memo_size:
+                self._pools.clear()
+            self._pools[key] = pool
+        return pool
+
+    def foods(self, mask):
+        """Food dicts of the rows in ``mask`` (shared, don't mutate them)."""
+        return self.pool(mask)
@@ -0,0 +1,109 @@
+# mealplan/live.py — hot-reloadable catalog: the current Planner of a foods file
+#
+# Zahtevi uzimaju live.planner (jedno čitanje atributa) i rade sa njim do kraja;
+# izmena fajla se primeti po (veličina, mtime), a heš sadržaja, novi planer i
+# njegovi indeksi se grade u pozadinskoj niti. Gotov planer se zameni jednom
+# dodelom, pa niko ne čeka i niko ne vidi napola izgrađen katalog.
+
+import os
+import threading
+import time
+
+from .catalog import source_stamp
+from .planner import Planner
+
+
+class LiveCatalog:
+    """The Planner of a catalog file, rebuilt in the background when the
+    file changes.
+
+    ``planner`` is always a complete, warmed Planner. ``check()`` (cheap:
+    one ``stat``, at most every ``interval`` seconds) notices a new size or
+    mtime and starts one rebuild thread. The thread hashes the file; a touch
+    with the same content only updates the stamp, new content is loaded
+    (compiled ``.mpcat`` sibling if fresh, see ``load_table``) and warmed,
+    then swapped in and ``on_swap(planner)`` callbacks run. A catalog that
+    fails to load (half-saved JSON...) leaves the old one in place, with
+    the error in ``error``, until the file changes again.
+
+    The first load happens in the constructor and raises as ``Planner.load``.
+    """
+
+    def __init__(self, path, workers=0, interval=1.0, warm=True, clock=time.monotonic):
+        self.path = path
+        self.workers = int(workers)
+        self.interval = interval
+        self.warm = warm
+        self.on_swap = []
+        self.error = None
+        self.reloads = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._thread = None
+        self._failed = None
+        self._checked = clock()
+        stamp = source_stamp(path)
+        self.planner = self._build()
+        self.version = stamp
+
+    def _build(self):
+        planner = Planner.load(self.path, workers=self.workers)
+        return planner.warm() if self.warm else planner
+
+    @staticmethod
+    def _stat_key(stamp):
+        return stamp["size"], stamp["mtime_ns"]
+
+    def changed(self):
+        """True if the file's size or mtime differs from the loaded version
+        (and from a version that already failed to load)."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return False    # fajl se upravo menja (rename) — sledeći put
+        key = (st.st_size, st.st_mtime_ns)
+        return key != self._stat_key(self.version) and key != self._failed
+
+    def check(self):
+        """Start a background reload if the file changed; returns the
+        current planner (never waits for the reload)."""
+        now = self._clock()
+        if now - self._checked >= self.interval:
+            self._checked = now
+            if self.changed():
+                self.reload()
+        return self.planner
+
+    def reload(self, wait=False):
+        """Rebuild from the file in a background thread (one at a time)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._reload, name="catalog-reload",
+                                                daemon=True)
+                self._thread.start()
+            thread = self._thread
+        if wait:
+            thread.join()
+        return thread
+
+    def _reload(self):
+        try:
+            stamp = source_stamp(self.path)
+        except OSError as e:
+            self.error = f"{type(e).__name__}: {e}"
+            return
+        if stamp["sha1"] == self.version["sha1"]:
+            self.version = stamp    # samo touch / kopija, sadržaj isti
+            return
+        try:
+            planner = self._build()
+        except Exception as e:  # pozadinska nit: greška ide u self.error
+            # pokvaren/nepotpun fajl: stari katalog ostaje do sledeće izmene
+            self.error = f"{type(e).__name__}: {e}"
+            self._failed = self._stat_key(stamp)
+            return
+        self.version, self.error = stamp, None
+        self.reloads += 1
+        self.planner = planner  # zamena: jedna dodela
+        for callback in list(self.on_swap):
+            callback(planner)
@@ -0,0 +1,210 @@
+# mealplan/parallel.py — fan plan generation out over worker processes
+
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .rng import new_seed, task_rng
+from .search import best_day_rows, slot_meal_rows
+from .table import score_totals, target_vector
+
+# tabela instalirana u svakom worker procesu (preko initializer-a)
+_WORKER_TABLE = None
+
+_EXECUTOR = None
+_EXECUTOR_KEY = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def parse_workers(raw):
+    """Worker count from text: "auto" = all cores, else a number (0 = in-process).
+
+    Raises ``ValueError`` on anything else.
+    """
+    raw = str(raw).strip().lower()
+    if raw == "auto":
+        return os.cpu_count() or 1
+    return max(0, int(raw))
+
+
+def workers_from_env(var="MEALPLAN_WORKERS"):
+    """Worker count from the environment: unset/0 = in-process, "auto" = all cores."""
+    try:
+        return parse_workers(os.environ.get(var) or "0")
+    except ValueError:
+        return 0
+
+
+def _install_table(table):
+    global _WORKER_TABLE
+    _WORKER_TABLE = table
+
+
+def _mp_context():
+    # Streamlit podmeće app.py kao __main__, a spawn/forkserver ga ponovo
+    # izvršavaju u svakom workeru (ceo UI). Fork to preskače i deli tabelu
+    # copy-on-write; spawn ostaje samo tamo gde fork ne postoji.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+
+def get_executor(table, workers):
+    """Persistent process pool with ``table`` preloaded in every worker.
+
+    The pool is reused across calls and only rebuilt when the worker count
+    or the catalog (by fingerprint) changes. The old pool is retired without
+    cancelling anything: other sessions may still be waiting on its futures,
+    and it exits once they are done.
+    """
+    global _EXECUTOR, _EXECUTOR_KEY
+    key = (table.fingerprint, int(workers))
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None and _EXECUTOR_KEY == key:
+            return _EXECUTOR
+        new = ProcessPoolExecutor(
+            max_workers=int(workers), mp_context=_mp_context(),
+            initializer=_install_table, initargs=(table,))
+        old, _EXECUTOR, _EXECUTOR_KEY = _EXECUTOR, new, key
+    if old is not None:
+        old.shutdown(wait=False)
+    return new
+
+
+def shutdown_executor():
+    global _EXECUTOR, _EXECUTOR_KEY
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            _EXECUTOR.shutdown(wait=True, cancel_futures=True)
+        _EXECUTOR, _EXECUTOR_KEY = None, None
+
+
+atexit.register(shutdown_executor)
+
+
+def _chunks(items, n):
+    n = max(1, min(n, len(items)))
+    size = -(-len(items) // n)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class _Progress:
+    """Counts finished meals and the best (lowest) meal score seen so far,
+    and hands ``(done, total, best)`` to a ``progress`` callback."""
+
+    def __init__(self, callback, table, total):
+        self.callback = callback
+        self.table = table
+        self.total = total
+        self.done = 0
+        self.best = float("inf")
+
+    def meal(self, rows, meal, targets):
+        if len(meal):
+            score = float(score_totals(self.table.totals(rows[meal]), target_vector(targets)))
+            self.best = min(self.best, score)
+        self.done += 1
+
+    def report(self):
+        if self.callback is not None:
+            self.callback(self.done, self.total, self.best)
+
+
+def _run_chunks(ex, task, parts, args, on_part):
+    """Submit one task per part; results come back in part order, while
+    ``on_part(part, result)`` runs as each one finishes."""
+    futures = {ex.submit(task, *args(part)): i for i, part in enumerate(parts)}
+    out = [None] * len(parts)
+    for f in as_completed(futures):
+        i = futures[f]
+        out[i] = f.result()
+        on_part(parts[i], out[i])
+    return [x for part in out for x in part]
+
+
+def _days_task(table, rows, targets, meals, max_items, seed, day_ids):
+    table = table if table is not None else _WORKER_TABLE
+    return [best_day_rows(table, rows, targets, meals=meals, max_items=max_items,
+                          rng=task_rng(seed, d)) for d in day_ids]
+
+
+def _slot_meals_task(table, jobs, max_items, engine, seed):
+    table = table if table is not None else _WORKER_TABLE
+    return [slot_meal_rows(table, rows, targets, max_items=max_items, kcal_range=kcal_range,
+                           require=require, engine=engine, rng=task_rng(seed, *key))
+            for key, rows, targets, kcal_range, require in jobs]
+
+
+def build_days(table, rows, targets, days, meals=4, max_items=3, seed=None, workers=0,
+               progress=None):
+    """``best_day_rows`` for every day of a plan, one sub-seed per day.
+
+    With ``workers > 1`` the days are spread over the persistent process
+    pool; the plan is identical for any worker count. ``seed=None`` draws a
+    fresh plan seed. ``progress(done, total, best)`` is called as days
+    finish, with meals done / total and the best meal score so far.
+    """
+    seed = new_seed() if seed is None else int(seed)
+    rows = np.asarray(rows, dtype=np.intp)
+    day_ids = list(range(days))
+    tracker = _Progress(progress, table, days * meals)
+
+    def finished(_, result):
+        for day in result:
+            for meal in day:
+                tracker.meal(rows, meal, targets)
+            tracker.done += meals - len(day)
+        tracker.report()
+
+    if workers <= 1 or days <= 1:
+        if progress is None:
+            return _days_task(table, rows, targets, meals, max_items, seed, day_ids)
+        out = []
+        for d in day_ids:
+            part = _days_task(table, rows, targets, meals, max_items, seed, [d])
+            finished(None, part)
+            out.extend(part)
+        return out
+    ex = get_executor(table, workers)
+    # sa progress-om manji delovi, da traka napreduje i dok workeri rade
+    parts = _chunks(day_ids, workers * (4 if progress is not None else 1))
+    return _run_chunks(ex, _days_task, parts,
+                       lambda part: (None, rows, targets, meals, max_items, seed, part),
+                       finished)
+
+
+def build_slot_meals(table, jobs, max_items=3, engine="random", seed=None, workers=0,
+                     progress=None):
+    """``slot_meal_rows`` for many meals at once (e.g. "regenerate all").
+
+    ``jobs`` is a list of ``(key, rows, targets, kcal_range, require)``;
+    ``key`` (e.g. ``(day, meal)``) picks the per-meal seed. Returns the pool
+    positions of each meal, in job order. ``progress(done, total, best)``
+    is called as meals finish (best = lowest meal score so far).
+    """
+    seed = new_seed() if seed is None else int(seed)
+    jobs = [(tuple(key), np.asarray(rows, dtype=np.intp), targets, kcal_range, require)
+            for key, rows, targets, kcal_range, require in jobs]
+    tracker = _Progress(progress, table, len(jobs))
+
+    def finished(part, result):
+        for (_, rows, targets, _, _), meal in zip(part, result):
+            tracker.meal(rows, meal, targets)
+        tracker.report()
+
+    if workers <= 1 or len(jobs) <= 1:
+        if progress is None:
+            return _slot_meals_task(table, jobs, max_items, engine, seed)
+        out = []
+        for job in jobs:
+            part = _slot_meals_task(table, [job], max_items, engine, seed)
+            finished([job], part)
+            out.extend(part)
+        return out
+    ex = get_executor(table, workers)
+    parts = _chunks(jobs, workers * (4 if progress is not None else 1))
+    return _run_chunks(ex, _slot_meals_task, parts,
+                       lambda part: (None, part, max_items, engine, seed), finished)
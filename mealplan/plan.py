@@ -0,0 +1,241 @@
+# mealplan/plan.py — compact, index-based meal plan
+
+import itertools
+
+import numpy as np
+
+from .totals import meal_items
+
+_UIDS = itertools.count(1)
+
+
+class CompactPlan:
+    """A meal plan as flat arrays of FoodTable rows.
+
+    ``rows`` (int32) and ``qty`` (float32) hold every item of the plan;
+    ``meal_ptr`` and ``day_ptr`` are CSR offsets (items of meal ``k`` are
+    ``rows[meal_ptr[k]:meal_ptr[k + 1]]``, meals of day ``d`` are
+    ``day_ptr[d]:day_ptr[d + 1]``). ``flags`` (uint8) has one byte per meal:
+    the slot code in the low bits (0 = no slot, ``slot_names[code - 1]``)
+    and ``LOCKED``. Food dicts are the table's shared ones; indexing the
+    plan (``plan[d]``) builds the old nested day view on demand.
+
+    ``uid`` is unique per plan object (copies get a new one) and
+    ``version`` goes up on every edit of rows, slots or quantities (not on
+    lock changes), so ``(uid, version)`` can key anything derived from the
+    plan's contents. All indices are 0-based.
+    """
+
+    LOCKED = 0x80
+    SLOT_MASK = 0x7F
+
+    def __init__(self, table, rows, qty, meal_ptr, day_ptr, flags, slot_names=()):
+        self.table = table
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.qty = np.asarray(qty, dtype=np.float32)
+        self.meal_ptr = np.asarray(meal_ptr, dtype=np.int32)
+        self.day_ptr = np.asarray(day_ptr, dtype=np.int32)
+        self.flags = np.asarray(flags, dtype=np.uint8)
+        self.slot_names = tuple(slot_names)
+        self.uid = next(_UIDS)
+        self.version = 0
+
+    @classmethod
+    def from_nested(cls, table, plan, slot_names=()):
+        """Compact copy of a nested plan (lists of meals of food dicts).
+
+        Raises ``ValueError`` if an item isn't a food of ``table``.
+        """
+        slot_names = tuple(slot_names)
+        rows, meal_ptr, day_ptr, flags = [], [0], [0], []
+        for day in plan or []:
+            for meal in day:
+                items = meal_items(meal)
+                r = table.rows_of(items)
+                if (r < 0).any():
+                    missing = [it.get("name") for it, x in zip(items, r) if x < 0]
+                    raise ValueError(f"foods not in the table: {missing}")
+                rows.extend(int(x) for x in r)
+                meal_ptr.append(len(rows))
+                slot = meal.get("slot") if isinstance(meal, dict) else None
+                flags.append(cls._slot_code(slot_names, slot))
+            day_ptr.append(len(meal_ptr) - 1)
+        return cls(table, rows, np.ones(len(rows)), meal_ptr, day_ptr, flags, slot_names)
+
+    @staticmethod
+    def _slot_code(slot_names, slot):
+        if slot is None:
+            return 0
+        if slot not in slot_names:
+            raise ValueError(f"unknown slot: {slot!r}")
+        return slot_names.index(slot) + 1
+
+    def copy(self):
+        return CompactPlan(self.table, self.rows.copy(), self.qty.copy(), self.meal_ptr.copy(),
+                           self.day_ptr.copy(), self.flags.copy(), self.slot_names)
+
+    def rebind(self, table):
+        """This plan on another FoodTable (a reloaded catalog), by food name.
+
+        Foods that are no longer in ``table`` are dropped from their meals;
+        quantities, slots and locks stay. Returns ``(plan, dropped names)``.
+        """
+        if table is self.table:
+            return self, []
+        names = self.table.names
+        rows = np.fromiter((table.name_index.get(names[r], -1) for r in self.rows),
+                           dtype=np.int64, count=len(self.rows))
+        keep = rows >= 0
+        dropped = [names[r] for r in self.rows[~keep]]
+        kept = np.concatenate([[0], np.cumsum(keep)])
+        plan = CompactPlan(table, rows[keep], self.qty[keep], kept[self.meal_ptr],
+                           self.day_ptr.copy(), self.flags.copy(), self.slot_names)
+        return plan, dropped
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.rows, self.qty, self.meal_ptr, self.day_ptr,
+                                      self.flags))
+
+    # --- čitanje ---
+
+    def __len__(self):
+        return len(self.day_ptr) - 1
+
+    def __iter__(self):
+        return (self[d] for d in range(len(self)))
+
+    def __getitem__(self, d):
+        """Day ``d`` as the old nested view: plain item lists, or
+        ``{"slot", "items"}`` for meals that carry a slot."""
+        if d < 0:
+            d += len(self)
+        if not 0 <= d < len(self):
+            raise IndexError(d)
+        out = []
+        for k in range(self.day_ptr[d], self.day_ptr[d + 1]):
+            items = self._items(k)
+            slot = self._slot(k)
+            out.append(items if slot is None else {"slot": slot, "items": items})
+        return out
+
+    def _k(self, d, m):
+        k = int(self.day_ptr[d]) + m
+        if not self.day_ptr[d] <= k < self.day_ptr[d + 1]:
+            raise IndexError((d, m))
+        return k
+
+    def _items(self, k):
+        foods = self.table.foods
+        return [foods[r] for r in self.rows[self.meal_ptr[k]:self.meal_ptr[k + 1]]]
+
+    def _slot(self, k):
+        code = int(self.flags[k]) & self.SLOT_MASK
+        return self.slot_names[code - 1] if code else None
+
+    def n_meals(self, d):
+        return int(self.day_ptr[d + 1] - self.day_ptr[d])
+
+    def items(self, d, m):
+        """Food dicts of one meal (shared, don't mutate them)."""
+        return self._items(self._k(d, m))
+
+    def meal_rows(self, d, m):
+        k = self._k(d, m)
+        return self.rows[self.meal_ptr[k]:self.meal_ptr[k + 1]]
+
+    def slot(self, d, m):
+        return self._slot(self._k(d, m))
+
+    def locked(self, d, m):
+        return bool(self.flags[self._k(d, m)] & self.LOCKED)
+
+    def qty_of(self, d, m, i):
+        k = self._k(d, m)
+        return float(self.qty[self.meal_ptr[k] + i])
+
+    def meal_qty(self, d, m):
+        k = self._k(d, m)
+        return self.qty[self.meal_ptr[k]:self.meal_ptr[k + 1]]
+
+    # --- izmene (na mestu) ---
+
+    def set_locked(self, d, m, locked=True):
+        k = self._k(d, m)
+        if locked:
+            self.flags[k] |= self.LOCKED
+        else:
+            self.flags[k] &= np.uint8(~self.LOCKED & 0xFF)
+
+    def set_qty(self, d, m, i, qty):
+        k = self._k(d, m)
+        if not 0 <= i < self.meal_ptr[k + 1] - self.meal_ptr[k]:
+            raise IndexError((d, m, i))
+        self.qty[self.meal_ptr[k] + i] = qty
+        self.version += 1
+
+    def reset_qty(self, d=None):
+        """All quantities of day ``d`` (or of the whole plan) back to 1."""
+        self.version += 1
+        if d is None:
+            self.qty[:] = 1.0
+            return
+        lo = self.meal_ptr[self.day_ptr[d]]
+        hi = self.meal_ptr[self.day_ptr[d + 1]]
+        self.qty[lo:hi] = 1.0
+
+    def set_item(self, d, m, i, row):
+        """Swap one item for another table row (its quantity stays)."""
+        k = self._k(d, m)
+        if not 0 <= i < self.meal_ptr[k + 1] - self.meal_ptr[k]:
+            raise IndexError((d, m, i))
+        self.rows[self.meal_ptr[k] + i] = row
+        self.version += 1
+
+    def _replace(self, k0, k1, meals):
+        """Replace meals ``k0:k1`` with ``[(rows, flag), ...]``.
+
+        Quantities stay with item positions (as the per-position quantity
+        keys did); new positions start at 1.
+        """
+        lo, hi = int(self.meal_ptr[k0]), int(self.meal_ptr[k1])
+        old_qty = [self.qty[self.meal_ptr[k]:self.meal_ptr[k + 1]] for k in range(k0, k1)]
+        new_rows, new_qty, sizes = [], [], []
+        for j, (rows, _) in enumerate(meals):
+            rows = np.asarray(rows, dtype=np.int32)
+            q = np.ones(len(rows), dtype=np.float32)
+            if j < len(old_qty):
+                n = min(len(rows), len(old_qty[j]))
+                q[:n] = old_qty[j][:n]
+            new_rows.append(rows)
+            new_qty.append(q)
+            sizes.append(len(rows))
+        empty_i, empty_f = np.empty(0, np.int32), np.empty(0, np.float32)
+        self.rows = np.concatenate([self.rows[:lo], *new_rows, self.rows[hi:]]
+                                   if new_rows else [self.rows[:lo], self.rows[hi:], empty_i])
+        self.qty = np.concatenate([self.qty[:lo], *new_qty, self.qty[hi:]]
+                                  if new_qty else [self.qty[:lo], self.qty[hi:], empty_f])
+        shift = sum(sizes) - (hi - lo)
+        mid = lo + np.cumsum(sizes, dtype=np.int64).astype(np.int32)
+        self.meal_ptr = np.concatenate([self.meal_ptr[:k0 + 1], mid,
+                                        self.meal_ptr[k1 + 1:] + shift]).astype(np.int32)
+        self.flags = np.concatenate([self.flags[:k0],
+                                     np.array([f for _, f in meals], dtype=np.uint8),
+                                     self.flags[k1:]]).astype(np.uint8)
+        self.version += 1
+        return len(meals) - (k1 - k0)
+
+    def set_meal(self, d, m, rows, slot=None):
+        """Replace one meal (regenerate / swap); the lock bit is kept."""
+        k = self._k(d, m)
+        flag = self._slot_code(self.slot_names, slot) | (int(self.flags[k]) & self.LOCKED)
+        self._replace(k, k + 1, [(rows, flag)])
+
+    def set_day(self, d, meals):
+        """Replace all meals of day ``d`` with ``[(rows, slot), ...]``."""
+        k0, k1 = int(self.day_ptr[d]), int(self.day_ptr[d + 1])
+        locks = [int(f) & self.LOCKED for f in self.flags[k0:k1]]
+        new = [(rows, self._slot_code(self.slot_names, slot) | (locks[j] if j < len(locks) else 0))
+               for j, (rows, slot) in enumerate(meals)]
+        delta = self._replace(k0, k1, new)
+        self.day_ptr[d + 1:] += delta
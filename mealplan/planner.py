@@ -0,0 +1,516 @@
+# mealplan/planner.py — headless planning API (app.py is only the UI on top)
+
+import numpy as np
+
+from .catalog import MEAL_SLOTS, load_table, normalize_food
+from .exact import exact_meal_rows
+from .filters import FilterIndex, FoodPool
+from .parallel import build_days, build_slot_meals, workers_from_env
+from .rng import as_generator, as_random, new_seed, sub_seed, task_rng
+from .search import best_meal_rows, slot_meal_rows
+from .swaps import swap_index
+from .table import FoodTable, score_totals, target_vector
+
+# raspodela dnevnih kcal (možeš menjati)
+SLOT_DISTRIB = {"breakfast": 0.25,
+                "lunch": 0.35, "snack": 0.10, "dinner": 0.30}
+
+# cilj kcal po obroku (meki rasponi — kao guardrails)
+SLOT_KCAL_RANGE = {
+    "breakfast": (300, 600),
+    "lunch":     (500, 850),
+    "snack":     (120, 300),
+    "dinner":    (500, 800),
+}
+
+# grupe koje važe kao "protein baza" za slane obroke
+# prepared često sadrži proteine (npr. “wrap”, “bolognese”)
+PROTEIN_GROUPS = {"meat", "fish", "plant_protein",
+                  "legumes", "eggs", "prepared"}
+
+# najveći slot pool za koji warm() unapred gradi indeks zamena (kvadratno u veličini)
+WARM_SWAPS_MAX = 5_000
+
+# preseti profila: (protein %, UH %, masti %, faktor dnevnih kcal)
+PROFILE_MACROS = {
+    "cut": (0.35, 0.35, 0.30, 0.85),
+    "maintain": (0.30, 0.40, 0.30, 1.00),
+    "bulk": (0.25, 0.50, 0.25, 1.15),
+}
+
+
+def macro_targets(total_kcal, protein_pct, carbs_pct, fat_pct):
+    protein_kcal = total_kcal * protein_pct
+    carbs_kcal = total_kcal * carbs_pct
+    fat_kcal = total_kcal * fat_pct
+
+    protein_g = protein_kcal / 4.0
+    carbs_g = carbs_kcal / 4.0
+    fat_g = fat_kcal / 9.0
+
+    targets = {
+        "kcal": float(total_kcal),
+        "p": protein_g,
+        "c": carbs_g,
+        "f": fat_g,
+        "protein_g": protein_g,
+        "carbs_g": carbs_g,
+        "fat_g": fat_g,
+    }
+    # cache a copy for downstream lookups that expect a nested "target" mapping
+    targets["target"] = {k: targets[k] for k in ("kcal", "p", "c", "f")}
+    return targets
+
+
+def plan_targets(prefs):
+    """macro_targets of the prefs plus the per-meal split (``kcal_meal`` ...)."""
+    macros = macro_targets(
+        prefs["effective_kcal"], prefs["protein_pct"], prefs["carbs_pct"], prefs["fat_pct"])
+    meals_count = max(1, prefs["meals"])
+    macros["kcal_meal"] = prefs["effective_kcal"] / meals_count
+    macros["p_meal"] = macros["p"] / meals_count
+    macros["c_meal"] = macros["c"] / meals_count
+    macros["f_meal"] = macros["f"] / meals_count
+    macros["meals"] = meals_count
+    return macros
+
+
+def scale_macros(total, frac):
+    # total expects dict with keys kcal/p/c/f
+    return {k: total[k] * frac for k in ("kcal", "p", "c", "f")}
+
+
+def slot_targets(total_target):
+    return {slot: scale_macros(total_target, SLOT_DISTRIB[slot]) for slot in MEAL_SLOTS}
+
+
+def foods_for_slot(all_foods, slot):
+    # pool iz FilterIndex-a: gotov (deljen) pogled po slotu
+    if isinstance(all_foods, FoodPool):
+        return all_foods.for_slot(slot)
+    pool = [f for f in all_foods if slot in (f.get("slots") or MEAL_SLOTS)]
+    return pool or list(all_foods)
+
+
+def _slot_require(pool, slot):
+    # ako je ručak/večera, mora imati proteine
+    if slot in ("lunch", "dinner"):
+        return np.array([f.get("group") in PROTEIN_GROUPS for f in pool], dtype=bool)
+    return None
+
+
+def _meal_items(meal):
+    return meal.get("items", []) if isinstance(meal, dict) else meal
+
+
+def deferred_html(render, plan, targets, title, prefs, cache):
+    """No-argument callable returning the HTML export as UTF-8 bytes.
+
+    ``render`` is ``Planner.to_html`` (or a wrapper of it). The HTML is only
+    built when the callable is called, from the plan as it is then, and kept
+    in ``cache`` under the plan's (uid, version), title and language, so
+    repeated calls reuse one build until the plan is edited; ``cache`` holds
+    only the latest build.
+    """
+    def build():
+        key = (getattr(plan, "uid", id(plan)), getattr(plan, "version", 0), title,
+               prefs.get("lang", "EN"))
+        data = cache.get(key)
+        if data is None:
+            data = render(plan, targets, title, prefs).encode("utf-8")
+            cache.clear()   # samo poslednja verzija plana
+            cache[key] = data
+        return data
+
+    return build
+
+
+class Planner:
+    """Meal planning over one food catalog, with no UI attached.
+
+    Holds the catalog's FoodTable and FilterIndex (built once, read-only,
+    shared by every caller) and the number of worker processes. Pools and
+    foods passed in are normally the planner's own (``planner.foods`` or
+    a ``FoodPool`` of its index); other food lists still work, through the
+    slower per-dict paths. Quantities and indices follow the app: plans
+    are nested lists (day -> meals -> food dicts, or ``{"slot", "items"}``).
+    """
+
+    def __init__(self, table, filters=None, workers=0):
+        self.table = table
+        self.filters = filters if filters is not None else FilterIndex(table)
+        self.workers = int(workers)
+
+    @classmethod
+    def from_foods(cls, foods, workers=0):
+        return cls(FoodTable([normalize_food(f) for f in foods]), workers=workers)
+
+    @classmethod
+    def load(cls, path, workers=None):
+        """Planner of a catalog file; ``workers`` defaults to MEALPLAN_WORKERS.
+
+        ``path`` is foods.json (its compiled ``.mpcat`` is used when fresh)
+        or a ``.mpcat`` file directly, see ``catalog.load_table``.
+        """
+        workers = workers_from_env() if workers is None else workers
+        return cls(load_table(path), workers=workers)
+
+    @property
+    def foods(self):
+        return self.table.foods
+
+    def warm(self, diets=("omnivore",)):
+        """Build the derived indexes first requests would otherwise build.
+
+        Slot masks, the pool of each diet with its slot views, and the swap
+        neighbours of slot pools up to ``WARM_SWAPS_MAX`` foods. Returns
+        self, so a freshly loaded planner can be warmed before it is used.
+        """
+        for diet in diets:
+            pool = self.filters.foods(self.filters.mask(diet))
+            for slot in MEAL_SLOTS:
+                sub = pool.for_slot(slot)
+                if len(sub) <= WARM_SWAPS_MAX:
+                    swap_index(sub)
+        return self
+
+    def index_for(self, foods):
+        if foods is self.table.foods:
+            return self.filters
+        return FilterIndex(FoodTable(foods))
+
+    # --- filteri ---
+
+    def filter_by_diet(self, foods, diet):
+        index = self.index_for(foods)
+        return index.foods(index.mask(diet))
+
+    def pool_mask(self, prefs, index=None):
+        """Row mask of the plan pool (diet, exclusions, dislikes).
+
+        Diet, excluded tags and excluded groups are one memoized bitset lookup;
+        dislikes go through the index's folded-name matcher (EN and SR input).
+        Returns ``(mask, relaxed)``; with fewer than 5 foods left the pool falls
+        back to the diet alone and ``relaxed`` is True.
+        """
+        index = index or self.filters
+        mask = index.mask(prefs["diet"], prefs["exclude_tags"], prefs["exclude_groups"])
+        disliked = index.dislikes.mask(prefs["dislikes"])
+        if disliked is not None:
+            mask = mask & ~disliked
+        if np.count_nonzero(mask) < 5:
+            return index.mask(prefs["diet"]), True
+        return mask, False
+
+    def pool(self, prefs, quick=()):
+        """``(FoodPool, relaxed)`` of the prefs, optionally with quick filters."""
+        mask, relaxed = self.pool_mask(prefs)
+        if quick:
+            mask = mask & self.filters.mask(quick=quick)
+        return self.filters.foods(mask), relaxed
+
+    # --- zbirovi i skor ---
+
+    def meal_totals(self, items, qty=None):
+        """(kcal, P, C, F) of a list of items — one FoodTable gather + sum."""
+        return self.table.items_totals(items, qty)
+
+    def day_totals(self, day):
+        tot = np.zeros(4)
+        for meal in day:
+            tot += self.meal_totals(_meal_items(meal))
+        return tot
+
+    def pool_rows(self, foods):
+        """FoodTable row ids for a pool, or None if some food isn't in the table."""
+        if isinstance(foods, FoodPool) and foods.index.table is self.table:
+            return foods.rows
+        rows = self.table.rows_of(foods)
+        return rows if (rows >= 0).all() else None
+
+    def score_meal(self, meal, targets):
+        # meal je lista stavki (dict) ili niz FoodTable indeksa
+        if isinstance(meal, np.ndarray):
+            totals = self.table.totals(meal)
+        else:
+            totals = self.meal_totals(meal)
+        # Weighted absolute diffs
+        return float(score_totals(totals, target_vector(targets)))
+
+    # --- obroci ---
+
+    def build_meal(self, foods, targets, max_items_per_meal=3, batched=True, rng=None):
+        # rng: seed, random.Random, numpy Generator ili None (svež)
+        if not foods:
+            return []
+
+        pool = list(foods)
+        rows = self.pool_rows(pool)
+        if batched and rows is not None:
+            # svih 200 kandidata odjednom: matrica indeksa + jedan vektorski skor
+            best = best_meal_rows(self.table, rows, targets,
+                                  max_items=max_items_per_meal, rng=as_generator(rng))
+            return [pool[i] for i in best]
+
+        rng = as_random(rng)
+
+        tvec = target_vector(targets)
+
+        def score(idx):
+            if rows is None:
+                # hrana van tabele — skoruj direktno nad dict-ovima
+                return self.score_meal([pool[i] for i in idx], targets)
+            return float(score_totals(self.table.macros[:, rows[idx]].sum(axis=1), tvec))
+
+        n = len(pool)
+        best_idx, best_score = None, 1e9
+
+        for _ in range(200):
+            spread = max(2, int(rng.gauss(2.5, 0.6)))
+            k = max(1, min(max_items_per_meal, spread, n))
+
+            idx = rng.sample(range(n), k=k)
+            if rng.random() < 0.35 and len(idx) < max_items_per_meal:
+                idx.append(rng.randrange(n))
+
+            s = score(idx)
+            if s < best_score:
+                best_score, best_idx = s, idx
+
+        return [pool[i] for i in best_idx] if best_idx else []
+
+    def build_meal_for_slot(self, pool, slot_target, slot, max_items_per_meal=3,
+                            engine="random", rng=None):
+        rows = self.pool_rows(pool)
+        if rows is not None:
+            # exact: kcal opseg i proteinska baza su ograničenja branch-and-bound pretrage
+            best = slot_meal_rows(self.table, rows, slot_target, max_items=max_items_per_meal,
+                                  kcal_range=SLOT_KCAL_RANGE[slot],
+                                  require=_slot_require(pool, slot),
+                                  engine=engine, rng=as_generator(rng))
+            return [pool[i] for i in best]
+
+        rng = as_random(rng)
+        meal = self.build_meal(pool, slot_target, max_items_per_meal=max_items_per_meal, rng=rng)
+
+        # ako je ručak/večera, mora imati proteine
+        if slot in ("lunch", "dinner"):
+            has_protein = any((normalize_food(x).get("group")
+                              in PROTEIN_GROUPS) for x in meal)
+            if not has_protein:
+                candidates = [f for f in pool if f.get("group") in PROTEIN_GROUPS]
+                if candidates:
+                    meal[-1] = rng.choice(candidates)
+
+        lo, hi = SLOT_KCAL_RANGE[slot]
+        tries = 0
+        while not (lo <= self.meal_totals(meal)[0] <= hi) and tries < 3:
+            meal = self.build_meal(pool, slot_target,
+                                   max_items_per_meal=max_items_per_meal, rng=rng)
+            tries += 1
+        return meal
+
+    def build_meals_for_slots(self, requests, max_items_per_meal=3, engine="random", seed=None,
+                              progress=None):
+        """build_meal_for_slot for many (key, pool, slot_target, slot) requests.
+
+        Every key (e.g. (day, meal)) gets its own sub-seed of ``seed``, so the
+        result is reproducible and doesn't depend on the number of workers.
+        ``progress(done, total, best)`` is called as meals finish.
+        """
+        seed = new_seed() if seed is None else seed
+        pool_rows = [self.pool_rows(pool) for _, pool, _, _ in requests]
+        if any(rows is None for rows in pool_rows):
+            # neki pool nije (ceo) u tabeli: svi obroci idu starim putem
+            meals, best = [], float("inf")
+            for key, pool, slot_target, slot in requests:
+                meal = self.build_meal_for_slot(pool, slot_target, slot, max_items_per_meal,
+                                                engine, rng=sub_seed(seed, *key))
+                meals.append(meal)
+                if progress is not None:
+                    best = min(best, self.score_meal(meal, slot_target)) if meal else best
+                    progress(len(meals), len(requests), best)
+            return meals
+        jobs = [(key, rows, slot_target, SLOT_KCAL_RANGE[slot], _slot_require(pool, slot))
+                for (key, pool, slot_target, slot), rows in zip(requests, pool_rows)]
+        meals = build_slot_meals(self.table, jobs, max_items=max_items_per_meal, engine=engine,
+                                 seed=seed, workers=self.workers, progress=progress)
+        return [[pool[i] for i in best] for (_, pool, _, _), best in zip(requests, meals)]
+
+    # --- plan ---
+
+    def _random_day(self, foods, targets, meals=4, max_items_per_meal=3, rng=None):
+        # build a day using older approach (uniform meals); only for pools that
+        # aren't fully in the table — otherwise build_days does this
+        rng = as_random(rng)
+        best_day, best_score = None, 1e9
+        foods_list = list(foods)
+        names = [f["name"] for f in foods_list]
+
+        for _ in range(400):
+            day, total_score, used = [], 0, set()
+            success = True
+
+            for _m in range(meals):
+                candidates = [
+                    i for i, name in enumerate(names) if name not in used or rng.random() < 0.4
+                ]
+                if not candidates:
+                    candidates = list(range(len(foods_list)))
+
+                if not candidates:
+                    success = False
+                    break
+
+                spread = max(2, int(rng.gauss(2.5, 0.6)))
+                k = max(1, min(max_items_per_meal, spread, len(candidates)))
+                if k == 0:
+                    success = False
+                    break
+
+                meal_idx = rng.sample(candidates, k=k)
+                if rng.random() < 0.35 and candidates and len(meal_idx) < max_items_per_meal:
+                    meal_idx.append(rng.choice(candidates))
+
+                total_score += self.score_meal([foods_list[i] for i in meal_idx], targets)
+                for i in meal_idx:
+                    used.add(names[i])
+                day.append(meal_idx)
+
+            if not success or len(day) != meals:
+                continue
+
+            if total_score < best_score:
+                best_score, best_day = total_score, day
+
+        return [[foods_list[i] for i in meal_idx] for meal_idx in best_day or []]
+
+    def _exact_day(self, foods, targets, used, meals=4, max_items_per_meal=3, seed=0, day_no=0):
+        # egzaktni motor: najbolji obrok za svaki cilj, bez ponavljanja imena dok
+        # u pool-u ima dovoljno neiskorišćenih namirnica (deterministički);
+        # hrana van tabele ide na nasumični build_meal sa rng-om (seed, dan, obrok)
+        day = []
+        for m in range(meals):
+            fresh = [f for f in foods if f["name"] not in used]
+            if len(fresh) < 5:
+                used.clear()
+                fresh = list(foods)
+            rows = self.pool_rows(fresh)
+            if rows is None:
+                meal = self.build_meal(fresh, targets, max_items_per_meal=max_items_per_meal,
+                                       rng=task_rng(seed, day_no, m))
+            else:
+                best, _, _ = exact_meal_rows(self.table, rows, targets,
+                                             max_items=max_items_per_meal)
+                meal = [fresh[i] for i in best]
+            used.update(f["name"] for f in meal)
+            day.append(meal)
+        return day
+
+    def generate_plan(self, foods, days, prefs, seed=None, progress=None):
+        """``(plan, macros)`` for the prefs over ``foods``.
+
+        Same (prefs, seed, catalog) => same plan; the seed is kept in
+        ``macros["seed"]`` and ``macros["filters_relaxed"]`` is set when the
+        exclusions left too few foods. ``progress(done, total, best)`` hears
+        about finished meals and the best meal score so far.
+        """
+        seed = new_seed() if seed is None else int(seed)
+        macros = plan_targets(prefs)
+        macros["seed"] = seed
+
+        index = self.index_for(foods)
+        mask, relaxed = self.pool_mask(prefs, index)
+        if relaxed:
+            macros["filters_relaxed"] = True
+        pool = index.foods(mask)
+
+        engine = prefs.get("engine", "random")
+        rows = self.pool_rows(pool)
+        if engine != "exact" and rows is not None:
+            # dani su nezavisni: vektorska pretraga po danu, sa seed-om po danu,
+            # raspoređena na self.workers procesa
+            days_idx = build_days(self.table, rows, macros, days, meals=prefs["meals"],
+                                  max_items=prefs["max_items"], seed=seed,
+                                  workers=self.workers, progress=progress)
+            plan = [[[pool[i] for i in meal_idx] for meal_idx in day] for day in days_idx]
+            return plan, macros
+
+        plan, used, best = [], set(), float("inf")
+        for d in range(days):
+            if engine == "exact":
+                day = self._exact_day(
+                    pool, macros, used, meals=prefs["meals"],
+                    max_items_per_meal=prefs["max_items"], seed=seed, day_no=d)
+            else:
+                day = self._random_day(
+                    pool, macros, meals=prefs["meals"], max_items_per_meal=prefs["max_items"],
+                    rng=sub_seed(seed, d))
+            plan.append(day)
+            if progress is not None:
+                best = min([best] + [self.score_meal(meal, macros) for meal in day if meal])
+                progress((d + 1) * prefs["meals"], days * prefs["meals"], best)
+        return plan, macros
+
+    def suggest_swaps(self, item, pool, topk=5, tol=0.30):
+        """Up to ``topk`` foods of ``pool`` that could replace ``item``.
+
+        Slot pools of the index keep their top-k neighbours, so this is a
+        lookup; other lists are scored on the spot the same way.
+        """
+        if not pool:
+            return []
+        return swap_index(pool, topk, tol).suggest(item)
+
+    # --- HTML izvoz ---
+
+    def iter_html(self, plan, targets, title, prefs, mode="web"):
+        """Standalone HTML export as chunks (head, one per day, tail).
+
+        ``mode`` is "web" or "print"; both currently render the same markup.
+        """
+        lang = prefs.get("lang", "EN")
+        day_label = "Day" if lang == "EN" else "Dan"
+        carbs_label = "Carbs" if lang == "EN" else "UH"
+        fat_label = "Fat" if lang == "EN" else "Masti"
+
+        def _meal_html(meal, idx):
+            kcal, p, c, f = (int(v) for v in self.meal_totals(meal))
+            items = "".join(
+                [f"<li>{it.get('name', '?')} (~{int(it.get('portion_g', it.get('portion', 0)))} g)</li>" for it in meal])
+            return f"""
+            <div style="border:1px solid #e5e7eb; border-radius:10px; padding:10px; margin:8px 0;">
+              <div style="font-weight:700; margin-bottom:6px;">Meal {idx} • {kcal} kcal • P {p}g • {carbs_label} {c}g • {fat_label} {f}g</div>
+              <ul style="margin:0 0 0 18px;">{items}</ul>
+            </div>
+            """
+
+        style = """
+        <style>
+          body{font-family:system-ui,-apple-system,Segoe UI,Roboto,Ubuntu,Cantarell,Inter,sans-serif; padding:18px;}
+          h1{margin:0 0 12px 0; font-size:20px}
+          h3{margin:18px 0 8px 0;}
+        </style>
+        """
+        yield f"<!doctype html><html><head><meta charset='utf-8'>{style}<title>{title}</title></head><body><h1>{title}</h1>"
+        empty = True
+        for d_idx, day in enumerate(plan or [], start=1):
+            empty = False
+            meals = [_meal_html(_meal_items(meal), m_idx)
+                     for m_idx, meal in enumerate(day, start=1)]
+            yield f"<h3>{day_label} {d_idx}</h3>" + "".join(meals)
+        if empty:
+            yield "<p>No items yet.</p>"
+        yield "</body></html>"
+
+    def write_html(self, plan, targets, title, prefs, fp, mode="web"):
+        """Stream the HTML export into a text file object, one day at a time
+        (long plans never exist as one string). Returns characters written."""
+        n = 0
+        for chunk in self.iter_html(plan, targets, title, prefs, mode):
+            n += fp.write(chunk)
+        return n
+
+    def to_html(self, plan, targets, title, prefs, mode="web"):
+        """Return a minimal standalone HTML so downloads don't crash."""
+        return "".join(self.iter_html(plan, targets, title, prefs, mode))
@@ -0,0 +1,167 @@
+# mealplan/profiler.py — opt-in per-stage timings of one app run
+
+import contextlib
+import cProfile
+import functools
+import io
+import json
+import marshal
+import pstats
+import time
+import tracemalloc
+
+_ON = {"1", "true", "yes", "on", "time", "timing"}
+_CPROFILE = {"cprofile", "cpu", "all"}
+_MEMORY = {"memory", "mem", "tracemalloc", "all"}
+
+
+class StageProfiler:
+    """Wall time per named stage (``perf_counter``), for one script run.
+
+    ``stage(name)`` is a context manager and ``timed(name)`` a decorator;
+    both add to ``name``'s total and call count, and nested stages are
+    counted in both. With ``cprofile`` the whole run is also under
+    cProfile, with ``memory`` under tracemalloc. Both are process-wide
+    (cProfile through ``sys.monitoring`` on Python 3.12+), so a profiler
+    that finds another one active falls back to timings only and sets
+    ``cprofile_refused`` / ``memory_refused``; it only stops what it
+    started. A disabled profiler hands out ``nullcontext`` and leaves
+    decorated functions untouched.
+    """
+
+    def __init__(self, enabled=False, cprofile=False, memory=False):
+        self.enabled = bool(enabled or cprofile or memory)
+        self.cprofile = bool(cprofile)
+        self.memory = bool(memory)
+        self.stages = {}        # ime -> [ukupno sekundi, broj poziva]
+        self.started = self.finished = None
+        self.cprofile_refused = False
+        self.memory_refused = False
+        self._profile = None
+        self._snapshot = None
+        self._peak = 0
+        self._tracing = False   # da li je ovaj profiler pokrenuo tracemalloc
+
+    @classmethod
+    def from_option(cls, value, snapshots=True):
+        """Profiler from a query param / env value: "1" = timings,
+        "cprofile", "memory" or "all" add the snapshots; comma-separated.
+        With ``snapshots=False`` every option only turns on timings."""
+        opts = {v.strip().lower() for v in str(value or "").split(",")} - {""}
+        return cls(enabled=bool(opts & (_ON | _CPROFILE | _MEMORY)),
+                   cprofile=snapshots and bool(opts & _CPROFILE),
+                   memory=snapshots and bool(opts & _MEMORY))
+
+    def start(self):
+        if not self.enabled:
+            return self
+        self.started = time.perf_counter()
+        if self.memory:
+            # tuđe praćenje (druga sesija, test) se ne dira
+            if tracemalloc.is_tracing():
+                self.memory_refused = True
+            else:
+                tracemalloc.start()
+                self._tracing = True
+        if self.cprofile:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # drugi profiler je već aktivan (3.12+: jedan po procesu)
+                self.cprofile_refused = True
+            else:
+                self._profile = profile
+        return self
+
+    def finish(self):
+        if not self.enabled or self.finished is not None:
+            return self
+        if self._profile is not None:
+            self._profile.disable()
+        if self._tracing:
+            self._tracing = False
+            if tracemalloc.is_tracing():
+                self._snapshot = tracemalloc.take_snapshot()
+                self._peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        self.finished = time.perf_counter()
+        return self
+
+    def add(self, name, seconds):
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += 1
+
+    @contextlib.contextmanager
+    def _timer(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - t0)
+
+    def stage(self, name):
+        return self._timer(name) if self.enabled else contextlib.nullcontext()
+
+    def timed(self, name):
+        def wrap(fn):
+            if not self.enabled:
+                return fn
+
+            @functools.wraps(fn)
+            def inner(*args, **kwargs):
+                with self._timer(name):
+                    return fn(*args, **kwargs)
+            return inner
+        return wrap
+
+    @property
+    def total(self):
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return end - self.started
+
+    def rows(self):
+        """``[(stage, calls, ms, % of run)]``, slowest first."""
+        total = self.total or 1.0
+        return [(name, calls, 1000.0 * sec, 100.0 * sec / total)
+                for name, (sec, calls) in sorted(self.stages.items(), key=lambda kv: -kv[1][0])]
+
+    def cprofile_text(self, limit=25, sort="cumulative"):
+        if self._profile is None:
+            return ""
+        out = io.StringIO()
+        pstats.Stats(self._profile, stream=out).sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def cprofile_bytes(self):
+        """Raw stats in the ``.prof`` format (``pstats.Stats(path)`` reads it)."""
+        if self._profile is None:
+            return b""
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+
+    def memory_top(self, limit=15):
+        """``[(file:line, KiB, blocks)]`` of the biggest allocations."""
+        if self._snapshot is None:
+            return []
+        stats = self._snapshot.statistics("lineno")[:limit]
+        return [(f"{s.traceback[0].filename}:{s.traceback[0].lineno}", s.size / 1024.0, s.count)
+                for s in stats]
+
+    def raw(self):
+        """Everything above as a JSON-able dict."""
+        return {
+            "total_ms": 1000.0 * self.total,
+            "stages": [{"stage": n, "calls": c, "ms": ms, "pct": pct}
+                       for n, c, ms, pct in self.rows()],
+            "memory_peak_kib": self._peak / 1024.0 if self._snapshot is not None else None,
+            "memory_top": [{"where": w, "kib": k, "blocks": b}
+                           for w, k, b in self.memory_top()],
+            "cprofile": self.cprofile_text() or None,
+        }
+
+    def to_json(self):
+        return json.dumps(self.raw(), indent=2)
@@ -0,0 +1,48 @@
+# mealplan/rng.py — seeds and random generators for the planner
+
+import random
+import secrets
+
+import numpy as np
+
+
+def new_seed():
+    """Fresh 63-bit plan seed (small enough for JSON / query params)."""
+    return secrets.randbits(63)
+
+
+def sub_seed(seed, *key):
+    """Deterministic child seed of ``seed`` for a key like ``(day, slot)``."""
+    ss = np.random.SeedSequence([int(seed), *map(int, key)])
+    return int(ss.generate_state(2, dtype=np.uint32).view(np.uint64)[0] >> np.uint64(1))
+
+
+def task_rng(seed, *key):
+    """Independent numpy generator for one (day[, meal]) task.
+
+    Derived only from the plan seed and the task key, so the result of a
+    task doesn't depend on which worker runs it or in what order.
+    """
+    return np.random.default_rng(np.random.SeedSequence([int(seed), *map(int, key)]))
+
+
+def as_generator(rng=None):
+    """numpy ``Generator`` from a seed, ``random.Random``, Generator or None."""
+    if isinstance(rng, np.random.Generator):
+        return rng
+    if isinstance(rng, random.Random):
+        return np.random.default_rng(rng.getrandbits(64))
+    if rng is None:
+        return np.random.default_rng()
+    return np.random.default_rng(int(rng))
+
+
+def as_random(rng=None):
+    """``random.Random`` from a seed, numpy Generator, Random or None."""
+    if isinstance(rng, random.Random):
+        return rng
+    if isinstance(rng, np.random.Generator):
+        return random.Random(int(rng.integers(0, 2**63)))
+    if rng is None:
+        return random.Random()
+    return random.Random(int(rng))
@@ -0,0 +1,198 @@
+# mealplan/search.py — vectorized random search over FoodTable rows
+
+import numpy as np
+
+from .exact import exact_meal_rows
+from .rng import as_generator
+from .table import score_totals, target_vector
+
+# iznad ovoga ne pravimo (uzoraka × pool) matricu ključeva, nego biramo
+# indekse direktno i ponovo izvlačimo redove sa duplikatima
+_DENSE_POOL_MAX = 4096
+
+
+def _sample_distinct(rng, n, n_samples, k_max):
+    """(n_samples, k_max) matrix of distinct indices in [0, n) per row.
+
+    Column order is random, so the first k columns of a row are a uniform
+    k-subset for every k <= k_max.
+    """
+    if n <= _DENSE_POOL_MAX:
+        keys = rng.random((n_samples, n))
+        sel = np.argpartition(keys, k_max - 1, axis=1)[:, :k_max]
+        order = np.argsort(np.take_along_axis(keys, sel, axis=1), axis=1)
+        return np.take_along_axis(sel, order, axis=1)
+
+    idx = rng.integers(0, n, size=(n_samples, k_max))
+    while True:
+        srt = np.sort(idx, axis=1)
+        dup = (srt[:, 1:] == srt[:, :-1]).any(axis=1)
+        if not dup.any():
+            return idx
+        idx[dup] = rng.integers(0, n, size=(int(dup.sum()), k_max))
+
+
+def sample_meals(rng, n, n_samples=200, max_items=3):
+    """Draw ``n_samples`` random meals from a pool of ``n`` foods at once.
+
+    Mirrors the scalar sampler in ``build_meal``: ``k = clamp(int(gauss(2.5,
+    0.6)), 2..max_items)`` distinct foods, plus a 35% chance of one extra
+    (possibly repeated) food while the meal is below ``max_items``.
+
+    Returns ``(idx, mask)``, both ``(n_samples, max_items)``; ``idx`` holds
+    pool positions and ``mask`` marks the columns that are part of the meal.
+    """
+    k_max = max(1, min(max_items, n))
+    spread = np.maximum(2, np.trunc(rng.normal(2.5, 0.6, n_samples)).astype(np.int64))
+    k = np.maximum(1, np.minimum(np.minimum(spread, max_items), n))
+
+    idx = np.zeros((n_samples, max_items), dtype=np.intp)
+    idx[:, :k_max] = _sample_distinct(rng, n, n_samples, k_max)
+    cols = np.arange(max_items)
+    mask = cols[None, :] < k[:, None]
+
+    extra = (rng.random(n_samples) < 0.35) & (k < max_items)
+    rows = np.flatnonzero(extra)
+    idx[rows, k[rows]] = rng.integers(0, n, size=rows.size)
+    mask[rows, k[rows]] = True
+    return idx, mask
+
+
+def meal_scores(table, rows, idx, mask, targets):
+    """score_meal for every sampled meal in one pass; returns (n_samples,)."""
+    cols = table.macros[:, rows[idx]]                 # (4, S, K)
+    totals = np.where(mask, cols, 0.0).sum(axis=-1)   # (4, S)
+    return score_totals(totals, target_vector(targets))
+
+
+def best_meal_rows(table, rows, targets, max_items=3, n_samples=200, rng=None):
+    """Batched ``build_meal``: best of ``n_samples`` random meals.
+
+    ``rows`` are the FoodTable rows of the pool. Returns the pool positions of
+    the argmin-score meal (ties go to the earliest sample, like the loop).
+    """
+    n = len(rows)
+    if n == 0:
+        return []
+    rng = as_generator(rng)
+    idx, mask = sample_meals(rng, n, n_samples, max_items)
+    best = int(np.argmin(meal_scores(table, rows, idx, mask, targets)))
+    return idx[best][mask[best]].tolist()
+
+
+# koliko (trial × food) ćelija držimo u memoriji odjednom u best_day_rows
+_DAY_CHUNK_CELLS = 1 << 21
+
+
+def _day_trials(table, rows, codes, tvec, n_trials, meals, max_items, rng):
+    """Run ``n_trials`` independent day trials at once.
+
+    Returns ``(scores, picks)`` where ``picks`` is a list with one
+    ``(idx, mask)`` pair per meal, each ``(n_trials, max_items)``.
+    """
+    n = len(rows)
+    k_max = max(1, min(max_items, n))
+    trial = np.arange(n_trials)
+    used = np.zeros((n_trials, int(codes.max()) + 1), dtype=bool)
+    scores = np.zeros(n_trials)
+    picks = []
+
+    for _m in range(meals):
+        # već korišćena imena ulaze ponovo samo sa verovatnoćom 0.4
+        cand = ~used[:, codes] | (rng.random((n_trials, n)) < 0.4)
+        count = cand.sum(axis=1)
+        empty = count == 0
+        cand[empty] = True
+        count[empty] = n
+
+        spread = np.maximum(2, np.trunc(rng.normal(2.5, 0.6, n_trials)).astype(np.int64))
+        k = np.maximum(1, np.minimum(np.minimum(spread, max_items), count))
+
+        keys = np.where(cand, rng.random((n_trials, n)), 2.0)
+        sel = np.argpartition(keys, k_max - 1, axis=1)[:, :k_max]
+        order = np.argsort(np.take_along_axis(keys, sel, axis=1), axis=1)
+
+        idx = np.zeros((n_trials, max_items), dtype=np.intp)
+        idx[:, :k_max] = np.take_along_axis(sel, order, axis=1)
+        mask = np.arange(max_items)[None, :] < k[:, None]
+
+        extra = (rng.random(n_trials) < 0.35) & (k < max_items)
+        choice = np.argmin(np.where(cand, rng.random((n_trials, n)), 2.0), axis=1)
+        ex = np.flatnonzero(extra)
+        idx[ex, k[ex]] = choice[ex]
+        mask[ex, k[ex]] = True
+
+        cols = table.macros[:, rows[idx]]
+        scores += score_totals(np.where(mask, cols, 0.0).sum(axis=-1), tvec)
+
+        hit = np.broadcast_to(trial[:, None], idx.shape)[mask]
+        used[hit, codes[idx[mask]]] = True
+        picks.append((idx, mask))
+
+    return scores, picks
+
+
+def best_day_rows(table, rows, targets, meals=4, max_items=3, n_trials=400, rng=None):
+    """Vectorized ``build_day``: best of ``n_trials`` random whole days.
+
+    Same semantics as the loop in ``generate_plan``: per meal a food whose
+    name was already used that day is a candidate again only with
+    probability 0.4 (all foods if that leaves nothing), ``k`` distinct
+    candidates are drawn, plus a 35% chance of one extra candidate. Days are
+    scored as the sum of their meal scores and the argmin day is returned as
+    a list of meals, each a list of pool positions.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    n = len(rows)
+    if n == 0 or meals <= 0:
+        return []
+    rng = as_generator(rng)
+    tvec = target_vector(targets)
+    # "ime" = kanonski red u tabeli, tako da duplikati imena dele used bit
+    names = np.fromiter((table.name_index[table.names[r]] for r in rows),
+                        dtype=np.intp, count=n)
+    _, codes = np.unique(names, return_inverse=True)
+
+    chunk = max(1, min(n_trials, _DAY_CHUNK_CELLS // n))
+    best_score, best_day = np.inf, None
+    for start in range(0, n_trials, chunk):
+        size = min(chunk, n_trials - start)
+        scores, picks = _day_trials(table, rows, codes, tvec, size, meals, max_items, rng)
+        t = int(np.argmin(scores))
+        if scores[t] < best_score:
+            best_score = scores[t]
+            best_day = [idx[t][mask[t]].tolist() for idx, mask in picks]
+    return best_day
+
+
+def slot_meal_rows(table, rows, targets, max_items=3, kcal_range=None, require=None,
+                   engine="random", rng=None):
+    """``build_meal_for_slot`` over FoodTable rows; returns pool positions.
+
+    Random engine: best batched meal, a required (protein) food swapped in for
+    the last item if none was drawn, then up to 3 redraws while the meal kcal
+    is outside ``kcal_range``. Exact engine: ``exact_meal_rows`` with the same
+    constraints built into the search.
+    """
+    rows = np.asarray(rows, dtype=np.intp)
+    if engine == "exact":
+        best, _, _ = exact_meal_rows(table, rows, targets, max_items=max_items,
+                                     kcal_range=kcal_range, require=require)
+        return best
+
+    rng = as_generator(rng)
+    meal = best_meal_rows(table, rows, targets, max_items=max_items, rng=rng)
+    if require is not None and meal:
+        require = np.asarray(require, dtype=bool)
+        if not require[meal].any():
+            candidates = np.flatnonzero(require)
+            if candidates.size:
+                meal[-1] = int(rng.choice(candidates))
+
+    if kcal_range is not None:
+        lo, hi = kcal_range
+        tries = 0
+        while not (lo <= table.totals(rows[meal])[0] <= hi) and tries < 3:
+            meal = best_meal_rows(table, rows, targets, max_items=max_items, rng=rng)
+            tries += 1
+    return meal
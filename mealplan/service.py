@@ -0,0 +1,327 @@
+# mealplan/service.py — local JSON HTTP service over the headless Planner
+#
+#   python -m mealplan.service --port 8765 --workers auto
+#
+# Samo standardna biblioteka (asyncio + process pool), radi potpuno offline.
+# Krajnje tačke (JSON telo, odgovor JSON):
+#   GET  /health    katalog (verzija, ponovna učitavanja), broj workera
+#   POST /plan      {"prefs": {...}, "seed": 123}          -> plan + cilj makroa
+#   POST /meal      {"prefs": {...}, "slot": "lunch"}      -> jedan novi obrok
+#   POST /swaps     {"prefs": {...}, "item": "Tuna", "slot": "lunch"} -> zamene
+#   POST /shopping  {"plan": [[["Oats (rolled)", ...], ...], ...]}  -> spisak
+# "prefs" su polja preseta, kao u mealplan.batch. Izmena --foods fajla se učita
+# u pozadini (LiveCatalog) i workeri se zamene novim, bez restarta servisa.
+
+import argparse
+import asyncio
+import json
+import signal
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+
+from .batch import FOODS_PATH, profile_prefs
+from .cache import PlanCache, default_seed, plan_key
+from .live import LiveCatalog
+from .parallel import _mp_context, parse_workers, workers_from_env
+from .planner import MEAL_SLOTS, SLOT_DISTRIB, foods_for_slot, plan_targets, scale_macros
+from .rng import new_seed
+from .shopping import ShoppingList
+
+MAX_BODY = 1 << 20
+MAX_HEADERS = 100
+
+# planer i keš planova instalirani u svakom worker procesu
+_PLANNER = None
+_PLANS = None
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _install_planner(planner, cache_size=256):
+    global _PLANNER, _PLANS
+    _PLANNER = planner
+    _PLANS = PlanCache(maxsize=cache_size, ttl=60 * 60)
+
+
+def _food_json(food):
+    return {k: food.get(k) for k in ("name", "group", "portion", "unit", "macros", "tags")}
+
+
+def _totals_json(totals):
+    return dict(zip(("kcal", "p", "c", "f"), (round(float(v), 1) for v in totals)))
+
+
+def _prefs(payload):
+    prefs = payload.get("prefs")
+    if not isinstance(prefs, dict):
+        raise BadRequest('"prefs" must be an object')
+    return profile_prefs(prefs)
+
+
+def _slot(payload, key="slot"):
+    slot = payload.get(key)
+    if slot not in MEAL_SLOTS:
+        raise BadRequest(f'"{key}" must be one of {", ".join(MEAL_SLOTS)}')
+    return slot
+
+
+def _slot_pool(planner, prefs, payload):
+    pool, _ = planner.pool(prefs, quick=tuple(payload.get("quick") or ()))
+    return foods_for_slot(pool, _slot(payload)) if payload.get("slot") else pool
+
+
+def _plan(planner, payload):
+    prefs = _prefs(payload)
+    seed = payload.get("seed")
+    seed = default_seed(prefs, planner.table.fingerprint) if seed is None else int(seed)
+    key = plan_key(prefs, seed, planner.table.fingerprint)
+    plan, macros = _PLANS.get_or_create(
+        key, lambda: planner.generate_plan(planner.foods, prefs["days"], prefs, seed=seed))
+    return {
+        "seed": seed,
+        "targets": {k: macros[k] for k in ("kcal", "p", "c", "f", "meals")},
+        "filters_relaxed": bool(macros.get("filters_relaxed")),
+        "plan": [[[_food_json(it) for it in meal] for meal in day] for day in plan],
+        "day_totals": [_totals_json(planner.day_totals(day)) for day in plan],
+    }
+
+
+def _meal(planner, payload):
+    prefs = _prefs(payload)
+    slot = _slot(payload)
+    seed = payload.get("seed")
+    seed = new_seed() if seed is None else int(seed)
+    target = scale_macros(plan_targets(prefs), SLOT_DISTRIB[slot])
+    meal = planner.build_meal_for_slot(_slot_pool(planner, prefs, payload), target, slot,
+                                       max_items_per_meal=prefs["max_items"],
+                                       engine=prefs["engine"], rng=seed)
+    return {"slot": slot, "seed": seed, "items": [_food_json(it) for it in meal],
+            "totals": _totals_json(planner.meal_totals(meal))}
+
+
+def _swaps(planner, payload):
+    prefs = _prefs(payload)
+    item = payload.get("item")
+    if isinstance(item, str):
+        row = planner.table.name_index.get(item)
+        if row is None:
+            raise BadRequest(f"unknown food: {item!r}")
+        item = planner.foods[row]
+    if not isinstance(item, dict) or not item.get("name"):
+        raise BadRequest('"item" must be a food name or a food object')
+    topk = int(payload.get("topk", 5))
+    sugs = planner.suggest_swaps(item, _slot_pool(planner, prefs, payload), topk=topk)
+    return {"item": item["name"], "swaps": [_food_json(f) for f in sugs]}
+
+
+def _meal_rows(planner, meal):
+    """(rows, qty) of one meal: names or {"name", "qty"} objects."""
+    rows, qty = [], []
+    for it in meal.get("items", []) if isinstance(meal, dict) else meal:
+        name, q = (it, 1.0) if isinstance(it, str) else (it.get("name"), it.get("qty", 1.0))
+        row = planner.table.name_index.get(name)
+        if row is None:
+            raise BadRequest(f"unknown food: {name!r}")
+        rows.append(row)
+        qty.append(float(q))
+    return rows, qty
+
+
+def _shopping(planner, payload):
+    plans = payload.get("plans") or [payload.get("plan")]
+    if not all(isinstance(p, list) for p in plans):
+        raise BadRequest('"plan" must be a list of days (or "plans" a list of plans)')
+    shop = ShoppingList(planner.table)
+    for plan in plans:
+        for day in plan:
+            for meal in day:
+                rows, qty = _meal_rows(planner, meal)
+                shop.add(rows, qty)
+    return {"items": [{"item": n, "qty": q, "grams": g, "kg": kg}
+                      for n, q, g, kg in shop.entries()]}
+
+
+ROUTES = {"/plan": _plan, "/meal": _meal, "/swaps": _swaps, "/shopping": _shopping}
+
+
+def handle(path, payload):
+    """Run one endpoint in this process (a pool worker)."""
+    try:
+        return 200, ROUTES[path](_PLANNER, payload)
+    except (BadRequest, ValueError, KeyError, TypeError) as e:
+        return 400, {"error": f"{type(e).__name__}: {e}"}
+
+
+class PlanService:
+    """asyncio HTTP/1.1 front end; the planning runs in a process pool.
+
+    Each worker gets the planner (catalog + indexes) once, forked from the
+    parent, and keeps its own plan cache. ``workers=0`` runs requests in
+    one background thread of this process instead. When ``live`` (a
+    LiveCatalog) swaps in a new catalog, a new pool is forked with it and
+    replaces the old one, which finishes its in-flight requests.
+    """
+
+    def __init__(self, live, workers=0):
+        self.live = live
+        self.workers = int(workers)
+        self.pool = self._new_pool(live.planner)
+        live.on_swap.append(self._swap)
+
+    @property
+    def planner(self):
+        return self.live.planner
+
+    def _new_pool(self, planner):
+        if self.workers <= 0:
+            _install_planner(planner)
+            return getattr(self, "pool", None) or ThreadPoolExecutor(max_workers=1)
+        pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context(),
+                                   initializer=_install_planner, initargs=(planner,))
+        # fork pokreće sve workere na prvom zadatku — tu, ne usred zahteva
+        pool.submit(len, ()).result()
+        return pool
+
+    def _swap(self, planner):
+        # zove se iz niti koja je učitala novi katalog
+        old, self.pool = self.pool, self._new_pool(planner)
+        if old is not self.pool:
+            old.shutdown(wait=False)
+
+    def health(self):
+        return {"status": "ok", "foods": len(self.planner.table),
+                "catalog": self.planner.table.fingerprint, "workers": self.workers,
+                "reloads": self.live.reloads, "catalog_error": self.live.error}
+
+    async def dispatch(self, method, path, body):
+        self.live.check()
+        if path == "/health":
+            return 200, self.health()
+        if path not in ROUTES:
+            return 404, {"error": f"no such endpoint: {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "body is not valid JSON"}
+        if not isinstance(payload, dict):
+            return 400, {"error": "body must be a JSON object"}
+        loop = asyncio.get_running_loop()
+        try:
+            fut = loop.run_in_executor(self.pool, handle, path, payload)
+        except RuntimeError:    # pool je baš zamenjen novim katalogom
+            fut = loop.run_in_executor(self.pool, handle, path, payload)
+        return await fut
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                if isinstance(body, int):   # greška u parsiranju (status)
+                    status, out = body, {"error": HTTPStatus(body).phrase}
+                else:
+                    try:
+                        status, out = await self.dispatch(method, path, body)
+                    except Exception as e:  # worker pao, pool ugašen...
+                        status, out = 500, {"error": f"{type(e).__name__}: {e}"}
+                keep = headers.get("connection", "").lower() != "close" and status != 413
+                self._write_response(writer, status, out, keep)
+                await writer.drain()
+                if not keep:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        try:
+            line = await reader.readline()
+        except ValueError:      # red duži od limita (MAX_BODY)
+            return "", "", {"connection": "close"}, 414
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            return "", "", {"connection": "close"}, 400
+        method, target, _ = parts
+        headers = {}
+        for _ in range(MAX_HEADERS):
+            try:
+                h = await reader.readline()
+            except ValueError:
+                return method, target, {"connection": "close"}, 431
+            if h in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = h.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            return method, target, {"connection": "close"}, 431
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            return method, target, {"connection": "close"}, 400
+        if length > MAX_BODY:
+            return method, target, headers, 413
+        body = await reader.readexactly(length) if length else b""
+        return method, target.split("?", 1)[0], headers, body
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + body)
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        server = await asyncio.start_server(self.serve_client, host, port, limit=MAX_BODY)
+        if ready is not None:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local JSON HTTP service for meal plans")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--foods", default=FOODS_PATH, help=f"food catalog (default: {FOODS_PATH})")
+    ap.add_argument("--workers", type=parse_workers, default=None,
+                    help="worker processes, a number or 'auto' (default: MEALPLAN_WORKERS)")
+    args = ap.parse_args(argv)
+
+    workers = workers_from_env() if args.workers is None else args.workers
+
+    service = PlanService(LiveCatalog(args.foods, workers=0), workers=workers)
+
+    def ready(server):
+        addr = server.sockets[0].getsockname()
+        print(f"serving {len(service.planner.table)} foods on http://{addr[0]}:{addr[1]} "
+              f"({workers or 'no'} worker processes)", file=sys.stderr, flush=True)
+
+    # SIGTERM kao Ctrl+C, da se ugase i worker procesi (ne ostaju siročići)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
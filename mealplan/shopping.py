@@ -0,0 +1,114 @@
+# mealplan/shopping.py — running shopping list keyed by FoodTable row
+
+import csv
+import io
+
+import numpy as np
+
+
+class ShoppingList:
+    """Total quantity and grams of every food, as arrays over table rows.
+
+    ``qty[r]`` / ``grams[r]`` are the summed quantities / grams of row ``r``
+    (grams = qty * the food's portion). Lists of several plans (a household,
+    several weeks) are just sums: ``add_plan`` each of them, or ``+=``
+    another list over the same table.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.qty = np.zeros(len(table))
+        self.grams = np.zeros(len(table))
+
+    def add(self, rows, qty, weight=1.0):
+        """Add (or, with a negative weight, remove) items by row id."""
+        rows = np.asarray(rows, dtype=np.intp)
+        qty = np.asarray(qty, dtype=np.float64) * weight
+        np.add.at(self.qty, rows, qty)
+        np.add.at(self.grams, rows, qty * self.table.portion[rows])
+
+    def add_plan(self, plan, weight=1.0):
+        """Add every item of a CompactPlan (``weight`` = servings)."""
+        self.add(plan.rows, plan.qty, weight)
+        return self
+
+    def __iadd__(self, other):
+        if other.table is not self.table:
+            raise ValueError("shopping lists over different food tables")
+        self.qty += other.qty
+        self.grams += other.grams
+        return self
+
+    @classmethod
+    def of_plans(cls, table, plans):
+        out = cls(table)
+        for plan in plans:
+            out.add_plan(plan)
+        return out
+
+    def entries(self):
+        """``[(name, qty, grams, kg)]`` sorted by name, rounded for display
+        (qty to 0.01, grams to whole grams, kg from those grams)."""
+        # posle +/- delti ostaje šum oko nule; najmanja količina je 0.5
+        rows = np.flatnonzero(self.qty > 1e-6)
+        names = self.table.names
+        rows = sorted(rows, key=lambda r: names[r])
+        # np.round (kao pandas), ne round(): 0.925 -> 0.92
+        qty = np.round(self.qty[rows], 2)
+        grams = np.round(self.grams[rows]).astype(np.int64)
+        kg = np.round(grams / 1000.0, 2)
+        return [(names[r], float(q), int(g), float(k)) for r, q, g, k in zip(rows, qty, grams, kg)]
+
+    def to_csv(self, header=("Item", "Qty", "Grams", "Kg"), entries=None):
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        writer.writerow(header)
+        writer.writerows(self.entries() if entries is None else entries)
+        return buf.getvalue()
+
+
+class PlanShopping(ShoppingList):
+    """ShoppingList of one CompactPlan, patched on edit like PlanTotals.
+
+    Keeps its own copy of each meal's rows and quantities, so an edit only
+    removes the old meal (or item) and adds the new one. Indices are 0-based.
+    """
+
+    def __init__(self, plan):
+        super().__init__(plan.table)
+        self.plan = plan
+        self.rows, self.meal_qty = [], []   # [d][m] -> kopije reda / količina
+        for d in range(len(plan)):
+            self.rows.append([])
+            self.meal_qty.append([])
+            for m in range(plan.n_meals(d)):
+                self._load_meal(d, m)
+
+    def _load_meal(self, d, m):
+        rows = self.plan.meal_rows(d, m).copy()
+        qty = self.plan.meal_qty(d, m).astype(np.float64)
+        if m < len(self.rows[d]):
+            self.rows[d][m], self.meal_qty[d][m] = rows, qty
+        else:
+            self.rows[d].append(rows)
+            self.meal_qty[d].append(qty)
+        self.add(rows, qty)
+
+    def set_qty(self, d, m, i, qty):
+        """One item's quantity changed."""
+        row = self.rows[d][m][i:i + 1]
+        self.add(row, [float(qty) - self.meal_qty[d][m][i]])
+        self.meal_qty[d][m][i] = float(qty)
+
+    def set_meal(self, d, m):
+        """A meal was swapped into / regenerated (re-read from the plan)."""
+        self.add(self.rows[d][m], self.meal_qty[d][m], -1.0)
+        self._load_meal(d, m)
+
+    def set_day(self, d):
+        """A whole day was regenerated (or its quantities were reset)."""
+        for rows, qty in zip(self.rows[d], self.meal_qty[d]):
+            self.add(rows, qty, -1.0)
+        self.rows[d], self.meal_qty[d] = [], []
+        for m in range(self.plan.n_meals(d)):
+            self._load_meal(d, m)
@@ -0,0 +1,140 @@
+# mealplan/swaps.py — precomputed top-k swap suggestions for a pool
+
+import numpy as np
+
+from .filters import _bitsets
+
+# toliko parova (red x pool) se ocenjuje odjednom pri gradnji indeksa
+_BLOCK_CELLS = 1 << 20
+
+
+def food_features(food):
+    """Group + tag features of a food (what ``_food_vec`` compares)."""
+    group = (food.get("group") or "").strip().lower()
+    tags = [(t or "").strip().lower() for t in food.get("tags", [])]
+    return {f"g::{group}"} | {f"t::{t}" for t in tags}
+
+
+def food_kcal(food):
+    m = food.get("macros")
+    if isinstance(m, dict):
+        return float(m.get("kcal", food.get("kcal", 0) or 0))
+    return float(food.get("kcal", 0) or 0)
+
+
+# _macro_close gleda ključeve "protein"/"carbs"/"fat" na samoj namirnici
+_CLOSE_KEYS = ("protein", "carbs", "fat")
+
+
+def _close_values(foods):
+    return np.array([[max(1e-6, float(f.get(k, 0))) for k in _CLOSE_KEYS] for f in foods],
+                    dtype=np.float64).reshape(len(foods), len(_CLOSE_KEYS))
+
+
+class SwapIndex:
+    """Top-k swap suggestions for every food of a pool, computed once.
+
+    Scores match ``suggest_swaps``: tag/group Jaccard similarity (popcount
+    over per-food feature bitsets) minus ``kcal gap / 800``, candidates
+    limited to ``_macro_close`` foods with a different name, ties kept in
+    pool order. Pairs are scored a block of rows at a time.
+    """
+
+    def __init__(self, pool, topk=5, tol=0.30):
+        self.pool = pool
+        self.topk = int(topk)
+        self.tol = float(tol)
+        feats = [food_features(f) for f in pool]
+        self.vocab = {v: i for i, v in enumerate(sorted({x for fs in feats for x in fs}))}
+        self.bits = _bitsets([[self.vocab[x] for x in fs] for fs in feats], len(self.vocab))
+        self.sizes = np.array([len(fs) for fs in feats], dtype=np.int64)
+        self.kcal = np.array([food_kcal(f) for f in pool], dtype=np.float64)
+        self.close = _close_values(pool)
+        self.names = [(f.get("name") or "").strip().lower() for f in pool]
+        name_code = {}
+        self.name_ids = np.array([name_code.setdefault(n, len(name_code)) for n in self.names],
+                                 dtype=np.int64)
+        self.position = {}
+        for i, n in enumerate(self.names):
+            self.position.setdefault(n, i)
+        self.neighbours = self._build()
+
+    def _scores(self, bits, sizes, kcal, close, name_ids):
+        """(len(bits), len(pool)) scores, -inf where a food isn't a candidate."""
+        inter = np.zeros((len(bits), len(self.bits)), dtype=np.int64)
+        for w in range(self.bits.shape[1]):
+            inter += np.bitwise_count(bits[:, w, None] & self.bits[None, :, w])
+        union = sizes[:, None] + self.sizes[None, :] - inter
+        sim = np.where(union > 0, inter / np.maximum(union, 1), 0.0)
+        score = sim - np.abs(self.kcal[None, :] - kcal[:, None]) / 800.0
+        ok = name_ids[:, None] != self.name_ids[None, :]
+        for m in range(close.shape[1]):
+            a, b = close[:, m], self.close[:, m]
+            # makro koji je isti u celom pool-u i u ovim redovima ne menja ništa
+            if (a == b[0]).all() and (b == b[0]).all():
+                continue
+            ok &= ~(np.abs(b[None, :] - a[:, None]) / a[:, None] > self.tol)
+        return np.where(ok, score, -np.inf)
+
+    def _top(self, scores):
+        """Top-k columns per row: best score first, pool order on ties."""
+        out = []
+        k = min(self.topk, scores.shape[1])
+        for row in scores:
+            valid = np.flatnonzero(row > -np.inf)
+            if len(valid) > k:
+                kth = np.partition(row[valid], len(valid) - k)[len(valid) - k]
+                valid = valid[row[valid] >= kth]
+            order = valid[np.argsort(-row[valid], kind="stable")][:k]
+            out.append(tuple(int(j) for j in order))
+        return out
+
+    def _build(self):
+        n = len(self.pool)
+        if n == 0 or self.topk <= 0:
+            return [()] * n
+        step = max(1, _BLOCK_CELLS // (n * max(1, self.bits.shape[1])))
+        out = []
+        for s in range(0, n, step):
+            e = min(n, s + step)
+            out.extend(self._top(self._scores(self.bits[s:e], self.sizes[s:e], self.kcal[s:e],
+                                              self.close[s:e], self.name_ids[s:e])))
+        return out
+
+    def suggest(self, item):
+        """Suggested swaps for ``item``: a lookup when it's a pool food."""
+        name = (item.get("name") or "").strip().lower()
+        i = self.position.get(name)
+        if i is not None and food_features(item) == food_features(self.pool[i]) \
+                and food_kcal(item) == self.kcal[i] \
+                and (_close_values([item]) == self.close[i]).all():
+            return [self.pool[j] for j in self.neighbours[i]]
+        # namirnica van pool-a (ili izmenjena): jedan red, isto bodovanje
+        feats = food_features(item)
+        codes = [self.vocab[x] for x in feats if x in self.vocab]
+        bits = _bitsets([codes], len(self.vocab))
+        # nepoznati tagovi ne seku ništa, ali ulaze u uniju
+        scores = self._scores(bits, np.array([len(feats)]), np.array([food_kcal(item)]),
+                              _close_values([item]),
+                              np.array([self._name_id(name)]))
+        return [self.pool[j] for j in self._top(scores)[0]]
+
+    def _name_id(self, name):
+        i = self.position.get(name)
+        return self.name_ids[i] if i is not None else -1
+
+
+def swap_index(pool, topk=5, tol=0.30):
+    """``SwapIndex`` of a pool, built once per (pool, topk, tol).
+
+    ``FoodPool`` views keep it in their ``memo``; plain lists get a fresh
+    index every call.
+    """
+    memo = getattr(pool, "memo", None)
+    if memo is None:
+        return SwapIndex(pool, topk, tol)
+    key = ("swaps", int(topk), float(tol))
+    index = memo.get(key)
+    if index is None:
+        index = memo[key] = SwapIndex(pool, topk, tol)
+    return index
@@ -0,0 +1,153 @@
+# mealplan/table.py — columnar food table
+
+import hashlib
+import sys
+
+import numpy as np
+
+
+# kolone u matrici makroa (redosled je bitan za score vektor)
+MACRO_KEYS = ("kcal", "p", "c", "f")
+
+_FALLBACK_KEYS = {
+    "kcal": ("kcal",),
+    "p": ("p", "protein"),
+    "c": ("c", "carbs"),
+    "f": ("f", "fat"),
+}
+
+
+def _macro_of(x, key):
+    """Same fallback chain as the old _kcal_of/_p_of/... accessors."""
+    flat = 0
+    for k in reversed(_FALLBACK_KEYS[key]):
+        flat = x.get(k, flat)
+    m = x.get("macros")
+    if isinstance(m, dict):
+        return float(m.get(key, flat) or 0)
+    return float(flat or 0)
+
+
+def item_macros(x):
+    """(kcal, p, c, f) of a single food/item dict, old or new format."""
+    return tuple(_macro_of(x, k) for k in MACRO_KEYS)
+
+
+def _csr(lists):
+    """(sorted names, ptr, idx) of per-row string lists, codes in row order."""
+    names = tuple(sorted({x for xs in lists for x in xs}))
+    code = {x: i for i, x in enumerate(names)}
+    ptr = np.zeros(len(lists) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(xs) for xs in lists])
+    idx = np.fromiter((code[x] for xs in lists for x in xs), dtype=np.int32, count=int(ptr[-1]))
+    return names, ptr, idx
+
+
+class FoodTable:
+    """Foods stored column-wise; everything else refers to them by row index.
+
+    Built once per catalog. ``macros`` is a (4, n) float64 matrix with the
+    kcal / P / C / F rows, so the totals of any set of rows are a gather plus a
+    sum. ``kcal``, ``p``, ``c`` and ``f`` are contiguous views of its rows.
+    """
+
+    def __init__(self, foods):
+        self.foods = list(foods)
+        n = len(self.foods)
+
+        self.names = tuple(sys.intern(str(f.get("name", ""))) for f in self.foods)
+        self.name_index = {}
+        for i, name in enumerate(self.names):
+            self.name_index.setdefault(name, i)
+
+        groups = [str(f.get("group") or "other") for f in self.foods]
+        self.group_names = tuple(sorted(set(groups)))
+        group_code = {g: i for i, g in enumerate(self.group_names)}
+        self.group = np.fromiter((group_code[g] for g in groups),
+                                 dtype=np.int32, count=n)
+
+        # tagovi kao CSR: tag_idx[tag_ptr[i]:tag_ptr[i+1]] su kodovi reda i
+        self.tag_names, self.tag_ptr, self.tag_idx = _csr(
+            [[str(t) for t in (f.get("tags") or [])] for f in self.foods])
+        # slotovi isto; red bez slotova ide u svaki slot
+        self.slot_names, self.slot_ptr, self.slot_idx = _csr(
+            [[str(s) for s in (f.get("slots") or [])] for f in self.foods])
+
+        self.macros = np.array([[_macro_of(f, k) for f in self.foods] for k in MACRO_KEYS],
+                               dtype=np.float64).reshape(len(MACRO_KEYS), n)
+        self.kcal, self.p, self.c, self.f = self.macros
+        self.portion = np.array([float(f.get("portion_g", f.get("portion", 0)) or 0)
+                                 for f in self.foods], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def fingerprint(self):
+        """Short content hash of the catalog (names, groups, tags, numbers)."""
+        fp = getattr(self, "_fingerprint", None)
+        if fp is None:
+            h = hashlib.sha1()
+            h.update("\x1f".join(self.names).encode("utf-8"))
+            h.update("\x1f".join(self.group_names + ("",) + self.tag_names).encode("utf-8"))
+            for arr in (self.group, self.tag_ptr, self.tag_idx, self.macros, self.portion):
+                h.update(np.ascontiguousarray(arr).tobytes())
+            fp = self._fingerprint = h.hexdigest()[:16]
+        return fp
+
+    def tags_of(self, row):
+        return tuple(self.tag_names[t] for t in self.tag_idx[self.tag_ptr[row]:self.tag_ptr[row + 1]])
+
+    def slots_of(self, row):
+        return tuple(self.slot_names[s] for s in self.slot_idx[self.slot_ptr[row]:self.slot_ptr[row + 1]])
+
+    def group_of(self, row):
+        return self.group_names[self.group[row]]
+
+    def row_of(self, item):
+        """Row id of a food/item dict (matched by name), or -1 if unknown."""
+        return self.name_index.get(item.get("name"), -1)
+
+    def rows_of(self, items):
+        return np.fromiter((self.name_index.get(it.get("name"), -1) for it in items),
+                           dtype=np.intp, count=len(items))
+
+    def totals(self, rows, qty=None):
+        """kcal/P/C/F sums for the given rows (optionally scaled by qty)."""
+        cols = self.macros[:, rows]
+        if qty is None:
+            return cols.sum(axis=1)
+        return cols @ np.asarray(qty, dtype=np.float64)
+
+    def items_totals(self, items, qty=None):
+        """Like ``totals`` but for item dicts; items not in the table fall
+        back to their own macros so edited/legacy items still add up."""
+        rows = self.rows_of(items)
+        if qty is None:
+            qty = np.ones(len(rows))
+        qty = np.asarray(qty, dtype=np.float64)
+        known = rows >= 0
+        out = self.totals(rows[known], qty[known])
+        if not known.all():
+            for j in np.flatnonzero(~known):
+                out += np.asarray(item_macros(items[j])) * qty[j]
+        return out
+
+
+def target_vector(targets):
+    """Per-meal (kcal, p, c, f) target with the same fallbacks as score_meal."""
+    return np.array([float(targets.get(f"{k}_meal", targets.get(k, 0.0)))
+                     for k in MACRO_KEYS], dtype=np.float64)
+
+
+# tezine iz score_meal: kcal 1, P 2, C 1, F 2
+SCORE_WEIGHTS = np.array([1.0, 2.0, 1.0, 2.0])
+
+
+def score_totals(totals, target):
+    """Weighted absolute error of macro totals; ``totals`` is (4,) or (4, ...)."""
+    totals = np.asarray(totals, dtype=np.float64)
+    if totals.ndim == 1:
+        return SCORE_WEIGHTS @ np.abs(totals - target)
+    err = np.abs(totals - target.reshape((4,) + (1,) * (totals.ndim - 1)))
+    return np.tensordot(SCORE_WEIGHTS, err, axes=1)
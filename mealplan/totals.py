@@ -0,0 +1,80 @@
+# mealplan/totals.py — per-meal / per-day / plan totals kept up to date on edit
+
+import numpy as np
+
+from .table import item_macros
+
+
+def meal_items(meal):
+    """Items of a plan meal (either a plain list or ``{"slot", "items"}``)."""
+    return meal.get("items", []) if isinstance(meal, dict) else meal
+
+
+class PlanTotals:
+    """kcal/P/C/F of every meal, every day and the whole plan.
+
+    Built once per plan, then patched: a quantity change adds
+    ``macros * (new - old)`` to its meal, day and plan; a swapped or
+    regenerated meal replaces its own row and shifts the day and plan by the
+    difference. Reads are plain lookups. Indices are 0-based; ``qty(d, m, i)``
+    returns the quantity of an item (1.0 when it's never been changed).
+    """
+
+    def __init__(self, plan, qty=None):
+        self.plan = plan
+        self._qty_of = qty or (lambda d, m, i: 1.0)
+        self.items = []     # [d][m] -> (k, 4) makroi po porciji
+        self.qty = []       # [d][m] -> (k,) količine
+        self.meals = []     # [d] -> (meals, 4)
+        self.days = np.zeros((len(plan), 4))
+        for d, day in enumerate(plan):
+            self.items.append([])
+            self.qty.append([])
+            self.meals.append(np.zeros((len(day), 4)))
+            for m, meal in enumerate(day):
+                self._load_meal(d, m, meal)
+            self.days[d] = self.meals[d].sum(axis=0)
+        self.total = self.days.sum(axis=0)
+
+    def _load_meal(self, d, m, meal):
+        items = meal_items(meal)
+        vecs = np.array([item_macros(it) for it in items], dtype=np.float64).reshape(-1, 4)
+        qty = np.array([self._qty_of(d, m, i) for i in range(len(items))], dtype=np.float64)
+        if m < len(self.items[d]):
+            self.items[d][m], self.qty[d][m] = vecs, qty
+        else:
+            self.items[d].append(vecs)
+            self.qty[d].append(qty)
+        self.meals[d][m] = qty @ vecs
+
+    def meal(self, d, m):
+        return self.meals[d][m]
+
+    def day(self, d):
+        return self.days[d]
+
+    def set_qty(self, d, m, i, qty):
+        """One item's quantity changed: O(1) delta update."""
+        delta = self.items[d][m][i] * (float(qty) - self.qty[d][m][i])
+        self.qty[d][m][i] = float(qty)
+        self.meals[d][m] += delta
+        self.days[d] += delta
+        self.total += delta
+
+    def set_meal(self, d, m, meal):
+        """A meal was swapped into / regenerated (quantities re-read)."""
+        old = self.meals[d][m].copy()
+        self._load_meal(d, m, meal)
+        delta = self.meals[d][m] - old
+        self.days[d] += delta
+        self.total += delta
+
+    def set_day(self, d, day):
+        """A whole day was regenerated (or its quantities were reset)."""
+        old = self.days[d].copy()
+        self.items[d], self.qty[d] = [], []
+        self.meals[d] = np.zeros((len(day), 4))
+        for m, meal in enumerate(day):
+            self._load_meal(d, m, meal)
+        self.days[d] = self.meals[d].sum(axis=0)
+        self.total += self.days[d] - old
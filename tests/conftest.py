@@ -0,0 +1,22 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mealplan import FoodTable, load_foods  # noqa: E402
+
+FOODS_PATH = os.path.join(ROOT, "data", "foods.json")
+
+
+@pytest.fixture(scope="session")
+def foods():
+    return load_foods(FOODS_PATH)
+
+
+@pytest.fixture(scope="session")
+def table(foods):
+    return FoodTable(foods)
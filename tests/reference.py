@@ -0,0 +1,231 @@
+# tests/reference.py — the pre-mealplan helpers from app.py, kept verbatim
+# (minus Streamlit) so the vectorized code can be checked against them.
+
+import random
+
+PROTEIN_GROUPS = {"meat", "fish", "plant_protein", "legumes", "eggs", "prepared"}
+
+
+def _kcal_of(x):
+    m = x.get("macros")
+    if isinstance(m, dict):
+        return float(m.get("kcal", x.get("kcal", 0)) or 0)
+    return float(x.get("kcal", 0) or 0)
+
+
+def _p_of(x):
+    m = x.get("macros")
+    if isinstance(m, dict):
+        return float(m.get("p", x.get("p", x.get("protein", 0))) or 0)
+    return float(x.get("p", x.get("protein", 0)) or 0)
+
+
+def _c_of(x):
+    m = x.get("macros")
+    if isinstance(m, dict):
+        return float(m.get("c", x.get("c", x.get("carbs", 0))) or 0)
+    return float(x.get("c", x.get("carbs", 0)) or 0)
+
+
+def _f_of(x):
+    m = x.get("macros")
+    if isinstance(m, dict):
+        return float(m.get("f", x.get("f", x.get("fat", 0))) or 0)
+    return float(x.get("f", x.get("fat", 0)) or 0)
+
+
+def filter_by_diet(foods, diet):
+    if diet == "omnivore":
+        return foods
+    if diet == "vegetarian":
+        return [x for x in foods if "vegan" in x.get("tags", []) or "vegetarian" in x.get("tags", []) or x["group"] in ["grains", "fruit", "vegetables", "nuts", "legumes", "fat"]]
+    if diet == "vegan":
+        return [x for x in foods if "vegan" in x.get("tags", []) or x["group"] in ["grains", "fruit", "vegetables", "nuts", "legumes", "fat"]]
+    if diet == "gluten-free":
+        return [x for x in foods if "gluten-free" in x.get("tags", []) or x["group"] in ["protein", "fruit", "vegetables", "nuts", "legumes", "fat", "dairy"]]
+    return foods
+
+
+def filter_pool(foods, prefs):
+    """The pool block of the old generate_plan (without the < 5 fallback)."""
+    pool = filter_by_diet(foods, prefs["diet"])
+    if prefs["exclude_tags"]:
+        pool = [f for f in pool if not any(tag in f.get(
+            "tags", []) for tag in prefs["exclude_tags"])]
+    if prefs["exclude_groups"]:
+        pool = [f for f in pool if f["group"] not in prefs["exclude_groups"]]
+    if prefs["dislikes"]:
+        lowers = [x.strip().lower()
+                  for x in prefs["dislikes"].split(",") if x.strip()]
+        if lowers:
+            pool = [f for f in pool if not any(
+                tok in f["name"].lower() for tok in lowers)]
+    return pool
+
+
+def quick_filter(pool, no_dairy=False, no_pork=False, veg=False):
+    """The _pool_quick block of the old app.py (without the < 5 fallback)."""
+    pool = list(pool)
+    if no_dairy:
+        pool = [f for f in pool if "dairy" not in set(
+            f.get("tags", [])) and "milk" not in set(f.get("tags", []))]
+    if no_pork:
+        pool = [
+            f for f in pool if "pork" not in set(f.get("tags", []))]
+    if veg:
+        pool = [f for f in pool if f.get("group", "").lower(
+        ) not in {"meat", "fish", "seafood"} and "meat" not in set(f.get("tags", []))]
+    return pool
+
+
+def score_meal(meal, targets):
+    kcal = sum(_kcal_of(i) for i in meal)
+    p = sum(_p_of(i) for i in meal)
+    c = sum(_c_of(i) for i in meal)
+    f = sum(_f_of(i) for i in meal)
+
+    tk = targets.get("kcal_meal", targets.get("kcal", 0.0))
+    tp = targets.get("p_meal",    targets.get("p",    0.0))
+    tc = targets.get("c_meal",    targets.get("c",    0.0))
+    tf = targets.get("f_meal",    targets.get("f",    0.0))
+
+    return abs(kcal - tk) + 2.0*abs(p - tp) + 1.0*abs(c - tc) + 2.0*abs(f - tf)
+
+
+def build_meal(foods, targets, max_items_per_meal=3):
+    if not foods:
+        return []
+
+    pool = list(foods)
+    best_meal, best_score = None, 1e9
+
+    for _ in range(200):
+        if not pool:
+            break
+
+        spread = max(2, int(random.gauss(2.5, 0.6)))
+        k = max(1, min(max_items_per_meal, spread, len(pool)))
+
+        meal_items = random.sample(pool, k=k)
+        if random.random() < 0.35 and pool and len(meal_items) < max_items_per_meal:
+            meal_items.append(random.choice(pool))
+
+        score = score_meal(meal_items, targets)
+        if score < best_score:
+            best_score, best_meal = score, meal_items
+
+    return best_meal or []
+
+
+def foods_for_slot(all_foods, slot):
+    pool = [f for f in all_foods if slot in f["slots"]]
+    return pool or list(all_foods)
+
+
+def macros_of_day(day):
+    """Day kcal/P/C/F the old way: per item, times its quantity."""
+    tot = [0.0, 0.0, 0.0, 0.0]
+    for meal in day:
+        for it in meal:
+            q = float(it.get("qty", 1.0))
+            for j, fn in enumerate((_kcal_of, _p_of, _c_of, _f_of)):
+                tot[j] += fn(it) * q
+    return tot
+
+
+def day_trial(foods_list, targets, meals=4, max_items_per_meal=3):
+    """One trial of the old build_day loop: (day, total_score)."""
+    day, total_score, used = [], 0, set()
+    for _m in range(meals):
+        candidates = [
+            f for f in foods_list if f["name"] not in used or random.random() < 0.4
+        ]
+        if not candidates:
+            candidates = list(foods_list)
+
+        spread = max(2, int(random.gauss(2.5, 0.6)))
+        k = max(1, min(max_items_per_meal, spread, len(candidates)))
+
+        meal_items = random.sample(candidates, k=k)
+        if random.random() < 0.35 and candidates and len(meal_items) < max_items_per_meal:
+            meal_items.append(random.choice(candidates))
+
+        total_score += score_meal(meal_items, targets)
+        for it in meal_items:
+            used.add(it["name"])
+        day.append(meal_items)
+    return day, total_score
+
+
+def shopping_table(plan_now, qty_of):
+    """The old shopping list expander: pandas groupby over every plan item
+    (qty_of(d, m, i) stands in for the per-item session-state keys)."""
+    import pandas as pd
+
+    rows = []
+    for d_idx, day in enumerate(plan_now):
+        for m_idx, meal in enumerate(day):
+            items = meal.get("items", []) if isinstance(
+                meal, dict) else meal
+            for i_idx, it in enumerate(items):
+                q = float(qty_of(d_idx, m_idx, i_idx))
+                pg = float(
+                    it.get("portion_g", it.get("portion", 0)) or 0.0)
+                rows.append({"name": it.get("name", "Item"),
+                            "qty": q, "grams": pg * q})
+    if not rows:
+        return []
+    df = pd.DataFrame(rows).groupby("name", as_index=False).agg(
+        {"qty": "sum", "grams": "sum"})
+    df["qty"] = df["qty"].round(2)
+    df["grams"] = df["grams"].round(0).astype(int)
+    df["kg"] = (df["grams"] / 1000.0).round(2)
+    df = df.sort_values("name")
+    return [(r.name, float(r.qty), int(r.grams), float(r.kg)) for r in df.itertuples()]
+
+
+def _food_vec(food):
+    group = (food.get("group") or "").strip().lower()
+    tags = [(t or "").strip().lower() for t in food.get("tags", [])]
+    return set([f"g::{group}"] + [f"t::{t}" for t in tags])
+
+
+def _sim(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    u = len(a | b)
+    return (len(a & b) / u) if u else 0.0
+
+
+def _macro_close(a, b, tol=0.15):
+    for k in ("protein", "carbs", "fat"):
+        av = max(1e-6, float(a.get(k, 0)))
+        bv = max(1e-6, float(b.get(k, 0)))
+        if abs(bv - av) / av > tol:
+            return False
+    return True
+
+
+def suggest_swaps(item, pool, topk=5, tol=0.30):
+    pool = pool or []
+
+    def _get_kcal(x):
+        if isinstance(x, dict):
+            m = x.get("macros")
+            if isinstance(m, dict):
+                return float(m.get("kcal", x.get("kcal", 0) or 0))
+        return float(x.get("kcal", 0) or 0)
+    base_vec = _food_vec(item)
+    base_name = (item.get("name") or "").strip().lower()
+    cands = []
+    for f in pool:
+        if (f.get("name") or "").strip().lower() == base_name:
+            continue
+        if not _macro_close(item, f, tol=tol):
+            continue
+        sim = _sim(base_vec, _food_vec(f))
+        kcal_gap = abs(_get_kcal(f) - _get_kcal(item))
+        score = sim - (kcal_gap / 800.0)
+        cands.append((score, f))
+    cands.sort(key=lambda x: x[0], reverse=True)
+    return [f for _, f in cands[:topk]]
@@ -0,0 +1,145 @@
+import io
+import json
+import os
+
+import pytest
+
+from conftest import FOODS_PATH
+from mealplan.batch import RESULTS_NAME, done_ids, profile_prefs, run
+
+ROSTER = [
+    {"id": "ana", "days": 2, "base_kcal": 1800, "profile": "Cut (-15%)"},
+    {"id": "bob", "days": 2, "meals": 4, "protein_pct": 0.35, "carbs_pct": 0.35,
+     "exclude_tags": "spicy;quick", "dislikes": "tuna"},
+    {"id": "bad", "days": 0},
+    {"id": "eve", "days": 1, "diet": "vegan", "seed": 7},
+]
+
+
+def _write_roster(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return str(path)
+
+
+def _rows(out_dir):
+    with open(os.path.join(out_dir, RESULTS_NAME), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _run(roster, out_dir, **kwargs):
+    kwargs.setdefault("html", False)
+    return run(roster, str(out_dir), foods_path=FOODS_PATH, log=io.StringIO(), **kwargs)
+
+
+def test_profile_prefs():
+    prefs = profile_prefs({"profile": "bulk", "base_kcal": "2000", "days": "3"})
+    assert prefs["profile"] == "bulk" and prefs["days"] == 3
+    assert prefs["effective_kcal"] > prefs["kcal"] == 2000
+    prefs = profile_prefs({"protein_pct": 0.4, "carbs_pct": 0.3, "exclude_groups": '["fish"]'})
+    assert prefs["profile"] == "custom" and prefs["fat_pct"] == pytest.approx(0.3)
+    assert prefs["exclude_groups"] == ["fish"]
+    for bad in ({"profile": "keto"}, {"protein_pct": 0.7, "carbs_pct": 0.5}, {"meals": 0}):
+        with pytest.raises(ValueError):
+            profile_prefs(bad)
+
+
+def test_run_writes_rows_and_files(tmp_path):
+    roster = _write_roster(tmp_path / "roster.jsonl", ROSTER)
+    stats = _run(roster, tmp_path / "out", html=True)
+    assert (stats["done"], stats["failed"], stats["skipped"]) == (3, 1, 0)
+    rows = {row["id"]: row for row in _rows(tmp_path / "out")}
+    assert "error" in rows["bad"] and rows["eve"]["seed"] == 7
+    assert len(rows["bob"]["plan"]) == 2 and all(len(day) == 4 for day in rows["bob"]["plan"])
+    for pid in ("ana", "bob", "eve"):
+        for key in ("shopping", "html"):
+            assert os.path.exists(tmp_path / "out" / rows[pid][key])
+    # isti roster, isti seed-ovi: ponovljen posao daje iste planove
+    _run(roster, tmp_path / "again", html=True)
+    again = {row["id"]: row for row in _rows(tmp_path / "again")}
+    assert all(again[pid]["plan"] == rows[pid]["plan"] for pid in ("ana", "bob", "eve"))
+
+
+def test_resume_skips_done_and_retries_errors(tmp_path):
+    roster = _write_roster(tmp_path / "roster.jsonl", ROSTER)
+    out = tmp_path / "out"
+    _run(roster, out)
+    first = _rows(out)
+    stats = _run(roster, out)
+    assert (stats["done"], stats["failed"], stats["skipped"]) == (0, 1, 3)
+    rows = _rows(out)
+    # stari red sa greškom je obrisan, novi dopisan: jedan red po profilu
+    assert sorted(row["id"] for row in rows) == ["ana", "bad", "bob", "eve"]
+    assert [r for r in rows if "error" not in r] == [r for r in first if "error" not in r]
+    fixed = _write_roster(tmp_path / "roster.jsonl", ROSTER[:2] + [{"id": "bad", "days": 1}])
+    stats = _run(fixed, out)
+    assert (stats["done"], stats["failed"], stats["skipped"]) == (1, 0, 2)
+    assert not any("error" in row for row in _rows(out)) and len(_rows(out)) == 4
+
+
+def test_truncated_last_line_is_dropped(tmp_path):
+    roster = _write_roster(tmp_path / "roster.jsonl", ROSTER[:2])
+    out = tmp_path / "out"
+    _run(roster, out)
+    path = os.path.join(out, RESULTS_NAME)
+    with open(path, "rb") as f:
+        lines = f.read().splitlines(keepends=True)
+    # prekid usred pisanja drugog reda
+    with open(path, "wb") as f:
+        f.write(lines[0] + lines[1][:40])
+    assert done_ids(path) == {json.loads(lines[0])["id"]}
+    with open(path, "rb") as f:
+        assert f.read() == lines[0]
+    stats = _run(roster, out)
+    assert (stats["done"], stats["skipped"]) == (1, 1)
+    assert sorted(row["id"] for row in _rows(out)) == ["ana", "bob"]
+
+
+def test_write_errors_become_error_rows(tmp_path):
+    roster = _write_roster(tmp_path / "roster.jsonl", ROSTER[:2])
+    out = tmp_path / "out"
+    # privremeni fajl za "ana" ne može da se otvori (na tom mestu je folder)
+    os.makedirs(out / "shopping" / "ana.csv.part")
+    stats = _run(roster, out)
+    assert (stats["done"], stats["failed"]) == (1, 1)
+    rows = {row["id"]: row for row in _rows(out)}
+    assert rows["ana"]["error"].startswith(("IsADirectoryError", "PermissionError"))
+    assert "plan" in rows["bob"]
+
+
+def test_workers_match_serial(tmp_path):
+    roster = _write_roster(tmp_path / "roster.jsonl", ROSTER)
+    _run(roster, tmp_path / "serial")
+    stats = _run(roster, tmp_path / "pooled", workers=2, window=2)
+    assert (stats["done"], stats["failed"]) == (3, 1)
+
+    def plans(out):
+        return {row["id"]: row.get("plan") for row in _rows(out)}
+    assert plans(tmp_path / "serial") == plans(tmp_path / "pooled")
+
+
+def test_duplicate_and_colliding_ids(tmp_path):
+    roster = _write_roster(tmp_path / "roster.jsonl", [
+        {"id": "ana", "days": 1}, {"id": "ana marija", "days": 1},
+        {"id": "ana_marija", "days": 1}, {"id": "ana", "days": 2}, {"id": "Ana", "days": 1},
+        {"id": "ana/marija", "days": 1}])
+    out = tmp_path / "out"
+    stats = _run(roster, out, html=True)
+    assert (stats["done"], stats["failed"], stats["skipped"]) == (5, 1, 0)
+    rows = _rows(out)
+    errors = [row for row in rows if "error" in row]
+    assert errors == [{"id": "ana", "error": "ValueError: duplicate id (roster entry 4)"}]
+    plans = [row for row in rows if "error" not in row]
+    # prvi "ana" (1 dan) ostaje, drugi se ne planira
+    assert [len(row["plan"]) for row in plans if row["id"] == "ana"] == [1]
+    for key in ("shopping", "html"):
+        paths = [row[key] for row in plans]
+        assert len(set(paths)) == 5 and all(os.path.exists(out / p) for p in paths)
+    names = {row["id"]: os.path.basename(row["shopping"]) for row in plans}
+    assert names["ana"] == "ana.csv" and names["ana_marija"] == "ana_marija.csv"
+    assert names["ana marija"].startswith("ana_marija-") and names["Ana"].startswith("Ana-")
+    # nastavak: isti nazivi, duplikat se ponovo prijavljuje
+    stats = _run(roster, out)
+    assert (stats["done"], stats["failed"], stats["skipped"]) == (0, 1, 5)
+    assert [row for row in _rows(out) if "error" in row] == errors
@@ -0,0 +1,36 @@
+from benchmarks.bench import compare, environment, meta_mismatch
+
+
+def _row(case, min_ms, median_ms, plan=None):
+    return {"catalog": "1k", "foods": 1000, "case": case, "plan": plan,
+            "min_ms": min_ms, "median_ms": median_ms, "loops": 10, "rounds": 5}
+
+
+def test_compare_needs_a_steady_and_sizeable_slowdown():
+    baseline = {"results": [_row("slower", 2.0, 2.1), _row("one_bad_round", 2.0, 2.1),
+                            _row("micro", 0.010, 0.011), _row("same", 5.0, 5.2),
+                            _row("sized", 1.0, 1.0, plan="7x3x3"), _row("gone", 1.0, 1.0)]}
+    current = {"results": [_row("slower", 3.0, 3.1), _row("one_bad_round", 2.0, 2.9),
+                           _row("micro", 0.030, 0.033), _row("same", 5.1, 5.0),
+                           _row("sized", 1.0, 1.0, plan="14x6x5"), _row("new", 1.0, 1.0)]}
+    rows = {key[0]: (base, now, slow) for key, base, now, _, slow in compare(current, baseline)}
+    # samo slučajevi koje imaju oba run-a (isti case, katalog i plan)
+    assert sorted(rows) == ["micro", "one_bad_round", "same", "slower"]
+    assert rows["slower"] == (2.1, 3.1, True)
+    # medijana je skočila, ali najbolja runda nije: šum
+    assert not rows["one_bad_round"][2]
+    # x3, ali ispod 0.05 ms
+    assert not rows["micro"][2]
+    assert not rows["same"][2]
+    assert compare(current, baseline, min_delta=0.01)[2][4]
+
+
+def test_meta_mismatch():
+    env = environment()
+    assert meta_mismatch({"meta": dict(env, created="2026-01-01")}, env) == []
+    other = dict(env, numpy="2.2.2", cpus=1)
+    diff = meta_mismatch({"meta": other}, env)
+    assert {k for k, _, _ in diff} == {k for k in ("numpy", "cpus") if other[k] != env[k]}
+    assert ("numpy", "2.2.2", env["numpy"]) in diff or env["numpy"] == "2.2.2"
+    # stari rezultati bez meta podataka ne odgovaraju ničemu
+    assert [k for k, _, _ in meta_mismatch({"results": []}, env)] == list(env)
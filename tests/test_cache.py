@@ -0,0 +1,84 @@
+import pytest
+
+from mealplan import PlanCache, default_seed, normalize_prefs, plan_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = PlanCache(maxsize=3, ttl=None, clock=clock)
+    for k in "abc":
+        cache.put(k, k.upper())
+    assert cache.get("a") == "A"        # a je sada najsvežiji
+    cache.put("d", "D")
+    assert cache.get("b") is None
+    assert [cache.get(k) for k in "acd"] == ["A", "C", "D"]
+    cache.put("c", "C2")                # ponovni put osvežava redosled
+    cache.put("e", "E")
+    assert cache.get("a") is None and cache.get("c") == "C2"
+    assert len(cache) == 3
+    assert cache.stats()["evictions"] == 2
+
+
+def test_ttl_expires_lazily(clock):
+    cache = PlanCache(maxsize=10, ttl=60, clock=clock)
+    cache.put("a", 1)
+    clock.now = 30
+    cache.put("b", 2)
+    clock.now = 60
+    assert cache.get("a") == 1          # tačno na ttl još važi
+    clock.now = 61
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    # pristup ne produžava život; novi put da
+    clock.now = 91
+    assert cache.get("b") is None
+    cache.put("b", 3)
+    clock.now = 150
+    assert cache.get("b") == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (3, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(0.6)
+
+
+def test_get_or_create_calls_factory_once(clock):
+    cache = PlanCache(maxsize=2, ttl=10, clock=clock)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_create("k", factory) == 1
+    assert cache.get_or_create("k", factory) == 1
+    clock.now = 11
+    assert cache.get_or_create("k", factory) == 2
+    assert len(calls) == 2
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_plan_key_ignores_order_case_and_noise():
+    a = {"days": 7, "meals": 3, "effective_kcal": 2000.00001, "protein_pct": 0.3,
+         "carbs_pct": 0.4, "fat_pct": 0.3, "diet": "omnivore", "max_items": 3,
+         "exclude_tags": ["spicy", "quick"], "exclude_groups": [], "dislikes": "Tuna, jaja",
+         "lang": "EN"}
+    b = dict(a, exclude_tags=["quick", "spicy"], dislikes=" jaja,tuna ,", lang="SR",
+             engine="random", effective_kcal=2000)
+    assert normalize_prefs(a) == normalize_prefs(b)
+    assert plan_key(a, 1, "fp") == plan_key(b, 1, "fp")
+    assert plan_key(a, 1, "fp") != plan_key(a, 2, "fp")
+    assert plan_key(a, 1, "fp") != plan_key(a, 1, "other")
+    assert plan_key(a, 1) != plan_key(dict(a, days=6), 1)
+    assert default_seed(a, "fp") == default_seed(b, "fp")
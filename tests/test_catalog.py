@@ -0,0 +1,115 @@
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from mealplan import (DIET_RULES, FilterIndex, FoodTable, MappedFoodTable, catalog_path,
+                      compile_catalog, fold_names, is_fresh, load_foods, load_table)
+from conftest import FOODS_PATH
+
+# imena van ASCII, prazna polja, nepoznat unit i dodatni ključevi
+ODD_FOODS = [
+    {"name": "Ćevapi", "group": "meat", "macros": {"kcal": 250, "p": 17, "c": 1, "f": 20},
+     "portion": 150, "unit": "g", "tags": ["grill", "srpsko"], "slots": ["lunch", "dinner"],
+     "origin": {"country": "RS"}, "note": "ručak"},
+    {"name": "Kajmak", "group": "dairy", "kcal": 300, "protein": 4, "carbs": 2, "fat": 30},
+    {"name": "Voda", "group": "drinks", "macros": {"kcal": 0}, "tags": [], "slots": []},
+    {"name": "Pita (whole wheat)", "group": "grains",
+     "macros": {"kcal": 170, "p": 6, "c": 35, "f": 1.5, "fiber": 5}, "portion": 64.5,
+     "unit": "piece", "slots": ["breakfast"]},
+]
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+@pytest.fixture(params=["foods", "odd"])
+def source(request, tmp_path):
+    path = tmp_path / "foods.json"
+    if request.param == "foods":
+        path.write_bytes(_read(FOODS_PATH))
+    else:
+        path.write_text(json.dumps(ODD_FOODS, ensure_ascii=False), encoding="utf-8")
+    return str(path)
+
+
+def test_round_trip_matches_the_json_path(source):
+    foods = load_foods(source)
+    table = FoodTable(foods)
+    mapped = MappedFoodTable(compile_catalog(source))
+    assert len(mapped) == len(table)
+    assert list(mapped.foods) == foods
+    assert mapped.foods[0] is mapped.foods[0]
+    assert mapped.names == table.names and mapped.name_index == table.name_index
+    assert mapped.fingerprint == table.fingerprint
+    for attr in ("macros", "portion", "group", "tag_ptr", "tag_idx", "slot_ptr", "slot_idx"):
+        np.testing.assert_array_equal(getattr(mapped, attr), getattr(table, attr))
+    for attr in ("group_names", "tag_names", "slot_names"):
+        assert tuple(getattr(mapped, attr)) == tuple(getattr(table, attr))
+    text, starts = mapped.folded_names()
+    expected = fold_names(table.names)
+    assert text == expected[0]
+    np.testing.assert_array_equal(starts, expected[1])
+
+    a, b = FilterIndex(table), FilterIndex(mapped)
+    for attr in ("tag_bits", "group_bits", "slot_bits"):
+        np.testing.assert_array_equal(getattr(b, attr), getattr(a, attr))
+    for diet in ("omnivore", *DIET_RULES):
+        np.testing.assert_array_equal(b.mask(diet=diet), a.mask(diet=diet))
+    for dislikes in ("jaja", "cheese, tuna", "ćevapi"):
+        np.testing.assert_array_equal(b.dislikes.rows(dislikes), a.dislikes.rows(dislikes))
+
+
+def test_mapped_table_pickles_by_path(source):
+    mapped = MappedFoodTable(compile_catalog(source))
+    again = pickle.loads(pickle.dumps(mapped))
+    assert again.path == mapped.path and list(again.foods) == list(mapped.foods)
+
+
+def test_staleness(source):
+    compiled = compile_catalog(source)
+    assert compiled == catalog_path(source) and is_fresh(compiled, source)
+    assert isinstance(load_table(source), MappedFoodTable)
+    assert isinstance(load_table(compiled), MappedFoodTable)
+
+    # samo nov mtime (kopija, touch): sadržaj isti, hash odlučuje
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 5_000_000_000))
+    assert is_fresh(compiled, source)
+
+    # ista dužina, drugi sadržaj
+    data = _read(source)
+    i = data.index(b'"kcal"')
+    edited = data[:i] + data[i:].replace(b"0", b"1", 1)
+    assert len(edited) == len(data) and edited != data
+    _write(source, edited)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+    assert not is_fresh(compiled, source)
+    stale = load_table(source)
+    assert type(stale) is FoodTable and list(stale.foods) == load_foods(source)
+
+    # druga dužina
+    _write(source, data + b"\n")
+    assert not is_fresh(compiled, source)
+    compile_catalog(source)
+    assert is_fresh(compiled, source)
+
+
+def test_missing_or_broken_compiled_file(source):
+    compiled = catalog_path(source)
+    assert not is_fresh(compiled, source)
+    assert type(load_table(source)) is FoodTable
+    _write(compiled, b"not a catalog")
+    assert not is_fresh(compiled, source)
+    assert type(load_table(source)) is FoodTable
+    with pytest.raises(ValueError):
+        MappedFoodTable(compiled)
@@ -0,0 +1,107 @@
+import re
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from mealplan import bars_svg, chart_cache_info, donut_svg, pie_svg, trend_svg
+
+NS = "{http://www.w3.org/2000/svg}"
+
+
+def _parse(svg):
+    root = ET.fromstring(svg)
+    assert root.tag == NS + "svg"
+    w, h = float(root.get("width")), float(root.get("height"))
+    assert root.get("viewBox") == f"0 0 {root.get('width')} {root.get('height')}"
+    # sve koordinate su konačni brojevi unutar platna
+    for el in root.iter():
+        for attr in ("x", "y", "cx", "cy", "x1", "y1", "x2", "y2", "width", "height"):
+            if el.get(attr) is not None and el is not root:
+                v = float(el.get(attr))
+                assert -1 <= v <= max(w, h) + 1, (el.tag, attr, v)
+        for num in re.findall(r"-?\d+(?:\.\d+)?", el.get("d", "") + el.get("points", "")):
+            assert abs(float(num)) <= max(w, h) + 1
+    return root
+
+
+def _all(root, tag):
+    return root.findall(f".//{NS}{tag}")
+
+
+def _texts(root):
+    return [t.text for t in _all(root, "text")]
+
+
+def test_donut_and_pie():
+    root = _parse(donut_svg(2150.7, 150, 200, 70, labels=("Proteini", "UH & šećer", "<Masti>"),
+                            center_label="Ukupno kcal"))
+    assert len(_all(root, "path")) == 3
+    texts = _texts(root)
+    assert {"UH & šećer", "<Masti>", "Ukupno kcal", "2150"} <= set(texts)
+    assert sum(int(t[:-1]) for t in texts if t.endswith("%")) in (99, 100, 101)
+    root = _parse(pie_svg([1, 2, 3], ["a", "b", "c"]))
+    assert len(_all(root, "path")) == 3 and "Ukupno kcal" not in _texts(root)
+
+
+@pytest.mark.parametrize("values", [(0, 0, 0), (-5, 0, 0), (0.01, 0.02, 0.0)])
+def test_empty_donut_is_a_grey_ring(values):
+    root = _parse(donut_svg(0, *values))
+    assert not _all(root, "path") and len(_all(root, "circle")) == 1
+    assert not [t for t in _texts(root) if t.endswith("%")] and "0" in _texts(root)
+
+
+def test_one_macro_is_a_full_circle():
+    root = _parse(donut_svg(400, 0, 100, 0))
+    assert not _all(root, "path") and len(_all(root, "circle")) == 1
+    assert "100%" in _texts(root)
+    root = _parse(pie_svg([0, 5, 0], ["a", "b", "c"]))
+    assert len(_all(root, "circle")) == 1
+
+
+@pytest.mark.parametrize("values", [[], [1800], [0, 0, 0], [2100, 1950.4, 2300, -10],
+                                    list(range(1500, 2500, 35))])
+def test_trend_and_bars(values):
+    for ref in (None, 2000, 0):
+        root = _parse(trend_svg(values, ref=ref, title="kcal & <days>", xlabel="Dan",
+                                ylabel="kcal"))
+        assert len(_all(root, "circle")) == len(values)
+        assert len(_all(root, "polyline")) == bool(values)
+    root = _parse(bars_svg(values, title="Calories per day", xlabel="Day", ylabel="kcal"))
+    rects = _all(root, "rect")
+    assert len(rects) == len(values) and all(float(r.get("height")) >= 0 for r in rects)
+    # oznake dana: najviše ~14, uvek počinje od 1
+    days = [t for t in _texts(root) if t.isdigit() and int(t) <= len(values)]
+    if values:
+        assert "1" in days
+
+
+def _delta(before, name):
+    info = chart_cache_info()[name]
+    return info["hits"] - before[name]["hits"], info["misses"] - before[name]["misses"]
+
+
+def test_cache_key_follows_the_inputs():
+    before = chart_cache_info()
+    a = donut_svg(2000.3, 150.01, 200, 70, size=221)
+    assert donut_svg(2000, 150.04, 200, 70, size=221.0) is a     # isti zaokruženi ulaz
+    assert _delta(before, "pie") == (1, 1)
+    changed = [donut_svg(2000, 151, 200, 70, size=221),
+               donut_svg(2100, 150, 200, 70, size=221),
+               donut_svg(2000, 150, 200, 70, labels=("P", "C", "F"), size=221),
+               donut_svg(2000, 150, 200, 70, center_label="kcal", size=221),
+               donut_svg(2000, 150, 200, 70, size=222)]
+    assert _delta(before, "pie") == (1, 6)
+    assert len({a, *changed}) == 6
+
+    before = chart_cache_info()
+    t = trend_svg([1901.2, 2003], ref=2000, width=481)
+    assert trend_svg([1901.4, 2003.0], ref=2000.2, width=481) is t
+    assert trend_svg([1901, 2003], ref=1999, width=481) != t
+    assert trend_svg([1901, 2003, 1], ref=2000, width=481) != t
+    assert _delta(before, "line") == (1, 3)
+
+    before = chart_cache_info()
+    b = bars_svg([10, 20], width=481)
+    assert bars_svg((10.2, 19.8), width=481) is b
+    assert bars_svg([10, 21], width=481) != b and bars_svg([10, 20], title="x", width=481) != b
+    assert _delta(before, "bars") == (1, 3)
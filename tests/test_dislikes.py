@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from mealplan import DislikeMatcher, FoodTable, dislike_tokens, expand_token, fold
+from reference import filter_pool
+
+
+@pytest.fixture(scope="module")
+def matcher(table):
+    return DislikeMatcher(table)
+
+
+def _names(matcher, dislikes):
+    return {matcher.table.names[r] for r in matcher.rows(dislikes)}
+
+
+@pytest.mark.parametrize("dislikes", ["tuna", "rice, oats", "Chicken,  banana ,", "x", "",
+                                      "cottage cheese & berries", "TOFU"])
+def test_english_input_matches_old_substring_filter(foods, matcher, dislikes):
+    prefs = {"diet": "omnivore", "exclude_tags": [], "exclude_groups": [], "dislikes": dislikes}
+    kept = {f["name"] for f in filter_pool(foods, prefs)}
+    assert _names(matcher, dislikes) == {f["name"] for f in foods} - kept
+
+
+@pytest.mark.parametrize("token", ["sirloin", "ribeye", "medium", "medjool dates", "cijena",
+                                   "sosa", "sirce", "pilates", "orahovica"])
+def test_english_and_other_words_are_not_translated(matcher, token):
+    # "med" se i dalje nalazi kao podniz ("steamed"), ali ne prevodi se u "honey"
+    assert expand_token(fold(token)) == ()
+    assert _names(matcher, token) == set()
+
+
+@pytest.mark.parametrize("dislikes,expected", [
+    ("jaja", {"Eggs (whole)", "Boiled egg"}),
+    ("Јаја", {"Eggs (whole)", "Boiled egg"}),
+    ("sira", {"Cottage cheese 1%", "Cottage cheese 5%", "Feta cheese", "Parmesan",
+              "Mozzarella (light)", "Light cream cheese", "Cottage cheese & berries"}),
+    ("ribom", {"Salmon, baked", "Tuna in water, drained", "Tuna salad (olive oil)",
+               "Baked cod", "Salmon with asparagus"}),
+    ("pavlaka", {"Light cream cheese"}),
+    ("piletinu", {"Chicken breast, cooked", "Chicken Caesar salad (light)",
+                  "Chicken wrap (whole-wheat)", "Grilled chicken thighs"}),
+    ("pileći", {"Chicken breast, cooked", "Chicken Caesar salad (light)",
+                "Chicken wrap (whole-wheat)", "Grilled chicken thighs"}),
+    ("ovsene", {"Oats (rolled)", "Oat smoothie (oats+banana+yogurt)"}),
+    ("med", {"Honey", "Broccoli (steamed)", "Green beans (steamed)"}),
+    ("sos", {"Marinara sauce"}),
+    ("jagode", {"Strawberries"}),
+    ("mleko", {"Almond milk (unsweetened)", "Protein shake (whey + milk)", "Skim milk"}),
+])
+def test_serbian_forms(matcher, dislikes, expected):
+    assert _names(matcher, dislikes) == expected
+
+
+def test_phrases_match_whole_not_word_by_word(matcher):
+    # "puter" sam je svaki "butter", ali fraza se ne prevodi reč po reč
+    assert expand_token("kikiriki puter") == ()
+    assert _names(matcher, "kikiriki puter") == set()
+    assert _names(matcher, "Peanut Butter") == {"Peanut butter", "Peanut butter toast",
+                                                "Rice cakes with peanut butter"}
+    assert _names(matcher, "puter") == {"Peanut butter", "Peanut butter toast",
+                                        "Croissant (butter)", "Mashed potatoes (no butter)",
+                                        "Apple with almond butter",
+                                        "Rice cakes with peanut butter"}
+    table = FoodTable([{"name": "Kisela pavlaka 20%"}, {"name": "Sour cream"},
+                       {"name": "Pavlaka za kuvanje"}])
+    assert DislikeMatcher(table).rows("kisela pavlaka").tolist() == [0]
+
+
+def test_word_of_a_name_is_not_translated():
+    table = FoodTable([{"name": "Med bowl"}, {"name": "Honey"}, {"name": "Sos verde"},
+                       {"name": "Marinara sauce"}])
+    matcher = DislikeMatcher(table)
+    assert matcher.rows("med").tolist() == [0]
+    assert matcher.rows("sos").tolist() == [2]
+    assert matcher.rows("medom").tolist() == [1]
+
+
+def test_rows_memoized_per_canonical_input(matcher):
+    a = matcher.rows("Jaja, Pavlaka")
+    assert matcher.rows(" pavlaka,jaja ,") is a
+    assert dislike_tokens("Jaja, Pavlaka") == ("jaja", "pavlaka")
+    assert not a.flags.writeable
+    mask = matcher.mask("jaja")
+    assert mask.dtype == bool and np.flatnonzero(mask).tolist() == matcher.rows("jaja").tolist()
+    assert matcher.mask("") is None
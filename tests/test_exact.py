@@ -0,0 +1,101 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from mealplan import (MEAL_SLOTS, PROTEIN_GROUPS, SLOT_DISTRIB, SLOT_KCAL_RANGE, FoodTable,
+                      exact_meal_rows, plan_targets, scale_macros, score_totals, target_vector)
+
+
+def _brute(table, rows, targets, max_items, kcal_range, require):
+    """Best score by enumeration, with the same fallback chain."""
+    values = table.macros[:, rows]
+    tvec = target_vector(targets)
+    n = len(rows)
+    # "obavezne" bez ijedne namirnice se ignorišu, kao u exact_meal_rows
+    if require is None or not np.any(require):
+        require = np.ones(n, dtype=bool)
+    attempts = [(kcal_range, require), (None, require), (None, np.ones(n, dtype=bool))]
+    for kr, req in attempts:
+        lo, hi = kr or (-np.inf, np.inf)
+        best = np.inf
+        for k in range(1, min(max_items, n) + 1):
+            combos = np.array(list(itertools.combinations(range(n), k)))
+            totals = values[:, combos].sum(axis=2)
+            ok = (totals[0] >= lo) & (totals[0] <= hi) & req[combos].any(axis=1)
+            if ok.any():
+                best = min(best, score_totals(totals, tvec)[ok].min())
+        if np.isfinite(best):
+            return best
+    return np.inf
+
+
+def _check(table, rows, targets, max_items, kcal_range=None, require=None):
+    meal, score, optimal = exact_meal_rows(table, rows, targets, max_items=max_items,
+                                           kcal_range=kcal_range, require=require)
+    assert optimal
+    assert 1 <= len(meal) <= max_items and len(set(meal)) == len(meal)
+    assert score == pytest.approx(score_totals(table.totals(rows[meal]), target_vector(targets)))
+    assert score == pytest.approx(_brute(table, rows, targets, max_items, kcal_range, require))
+    return meal
+
+
+@pytest.mark.parametrize("slot", MEAL_SLOTS)
+@pytest.mark.parametrize("max_items", [1, 2, 3])
+def test_catalog_slots_are_optimal(table, slot, max_items):
+    prefs = {"effective_kcal": 2200, "protein_pct": 0.3, "carbs_pct": 0.4, "fat_pct": 0.3,
+             "meals": 4}
+    targets = scale_macros(plan_targets(prefs), SLOT_DISTRIB[slot])
+    rows = np.array([i for i in range(len(table)) if slot in table.slots_of(i)])
+    require = None
+    if slot in ("lunch", "dinner"):
+        require = np.array([table.group_of(r) in PROTEIN_GROUPS for r in rows])
+    meal = _check(table, rows, targets, max_items, SLOT_KCAL_RANGE[slot], require)
+    if require is not None:
+        assert require[meal].any()
+
+
+def _random_table(rng, n):
+    foods = [{"name": f"f{i}", "macros": {"kcal": float(rng.uniform(20, 400)),
+                                          "p": float(rng.uniform(0, 30)),
+                                          "c": float(rng.uniform(0, 50)),
+                                          "f": float(rng.uniform(0, 20))}}
+             for i in range(n)]
+    return FoodTable(foods)
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_random_pools_are_optimal(seed):
+    rng = np.random.default_rng(seed)
+    table = _random_table(rng, 14)
+    rows = rng.permutation(14)[:12]
+    targets = {"kcal": rng.uniform(200, 900), "p": rng.uniform(10, 60),
+               "c": rng.uniform(10, 100), "f": rng.uniform(5, 35)}
+    lo = rng.uniform(100, 700)
+    kcal_range = (lo, lo + rng.uniform(50, 400)) if seed % 3 else None
+    require = rng.random(12) < 0.25 if seed % 2 else None
+    for max_items in (2, 3, 4):
+        _check(table, rows, targets, max_items, kcal_range, require)
+
+
+def test_impossible_constraints_fall_back(table):
+    rows = np.arange(20)
+    targets = {"kcal": 500, "p": 30, "c": 50, "f": 15}
+    # opseg koji nijedan obrok ne može da pogodi, i "obavezne" kojih nema
+    _check(table, rows, targets, 3, kcal_range=(1e6, 2e6))
+    _check(table, rows, targets, 3, require=np.zeros(20, dtype=bool))
+    assert exact_meal_rows(table, rows[:0], targets) == ([], float("inf"), True)
+
+
+def test_same_input_same_meal_under_budget(table):
+    rows = np.arange(len(table))
+    targets = {"kcal": 700, "p": 50, "c": 70, "f": 25}
+    full = exact_meal_rows(table, rows, targets, max_items=4)
+    assert full == exact_meal_rows(table, rows, targets, max_items=4)
+    assert full[2]
+    # premali budžet: najbolje nađeno do tada, uvek isto, i označeno kao nedovršeno
+    capped = [exact_meal_rows(table, rows, targets, max_items=4, max_cells=2000)
+              for _ in range(3)]
+    assert capped[0] == capped[1] == capped[2]
+    assert not capped[0][2] and capped[0][0]
+    assert capped[0][1] >= full[1]
@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from mealplan import CompactPlan, Planner, deferred_html
+
+PREFS = {"days": 3, "meals": 3, "max_items": 3, "diet": "omnivore", "exclude_tags": [],
+         "exclude_groups": [], "dislikes": "", "effective_kcal": 2000, "protein_pct": 0.3,
+         "carbs_pct": 0.4, "fat_pct": 0.3}
+
+
+@pytest.fixture(scope="module")
+def planner(table):
+    return Planner(table, workers=0)
+
+
+@pytest.fixture
+def plan(planner):
+    nested, macros = planner.generate_plan(planner.foods, 3, PREFS, seed=8)
+    return CompactPlan.from_nested(planner.table, nested), macros
+
+
+@pytest.mark.parametrize("lang", ["EN", "SR"])
+def test_streamed_html_is_to_html(planner, plan, tmp_path, lang):
+    plan, macros = plan
+    prefs = dict(PREFS, lang=lang)
+    html = planner.to_html(plan, macros, "Plan ✓", prefs)
+    chunks = list(planner.iter_html(plan, macros, "Plan ✓", prefs))
+    # zaglavlje, jedan deo po danu, kraj
+    assert len(chunks) == len(plan) + 2 and "".join(chunks) == html
+    assert ("Dan 3" if lang == "SR" else "Day 3") in chunks[3]
+
+    buf = io.StringIO()
+    assert planner.write_html(plan, macros, "Plan ✓", prefs, buf) == len(html)
+    assert buf.getvalue() == html
+    path = tmp_path / "plan.html"
+    with open(path, "w", encoding="utf-8") as f:
+        planner.write_html(plan, macros, "Plan ✓", prefs, f)
+    assert path.read_bytes() == html.encode("utf-8")
+
+
+def test_empty_plan(planner):
+    chunks = list(planner.iter_html([], {}, "Empty", PREFS))
+    assert len(chunks) == 3 and chunks[1] == "<p>No items yet.</p>"
+    assert "".join(chunks) == planner.to_html([], {}, "Empty", PREFS)
+
+
+def test_deferred_export_follows_the_plan_version(planner, plan):
+    plan, macros = plan
+    calls = []
+
+    def render(*args):
+        calls.append(plan.version)
+        return planner.to_html(*args)
+
+    cache = {}
+    build = deferred_html(render, plan, macros, "Plan", PREFS, cache)
+    assert calls == []      # ništa dok se ne klikne
+    data = build()
+    assert data == planner.to_html(plan, macros, "Plan", PREFS).encode("utf-8")
+    assert build() is data and calls == [0]
+    # drugo dugme (ista verzija plana) deli isti build
+    assert deferred_html(render, plan, macros, "Plan", PREFS, cache)() is data
+
+    row = next(r for r in range(len(planner.table)) if r not in plan.meal_rows(0, 0))
+    plan.set_item(0, 0, 0, row)
+    fresh = build()
+    assert calls == [0, 1] and fresh != data and planner.table.names[row].encode() in fresh
+    assert fresh == planner.to_html(plan, macros, "Plan", PREFS).encode("utf-8")
+    assert list(cache.values()) == [fresh]
+    # drugi jezik je drugi ključ
+    deferred_html(render, plan, macros, "Plan", dict(PREFS, lang="SR"), cache)()
+    assert calls == [0, 1, 1] and len(cache) == 1
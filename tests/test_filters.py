@@ -0,0 +1,122 @@
+import itertools
+import json
+import random
+
+import numpy as np
+import pytest
+
+from mealplan import (DIET_RULES, MEAL_SLOTS, QUICK_FILTERS, FilterIndex, FoodTable,
+                      foods_for_slot, load_foods, normalize_food)
+from mealplan.filters import _bitsets, _csr_bitsets
+from reference import filter_by_diet, filter_pool, quick_filter
+from reference import foods_for_slot as old_foods_for_slot
+
+DIETS = ["omnivore", *DIET_RULES, "unknown"]
+QUICK_ARGS = {"no_dairy": "no_dairy", "no_pork": "no_pork", "vegetarian": "veg"}
+
+
+def _rows(foods, picked):
+    ids = {id(f) for f in picked}
+    return np.array([id(f) in ids for f in foods])
+
+
+def _synthetic(n=400, seed=0):
+    """Catalog with > 64 tags and mixed-case groups (several bitset words)."""
+    rng = random.Random(seed)
+    tags = [f"t{i}" for i in range(150)] + ["vegan", "vegetarian", "gluten-free", "dairy",
+                                             "milk", "pork", "meat"]
+    groups = ["grains", "fruit", "Meat", "fish", "SEAFOOD", "dairy", "protein", "fat", "misc"]
+    return [{"name": f"food {i}", "group": rng.choice(groups),
+             "tags": rng.sample(tags, rng.randint(0, 6)),
+             "macros": {"kcal": 100, "p": 1, "c": 1, "f": 1}} for i in range(n)]
+
+
+@pytest.fixture(scope="module", params=["catalog", "synthetic"])
+def catalog(request, foods):
+    data = foods if request.param == "catalog" else _synthetic()
+    return data, FilterIndex(FoodTable(data))
+
+
+def test_csr_bitsets_match_per_row_loop(catalog):
+    _, index = catalog
+    t = index.table
+    codes = [t.tag_idx[t.tag_ptr[i]:t.tag_ptr[i + 1]].tolist() for i in range(len(t))]
+    np.testing.assert_array_equal(index.tag_bits, _bitsets(codes, len(t.tag_names)))
+
+
+@pytest.mark.parametrize("diet", DIETS)
+def test_diet_and_exclusions_match_list_filters(catalog, diet):
+    data, index = catalog
+    tags = sorted({t for f in data for t in f["tags"]})
+    groups = sorted({f["group"] for f in data})
+    rng = random.Random(diet)
+    for _ in range(20):
+        prefs = {"diet": diet, "exclude_tags": rng.sample(tags, rng.randint(0, 3)),
+                 "exclude_groups": rng.sample(groups, rng.randint(0, 2)), "dislikes": ""}
+        mask = index.mask(diet, prefs["exclude_tags"], prefs["exclude_groups"])
+        np.testing.assert_array_equal(mask, _rows(data, filter_pool(data, prefs)))
+    np.testing.assert_array_equal(index.mask(diet), _rows(data, filter_by_diet(data, diet)))
+
+
+@pytest.mark.parametrize("quick", [q for r in range(4) for q in itertools.combinations(QUICK_FILTERS, r)])
+def test_quick_filters_match_old_block(catalog, quick):
+    data, index = catalog
+    for diet in ("omnivore", "vegetarian"):
+        base = filter_by_diet(data, diet)
+        expected = quick_filter(base, **{QUICK_ARGS[q]: True for q in quick})
+        np.testing.assert_array_equal(index.mask(diet, quick=quick), _rows(data, expected))
+
+
+def test_masks_are_memoized_and_read_only(catalog):
+    _, index = catalog
+    a = index.mask("vegan", ["pork"], [], ["no_dairy"])
+    assert index.mask("vegan", ("pork",), (), ("no_dairy",)) is a
+    assert not a.flags.writeable
+    assert index.pool(a) is index.pool(a.copy())
+    assert list(index.pool(a).rows) == np.flatnonzero(a).tolist()
+
+
+def _norm_food(f):
+    """_norm_food of the old app.py."""
+    f = dict(f)
+    f["macros"] = f.get("macros") or {"kcal": f.get("kcal", 0), "p": f.get("p", 0),
+                                      "c": f.get("c", 0), "f": f.get("f", 0)}
+    f["tags"] = f.get("tags", []) or []
+    f["slots"] = f.get("slots") or MEAL_SLOTS
+    f["portion"] = f.get("portion", 100)
+    f["unit"] = f.get("unit", "g")
+    f["group"] = f.get("group", "other")
+    return f
+
+
+def test_load_foods_normalizes_like_norm_food(tmp_path):
+    raw = [{"name": "a", "kcal": 10, "p": 1, "c": 2, "f": 3},
+           {"name": "b", "group": "fruit", "macros": {"kcal": 5}, "tags": None,
+            "slots": ["snack"], "portion": 50, "unit": "pc"},
+           {"name": "c", "slots": []}]
+    path = tmp_path / "foods.json"
+    path.write_text(json.dumps(raw))
+    assert load_foods(str(path)) == [_norm_food(f) for f in raw]
+    assert [normalize_food(f) for f in raw] == [_norm_food(f) for f in raw]
+
+
+@pytest.mark.parametrize("slot", MEAL_SLOTS + ["brunch"])
+def test_slot_pools_match_foods_for_slot(catalog, slot):
+    data, index = catalog
+    foods = [_norm_food(f) for f in data]
+    for mask in (index.mask(), index.mask("vegan"), index.mask(quick=["vegetarian"])):
+        pool = index.pool(mask)
+        sub = pool.for_slot(slot)
+        old = old_foods_for_slot([foods[i] for i in pool.rows], slot)
+        assert [f["name"] for f in sub] == [f["name"] for f in old]
+        assert foods_for_slot(pool, slot) is sub is pool.for_slot(slot)
+        assert not sub.rows.flags.writeable
+
+
+def test_foods_without_slots_go_everywhere():
+    data = [{"name": "any", "macros": {}}, {"name": "bf", "macros": {}, "slots": ["breakfast"]}]
+    index = FilterIndex(FoodTable(data))
+    pool = index.pool(index.mask())
+    assert [f["name"] for f in pool.for_slot("breakfast")] == ["any", "bf"]
+    assert [f["name"] for f in pool.for_slot("dinner")] == ["any"]
+    assert [f["name"] for f in foods_for_slot(data, "dinner")] == ["any"]
@@ -0,0 +1,118 @@
+import json
+import os
+import time
+
+import pytest
+
+from mealplan import MEAL_SLOTS, CompactPlan, FoodTable, LiveCatalog
+from mealplan.parallel import get_executor, shutdown_executor
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _save(path, foods, bump=1):
+    # izmena uvek pomera mtime (brze izmene mogu imati isti mtime_ns)
+    st = os.stat(path) if os.path.exists(path) else None
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(foods, f)
+    if st is not None:
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + bump * 1_000_000_000))
+
+
+@pytest.fixture
+def source(tmp_path, foods):
+    path = str(tmp_path / "foods.json")
+    _save(path, foods[:40])
+    return path
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_touch_does_not_reload(source, clock):
+    live = LiveCatalog(source, interval=5, warm=False, clock=clock)
+    planner = live.planner
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000_000))
+    assert live.check() is planner and live._thread is None      # pre isteka intervala
+    clock.now = 5
+    assert live.check() is planner
+    live._thread.join()
+    assert live.planner is planner and live.reloads == 0 and live.error is None
+    assert live.version["mtime_ns"] == st.st_mtime_ns + 10_000_000_000
+    assert not live.changed()
+
+
+def test_edit_reloads_in_the_background(source, foods, clock):
+    live = LiveCatalog(source, interval=1, warm=False, clock=clock)
+    old = live.planner
+    swapped = []
+    live.on_swap.append(swapped.append)
+    _save(source, foods[:30] + foods[50:60])
+    assert live.changed()
+    live.reload(wait=True)
+    assert live.planner is not old and swapped == [live.planner] and live.reloads == 1
+    assert live.planner.table.names == tuple(f["name"] for f in foods[:30] + foods[50:60])
+    assert old.table.names == tuple(f["name"] for f in foods[:40])
+    assert not live.changed() and live.error is None
+
+
+def test_corrupt_file_keeps_the_old_planner(source, foods, clock):
+    live = LiveCatalog(source, interval=1, warm=False, clock=clock)
+    planner = live.planner
+    with open(source, "w") as f:
+        f.write('[{"name": "Half saved')
+    live.reload(wait=True)
+    assert live.planner is planner and live.reloads == 0
+    assert live.error.startswith("JSONDecodeError")
+    # ista pokvarena verzija se ne pokušava ponovo
+    assert not live.changed()
+    thread = live._thread
+    clock.now = 10
+    live.check()
+    assert live._thread is thread
+    # sledeća izmena se učitava i briše grešku
+    _save(source, foods[:20], bump=3)
+    assert live.changed()
+    live.reload(wait=True)
+    assert live.error is None and len(live.planner.table) == 20 and live.reloads == 1
+
+
+def test_plan_rebinds_to_the_new_catalog(source, foods, clock):
+    live = LiveCatalog(source, interval=1, warm=False, clock=clock)
+    table = live.planner.table
+    rows = [[0, 5, 39], [12], [7, 30], [1, 2]]
+    plan = CompactPlan.from_nested(table, [[{"slot": slot, "items": [table.foods[r] for r in meal]}
+                                            for slot, meal in zip(MEAL_SLOTS, rows)]], MEAL_SLOTS)
+    plan.set_qty(0, 0, 1, 2.0)
+    _save(source, foods[:30])
+    live.reload(wait=True)
+    moved, dropped = plan.rebind(live.planner.table)
+    assert dropped == [foods[39]["name"], foods[30]["name"]]
+    assert [[moved.table.names[r] for r in moved.meal_rows(0, m)] for m in range(4)] == \
+        [[foods[0]["name"], foods[5]["name"]], [foods[12]["name"]], [foods[7]["name"]],
+         [foods[1]["name"], foods[2]["name"]]]
+    assert moved.qty_of(0, 0, 1) == 2.0 and moved.slot(0, 2) == MEAL_SLOTS[2]
+
+
+def test_new_pool_does_not_cancel_the_old_ones_work(foods):
+    first = FoodTable(foods[:20])
+    try:
+        ex = get_executor(first, 1)
+        # jedan worker: prvi posao radi, ostali čekaju u redu
+        futures = [ex.submit(time.sleep, 0.2) for _ in range(3)]
+        new = get_executor(FoodTable(foods[:25]), 1)
+        assert new is not ex and get_executor(FoodTable(foods[:25]), 1) is new
+        assert [f.result(timeout=30) for f in futures] == [None] * 3
+        with pytest.raises(RuntimeError):
+            ex.submit(time.sleep, 0)
+    finally:
+        shutdown_executor()
@@ -0,0 +1,169 @@
+import numpy as np
+import pytest
+
+from mealplan import MEAL_SLOTS, CompactPlan, FoodTable
+
+
+def _nested(table, rng, days=3):
+    """Random nested plan; every other day has plain (slot-less) meals."""
+    plan = []
+    for d in range(days):
+        day = []
+        for slot in MEAL_SLOTS:
+            items = [table.foods[r] for r in rng.choice(len(table), size=int(rng.integers(1, 4)),
+                                                       replace=False)]
+            day.append({"slot": slot, "items": items} if d % 2 == 0 else items)
+        plan.append(day)
+    return plan
+
+
+class Model:
+    """The same plan as plain lists: [d][m] -> [rows, qty, slot, locked]."""
+
+    def __init__(self, table, nested):
+        self.meals = [[[list(table.rows_of(meal["items"] if isinstance(meal, dict) else meal)),
+                        None, meal.get("slot") if isinstance(meal, dict) else None, False]
+                       for meal in day] for day in nested]
+        for day in self.meals:
+            for meal in day:
+                meal[1] = [1.0] * len(meal[0])
+
+    def replace(self, old, rows):
+        # količine ostaju na pozicijama, nove pozicije kreću od 1
+        qty = [1.0] * len(rows)
+        for i in range(min(len(rows), len(old[1]))):
+            qty[i] = old[1][i]
+        return qty
+
+
+def _assert_same(plan, model, table):
+    assert len(plan) == len(model.meals)
+    for d, day in enumerate(model.meals):
+        assert plan.n_meals(d) == len(day)
+        view = plan[d]
+        for m, (rows, qty, slot, locked) in enumerate(day):
+            assert plan.meal_rows(d, m).tolist() == rows
+            assert plan.meal_qty(d, m).tolist() == pytest.approx(qty)
+            assert plan.slot(d, m) == slot and plan.locked(d, m) == locked
+            items = [table.foods[r] for r in rows]
+            assert plan.items(d, m) == items
+            assert view[m] == (items if slot is None else {"slot": slot, "items": items})
+    assert plan.meal_ptr[-1] == len(plan.rows) == len(plan.qty)
+    assert plan.day_ptr[-1] == len(plan.flags) == len(plan.meal_ptr) - 1
+
+
+def test_from_nested_round_trip(table):
+    nested = _nested(table, np.random.default_rng(0))
+    plan = CompactPlan.from_nested(table, nested, MEAL_SLOTS)
+    assert list(plan) == nested and plan[-1] == nested[-1]
+    _assert_same(plan, Model(table, nested), table)
+    n_items, n_meals = len(plan.rows), len(plan.flags)
+    assert plan.nbytes == 8 * n_items + 4 * (n_meals + 1) + 4 * (len(plan) + 1) + n_meals
+    with pytest.raises(IndexError):
+        plan[3]
+    with pytest.raises(IndexError):
+        plan.items(0, 4)
+    with pytest.raises(ValueError):
+        CompactPlan.from_nested(table, [[[dict(table.foods[0], name="Unknown")]]])
+    with pytest.raises(ValueError):
+        CompactPlan.from_nested(table, [[{"slot": "brunch", "items": [table.foods[0]]}]],
+                                MEAL_SLOTS)
+
+
+def test_edits_match_a_list_model(table):
+    rng = np.random.default_rng(1)
+    nested = _nested(table, rng)
+    plan = CompactPlan.from_nested(table, nested, MEAL_SLOTS)
+    model = Model(table, nested)
+    for step in range(200):
+        d = int(rng.integers(len(plan)))
+        m = int(rng.integers(plan.n_meals(d)))
+        meal = model.meals[d][m]
+        version = plan.version
+        kind = step % 6
+        if kind in (0, 1) and not meal[0]:
+            kind = 5    # prazan obrok (set_meal sa 0 stavki): samo lock
+        if kind == 0:
+            i = int(rng.integers(len(meal[0])))
+            q = float(rng.choice([0.5, 1.5, 2.0, 3.5]))
+            plan.set_qty(d, m, i, q)
+            meal[1][i] = q
+        elif kind == 1:
+            i = int(rng.integers(len(meal[0])))
+            row = int(rng.integers(len(table)))
+            plan.set_item(d, m, i, row)
+            meal[0][i] = row
+        elif kind == 2:
+            rows = [int(r) for r in rng.choice(len(table), size=int(rng.integers(0, 5)),
+                                               replace=False)]
+            slot = MEAL_SLOTS[int(rng.integers(4))] if rng.random() < 0.7 else None
+            plan.set_meal(d, m, rows, slot)
+            model.meals[d][m] = [rows, model.replace(meal, rows), slot, meal[3]]
+        elif kind == 3:
+            n = int(rng.integers(1, 6))
+            new = [([int(r) for r in rng.choice(len(table), size=int(rng.integers(1, 4)),
+                                                replace=False)], MEAL_SLOTS[j % 4])
+                   for j in range(n)]
+            plan.set_day(d, new)
+            old = model.meals[d]
+            model.meals[d] = [[rows, model.replace(old[j], rows) if j < len(old)
+                               else [1.0] * len(rows), slot, j < len(old) and old[j][3]]
+                              for j, (rows, slot) in enumerate(new)]
+        elif kind == 4:
+            plan.reset_qty(d)
+            for meal in model.meals[d]:
+                meal[1] = [1.0] * len(meal[0])
+        else:
+            locked = bool(rng.random() < 0.5)
+            plan.set_locked(d, m, locked)
+            meal[3] = locked
+        assert plan.version == version + (kind != 5)
+        _assert_same(plan, model, table)
+    plan.reset_qty()
+    assert (plan.qty == 1.0).all()
+
+
+def test_bad_positions_are_rejected(table):
+    plan = CompactPlan.from_nested(table, _nested(table, np.random.default_rng(2)), MEAL_SLOTS)
+    n = len(plan.meal_rows(0, 0))
+    for edit in (lambda: plan.set_qty(0, 0, n, 2.0), lambda: plan.set_item(0, 0, n, 0),
+                 lambda: plan.set_meal(0, 0, [1], "brunch")):
+        with pytest.raises((IndexError, ValueError)):
+            edit()
+    assert plan.version == 0
+
+
+def test_copy_is_independent(table):
+    plan = CompactPlan.from_nested(table, _nested(table, np.random.default_rng(3)), MEAL_SLOTS)
+    plan.set_qty(0, 0, 0, 2.0)
+    plan.set_locked(1, 2)
+    dup = plan.copy()
+    assert dup.uid != plan.uid and dup.version == 0
+    assert list(dup) == list(plan) and dup.locked(1, 2) and dup.qty_of(0, 0, 0) == 2.0
+    dup.set_meal(0, 0, [5, 6], "lunch")
+    dup.set_locked(1, 2, False)
+    assert plan.meal_rows(0, 0).tolist() != [5, 6] and plan.locked(1, 2)
+
+
+def test_rebind_drops_missing_foods(table):
+    nested = _nested(table, np.random.default_rng(4))
+    plan = CompactPlan.from_nested(table, nested, MEAL_SLOTS)
+    plan.set_qty(0, 1, 0, 2.5)
+    plan.set_locked(2, 3)
+    assert plan.rebind(table) == (plan, [])
+    gone = {table.names[r] for r in plan.meal_rows(0, 1)[1:]} | {table.names[plan.rows[-1]]}
+    # novi katalog: obrnut redosled, bez nekih namirnica
+    smaller = FoodTable([f for f in reversed(table.foods) if f["name"] not in gone])
+    moved, dropped = plan.rebind(smaller)
+    assert sorted(dropped) == sorted(table.names[r] for r in plan.rows
+                                     if table.names[r] in gone)
+    assert moved.table is smaller and moved.uid != plan.uid
+    for d in range(len(plan)):
+        for m in range(plan.n_meals(d)):
+            kept = [(table.names[r], q) for r, q in zip(plan.meal_rows(d, m), plan.meal_qty(d, m))
+                    if table.names[r] not in gone]
+            assert [(smaller.names[r], q) for r, q in
+                    zip(moved.meal_rows(d, m), moved.meal_qty(d, m))] == kept
+            assert moved.slot(d, m) == plan.slot(d, m)
+            assert moved.locked(d, m) == plan.locked(d, m)
+    assert moved.qty_of(0, 1, 0) == 2.5
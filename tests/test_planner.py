@@ -0,0 +1,107 @@
+import math
+
+import pytest
+
+from mealplan import (MEAL_SLOTS, Planner, foods_for_slot, shutdown_executor, slot_targets,
+                      sub_seed)
+
+PREFS = {"days": 3, "meals": 4, "max_items": 3, "diet": "omnivore", "exclude_tags": [],
+         "exclude_groups": [], "dislikes": "", "effective_kcal": 2100, "protein_pct": 0.3,
+         "carbs_pct": 0.4, "fat_pct": 0.3}
+
+
+def _names(plan):
+    return [[[it["name"] for it in meal] for meal in day] for day in plan]
+
+
+@pytest.fixture(scope="module")
+def planner(table):
+    return Planner(table, workers=0)
+
+
+@pytest.mark.parametrize("engine", ["random", "exact"])
+def test_same_seed_same_plan(planner, engine):
+    prefs = dict(PREFS, engine=engine)
+    plan, macros = planner.generate_plan(planner.foods, 3, prefs, seed=11)
+    again, _ = planner.generate_plan(planner.foods, 3, prefs, seed=11)
+    assert macros["seed"] == 11
+    assert _names(plan) == _names(again)
+    assert len(plan) == 3 and all(len(day) == 4 for day in plan)
+
+
+def test_new_seed_is_recorded(planner):
+    plan, macros = planner.generate_plan(planner.foods, 2, dict(PREFS, engine="random"))
+    again, _ = planner.generate_plan(planner.foods, 2, dict(PREFS, engine="random"),
+                                     seed=macros["seed"])
+    assert _names(plan) == _names(again)
+
+
+def test_exact_fallback_is_seeded(planner):
+    # namirnica van tabele: pool nema redove, pa exact dan ide na build_meal
+    extra = dict(planner.foods[0], name="Homemade stew")
+    foods = list(planner.foods) + [extra]
+    prefs = dict(PREFS, engine="exact")
+    plan, _ = planner.generate_plan(foods, 2, prefs, seed=5)
+    again, _ = planner.generate_plan(foods, 2, prefs, seed=5)
+    assert _names(plan) == _names(again)
+
+
+@pytest.mark.parametrize("engine", ["random", "exact"])
+def test_workers_do_not_change_the_plan(table, engine):
+    prefs = dict(PREFS, engine=engine)
+    serial, _ = Planner(table, workers=0).generate_plan(table.foods, 3, prefs, seed=21)
+    try:
+        pooled, _ = Planner(table, workers=2).generate_plan(table.foods, 3, prefs, seed=21)
+    finally:
+        shutdown_executor()
+    assert _names(serial) == _names(pooled)
+
+
+def _slot_requests(foods, days=2):
+    targets = slot_targets({"kcal": 2100.0, "p": 157.5, "c": 210.0, "f": 70.0})
+    return [((d, m), foods_for_slot(foods, slot), targets[slot], slot)
+            for d in range(days) for m, slot in enumerate(MEAL_SLOTS)]
+
+
+def test_slot_meals_with_an_outside_food_take_one_path(planner):
+    # jedan pool sa namirnicom van tabele: ceo zahtev ide starim putem,
+    # i dalje po ključu seed-ovan
+    requests = _slot_requests(planner.foods)
+    extra = dict(planner.foods[0], name="Homemade stew")
+    key, pool, target, slot = requests[1]
+    requests[1] = (key, list(pool) + [extra], target, slot)
+    seen = []
+    meals = planner.build_meals_for_slots(requests, seed=4,
+                                          progress=lambda done, total, best: seen.append(done))
+    assert meals == planner.build_meals_for_slots(requests, seed=4)
+    assert len(meals) == len(requests) and all(meals)
+    assert seen == list(range(1, len(requests) + 1))
+    # isti ključ, isti pool: isti obrok kao pojedinačni poziv starim putem
+    key, pool, target, slot = requests[3]
+    assert meals[3] == planner.build_meal_for_slot(pool, target, slot, rng=sub_seed(4, *key))
+
+
+def _check_progress(calls, total):
+    done = [c[0] for c in calls]
+    assert calls and done == sorted(done) and done[-1] == total
+    assert all(c[1] == total for c in calls)
+    assert math.isfinite(calls[-1][2])
+
+
+@pytest.mark.parametrize("engine", ["random", "exact"])
+@pytest.mark.parametrize("workers", [0, 2])
+def test_progress_is_reported(table, engine, workers):
+    prefs = dict(PREFS, engine=engine)
+    planner = Planner(table, workers=workers)
+    try:
+        calls = []
+        planner.generate_plan(table.foods, 3, prefs, seed=2,
+                              progress=lambda *a: calls.append(a))
+        _check_progress(calls, 3 * PREFS["meals"])
+        calls = []
+        requests = _slot_requests(planner.foods, days=3)
+        planner.build_meals_for_slots(requests, engine=engine, seed=2,
+                                      progress=lambda *a: calls.append(a))
+        _check_progress(calls, len(requests))
+    finally:
+        shutdown_executor()
@@ -0,0 +1,58 @@
+import cProfile
+import sys
+import tracemalloc
+
+import pytest
+
+from mealplan import StageProfiler
+
+
+def test_options():
+    prof = StageProfiler.from_option("1")
+    assert prof.enabled and not prof.cprofile and not prof.memory
+    prof = StageProfiler.from_option(" CPU, memory ")
+    assert prof.cprofile and prof.memory
+    for value in ("all", "cprofile", "memory"):
+        prof = StageProfiler.from_option(value, snapshots=False)
+        assert prof.enabled and not prof.cprofile and not prof.memory
+    assert not StageProfiler.from_option("").enabled
+
+
+def test_memory_snapshot_and_stop():
+    assert not tracemalloc.is_tracing()
+    prof = StageProfiler(memory=True).start()
+    data = [bytes(1000) for _ in range(100)]
+    prof.finish()
+    assert not tracemalloc.is_tracing()
+    assert prof.memory_top() and prof.raw()["memory_peak_kib"] > 90
+    assert not prof.memory_refused and len(data) == 100
+
+
+def test_someone_elses_tracing_is_left_alone():
+    tracemalloc.start()
+    try:
+        prof = StageProfiler(memory=True).start()
+        with prof.stage("work"):
+            pass
+        prof.finish()
+        assert tracemalloc.is_tracing()
+        assert prof.memory_refused and prof.memory_top() == []
+        assert prof.raw()["memory_peak_kib"] is None
+        assert [row[0] for row in prof.rows()] == ["work"]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.skipif(sys.version_info < (3, 12), reason="cProfile is per-thread before 3.12")
+def test_second_cprofile_falls_back_to_timings():
+    other = cProfile.Profile()
+    other.enable()
+    try:
+        prof = StageProfiler(cprofile=True).start()
+        with prof.stage("work"):
+            pass
+        prof.finish()
+        assert prof.cprofile_refused and prof.cprofile_text() == ""
+        assert [row[0] for row in prof.rows()] == ["work"]
+    finally:
+        other.disable()
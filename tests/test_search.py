@@ -0,0 +1,119 @@
+import random
+
+import numpy as np
+import pytest
+
+from mealplan import best_day_rows, best_meal_rows, meal_scores, sample_meals, target_vector
+from mealplan.search import _day_trials
+from reference import day_trial, score_meal
+
+TARGETS = {"kcal_meal": 600, "p_meal": 45, "c_meal": 60, "f_meal": 20}
+
+
+@pytest.mark.parametrize("n,max_items", [(1, 3), (2, 3), (40, 3), (40, 5), (5000, 4)])
+def test_sample_meals_shape(n, max_items):
+    idx, mask = sample_meals(np.random.default_rng(1), n, 500, max_items)
+    assert idx.shape == mask.shape == (500, max_items)
+    assert ((idx >= 0) & (idx < n)).all()
+    k = mask.sum(axis=1)
+    assert (k >= 1).all() and (k <= max_items).all()
+    # maska je prefiks; osnovne namirnice (bar k - 1, dodatak sme da se
+    # ponovi) su različite
+    assert (mask == (np.arange(max_items)[None, :] < k[:, None])).all()
+    base = np.maximum(1, k - 1)
+    assert all(len(set(row[:b].tolist())) == b for row, b in zip(idx, base))
+
+
+def _old_sizes(rng, n, n_samples, max_items):
+    """Meal sizes drawn by the scalar loop in build_meal."""
+    sizes = []
+    for _ in range(n_samples):
+        spread = max(2, int(rng.gauss(2.5, 0.6)))
+        k = max(1, min(max_items, spread, n))
+        if rng.random() < 0.35 and k < max_items:
+            k += 1
+        sizes.append(k)
+    return np.bincount(sizes, minlength=max_items + 1) / n_samples
+
+
+@pytest.mark.parametrize("max_items", [2, 3, 4, 5])
+def test_sample_meals_size_distribution(max_items):
+    _, mask = sample_meals(np.random.default_rng(2), 50, 20000, max_items)
+    new = np.bincount(mask.sum(axis=1), minlength=max_items + 1) / 20000
+    old = _old_sizes(random.Random(2), 50, 20000, max_items)
+    np.testing.assert_allclose(new, old, atol=0.02)
+
+
+def test_meal_scores_match_score_meal(foods, table):
+    rows = np.arange(len(foods))[::2]
+    idx, mask = sample_meals(np.random.default_rng(3), len(rows), 200, 4)
+    scores = meal_scores(table, rows, idx, mask, TARGETS)
+    for s, (ix, m) in enumerate(zip(idx, mask)):
+        meal = [foods[rows[j]] for j in ix[m]]
+        assert scores[s] == pytest.approx(score_meal(meal, TARGETS))
+
+
+def test_best_meal_rows_is_argmin_of_its_samples(foods, table):
+    rows = np.arange(len(foods))
+    for seed in range(10):
+        meal = best_meal_rows(table, rows, TARGETS, max_items=3, rng=seed)
+        idx, mask = sample_meals(np.random.default_rng(seed), len(rows), 200, 3)
+        old = [score_meal([foods[rows[j]] for j in ix[m]], TARGETS) for ix, m in zip(idx, mask)]
+        best = int(np.argmin(old))
+        assert meal == idx[best][mask[best]].tolist()
+
+
+def test_best_meal_rows_empty_pool(table):
+    assert best_meal_rows(table, np.array([], dtype=np.intp), TARGETS) == []
+
+
+def _day_score(foods, rows, day, targets):
+    return sum(score_meal([foods[rows[j]] for j in meal], targets) for meal in day)
+
+
+@pytest.mark.parametrize("meals,max_items", [(3, 3), (4, 3), (6, 4)])
+def test_best_day_rows_is_argmin_of_its_trials(foods, table, meals, max_items):
+    rows = np.arange(len(foods))
+    day = best_day_rows(table, rows, TARGETS, meals=meals, max_items=max_items, rng=5)
+    assert len(day) == meals
+    assert all(1 <= len(meal) <= max_items for meal in day)
+    assert day == best_day_rows(table, rows, TARGETS, meals=meals, max_items=max_items, rng=5)
+
+    # iste probe ponovo (ceo broj proba staje u jedan komad)
+    scores, picks = _day_trials(table, rows, np.arange(len(rows)), target_vector(TARGETS),
+                                400, meals, max_items, np.random.default_rng(5))
+    t = int(np.argmin(scores))
+    assert day == [idx[t][mask[t]].tolist() for idx, mask in picks]
+    assert scores[t] == pytest.approx(_day_score(foods, rows, day, TARGETS))
+    assert scores.min() == pytest.approx(scores[t])
+
+
+def _repeats(day):
+    """Foods per meal that already appeared earlier that day."""
+    seen, out = set(), 0
+    for meal in day:
+        out += len(set(meal) & seen)
+        seen |= set(meal)
+    return out
+
+
+def test_best_day_rows_reuse_rule(foods, table):
+    # mali pool, pa je ponavljanje često: stopa mora da prati staru petlju
+    rows = np.arange(8)
+    _, picks = _day_trials(table, rows, np.arange(len(rows)), target_vector(TARGETS),
+                           4000, 4, 3, np.random.default_rng(9))
+    new = np.mean([_repeats([idx[t][mask[t]].tolist() for idx, mask in picks])
+                   for t in range(4000)])
+    random.seed(9)
+    pool = [foods[r] for r in rows]
+    old = np.mean([_repeats([[f["name"] for f in meal] for meal in day_trial(pool, TARGETS)[0]])
+                   for _ in range(4000)])
+    assert new == pytest.approx(old, rel=0.05)
+
+
+def test_best_day_rows_tiny_pool(table):
+    # manje namirnica nego obroka: kad nema kandidata, koriste se sve
+    rows = np.array([0, 1])
+    day = best_day_rows(table, rows, TARGETS, meals=5, max_items=3, rng=1)
+    assert len(day) == 5 and all(day)
+    assert best_day_rows(table, rows, TARGETS, meals=0) == []
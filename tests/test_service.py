@@ -0,0 +1,222 @@
+import asyncio
+import http.client
+import json
+import socket
+import threading
+
+import pytest
+
+from mealplan import LiveCatalog
+from mealplan.service import MAX_BODY, MAX_HEADERS, PlanService
+from test_live import FakeClock, _save
+
+PREFS = {"days": 1, "meals": 3}
+
+
+@pytest.fixture
+def source(tmp_path, foods):
+    path = str(tmp_path / "foods.json")
+    _save(path, foods)
+    return path
+
+
+@pytest.fixture
+def service(source):
+    # veliki interval: check() ne pokreće ponovno učitavanje sam od sebe
+    live = LiveCatalog(source, interval=3600, warm=False, clock=FakeClock())
+    service = PlanService(live, workers=0)
+    started = threading.Event()
+    state = {}
+
+    def ready(server):
+        state["port"] = server.sockets[0].getsockname()[1]
+        state["loop"] = asyncio.get_running_loop()
+        state["task"] = asyncio.current_task()
+        started.set()
+
+    def serve():
+        try:
+            asyncio.run(service.serve("127.0.0.1", 0, ready))
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    service.port = state["port"]
+    yield service
+    state["loop"].call_soon_threadsafe(state["task"].cancel)
+    thread.join(10)
+    service.close()
+
+
+def _connect(service):
+    return http.client.HTTPConnection("127.0.0.1", service.port, timeout=10)
+
+
+def _call(conn, method, path, payload=None, body=None, headers=None):
+    if payload is not None:
+        body = json.dumps(payload)
+    conn.request(method, path, body=body, headers=headers or {})
+    res = conn.getresponse()
+    return res.status, json.loads(res.read()), res.getheader("Connection")
+
+
+def _post(service, path, payload):
+    conn = _connect(service)
+    try:
+        return _call(conn, "POST", path, payload)[:2]
+    finally:
+        conn.close()
+
+
+def _raw(service, data):
+    """Send raw bytes; return the status, JSON body and head of the reply."""
+    with socket.create_connection(("127.0.0.1", service.port), timeout=10) as sock:
+        sock.sendall(data)
+        reply = b""
+        while chunk := sock.recv(65536):
+            reply += chunk
+    head, _, body = reply.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body), head.decode("latin-1")
+
+
+def test_routes(service, foods):
+    status, out = _post(service, "/health", {})
+    assert status == 200 and out["status"] == "ok" and out["foods"] == len(foods)
+    assert out["reloads"] == 0 and out["catalog_error"] is None and out["workers"] == 0
+
+    status, plan = _post(service, "/plan", {"prefs": PREFS, "seed": 3})
+    assert status == 200 and plan["seed"] == 3 and len(plan["plan"]) == 1
+    assert len(plan["plan"][0]) == 3 and len(plan["day_totals"]) == 1
+    assert set(plan["targets"]) == {"kcal", "p", "c", "f", "meals"}
+    assert _post(service, "/plan", {"prefs": PREFS, "seed": 3}) == (200, plan)
+
+    status, meal = _post(service, "/meal", {"prefs": PREFS, "slot": "lunch", "seed": 1})
+    assert status == 200 and meal["slot"] == "lunch" and meal["items"]
+    assert set(meal["totals"]) == {"kcal", "p", "c", "f"}
+
+    item = meal["items"][0]["name"]
+    status, swaps = _post(service, "/swaps", {"prefs": PREFS, "item": item, "slot": "lunch",
+                                              "topk": 3})
+    assert status == 200 and swaps["item"] == item and len(swaps["swaps"]) <= 3
+    assert item not in [f["name"] for f in swaps["swaps"]]
+
+    names = [it["name"] for it in meal["items"]]
+    day = [names, [{"name": names[0], "qty": 2}]]
+    status, shop = _post(service, "/shopping", {"plan": [day]})
+    assert status == 200
+    qty = {row["item"]: row["qty"] for row in shop["items"]}
+    assert qty[names[0]] == 3 and set(qty) == set(names)
+
+
+def test_json_errors(service):
+    conn = _connect(service)
+    try:
+        assert _call(conn, "GET", "/nope")[0] == 404
+        assert _call(conn, "GET", "/plan")[0] == 405
+        assert _call(conn, "POST", "/plan", body="{not json")[:2] == \
+            (400, {"error": "body is not valid JSON"})
+        assert _call(conn, "POST", "/plan", payload=[1, 2])[0] == 400
+        for path, payload in (("/plan", {}), ("/plan", {"prefs": {"days": 0}}),
+                              ("/meal", {"prefs": PREFS, "slot": "brunch"}),
+                              ("/swaps", {"prefs": PREFS, "item": "No such food"}),
+                              ("/shopping", {"plan": "oats"}),
+                              ("/shopping", {"plan": [[["No such food"]]]})):
+            status, out, keep = _call(conn, "POST", path, payload)
+            assert status == 400 and out["error"], (path, payload)
+            assert keep == "keep-alive"
+    finally:
+        conn.close()
+
+
+def test_header_errors(service):
+    assert _raw(service, b"NONSENSE\r\n\r\n")[0] == 400
+    status, _, head = _raw(service, b"POST /plan HTTP/1.1\r\nContent-Length: ten\r\n\r\n")
+    assert status == 400 and "Connection: close" in head
+    many = b"".join(b"X-H%d: 1\r\n" % i for i in range(MAX_HEADERS + 1))
+    assert _raw(service, b"GET /health HTTP/1.1\r\n" + many + b"\r\n")[0] == 431
+    # jedan red duži od limita čitača (tačno limit + 1 bajt, da sve stigne pre odgovora)
+    long = b"X-Long: " + b"a" * (MAX_BODY - 7)
+    assert _raw(service, b"GET /health HTTP/1.1\r\n" + long)[0] == 431
+    assert _raw(service, b"a" * (MAX_BODY + 1))[0] == 414
+
+
+def test_oversized_body_closes_the_connection(service):
+    # telo se ne čita: 413 odmah, pa zatvaranje veze
+    head = b"POST /plan HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % (MAX_BODY + 1)
+    status, out, head = _raw(service, head)
+    assert status == 413 and out == {"error": "Request Entity Too Large"}
+    assert "Connection: close" in head
+    # telo tačno do limita prolazi do JSON-a
+    body = b" " * (MAX_BODY - 2) + b"{}"
+    status, out = _raw(service, b"POST /plan HTTP/1.1\r\nConnection: close\r\n"
+                       b"Content-Length: %d\r\n\r\n" % len(body) + body)[:2]
+    assert status == 400 and out["error"].startswith("BadRequest")
+
+
+def test_keep_alive(service):
+    conn = _connect(service)
+    try:
+        assert _call(conn, "GET", "/health")[2] == "keep-alive"
+        sock = conn.sock
+        assert _call(conn, "POST", "/meal", {"prefs": PREFS, "slot": "snack", "seed": 2})[0] \
+            == 200
+        assert conn.sock is sock
+    finally:
+        conn.close()
+    # dva zahteva u jednom slanju; posle "Connection: close" server zatvara vezu
+    body = json.dumps({"prefs": PREFS, "slot": "snack", "seed": 2}).encode()
+    with socket.create_connection(("127.0.0.1", service.port), timeout=10) as sock:
+        sock.sendall(b"GET /health HTTP/1.1\r\n\r\n"
+                     b"POST /meal HTTP/1.1\r\nConnection: close\r\n"
+                     b"Content-Length: %d\r\n\r\n" % len(body) + body)
+        reply = b""
+        while chunk := sock.recv(65536):
+            reply += chunk
+    assert reply.count(b"HTTP/1.1 200 OK") == 2
+    assert b"Connection: keep-alive" in reply and reply.rstrip().endswith(b"}")
+    assert reply.index(b"Connection: keep-alive") < reply.index(b"Connection: close")
+
+
+def test_catalog_reload_mid_session(service, source, foods):
+    conn = _connect(service)
+    try:
+        gone = foods[-1]["name"]
+        payload = {"prefs": PREFS, "item": gone}
+        assert _call(conn, "POST", "/swaps", payload)[0] == 200
+        pool = service.pool
+        _save(source, foods[:-1])
+        service.live.reload(wait=True)
+        # isti thread pool (workers=0), nov planer; ista keep-alive veza
+        assert service.pool is pool and service.live.reloads == 1
+        status, out, _ = _call(conn, "GET", "/health")
+        assert out["foods"] == len(foods) - 1 and out["reloads"] == 1
+        status, out, _ = _call(conn, "POST", "/swaps", payload)
+        assert status == 400 and gone in out["error"]
+    finally:
+        conn.close()
+
+
+class _SwappedAway:
+    """A pool that was replaced right after dispatch read ``service.pool``."""
+
+    def __init__(self, service, new):
+        self.service, self.new = service, new
+
+    def submit(self, *args):
+        self.service.pool = self.new
+        raise RuntimeError("cannot schedule new futures after shutdown")
+
+
+def test_dispatch_retries_on_the_new_pool(service):
+    pool = service.pool
+    service.pool = _SwappedAway(service, pool)
+    status, out = _post(service, "/meal", {"prefs": PREFS, "slot": "dinner", "seed": 4})
+    assert status == 200 and out["slot"] == "dinner" and service.pool is pool
+
+
+def test_dead_pool_is_a_500(service):
+    service.pool.shutdown()
+    status, out = _post(service, "/meal", {"prefs": PREFS, "slot": "dinner"})
+    assert status == 500 and out["error"].startswith("RuntimeError")
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from mealplan import MEAL_SLOTS, CompactPlan, Planner, PlanShopping, ShoppingList
+from reference import shopping_table
+
+PREFS = {"days": 4, "meals": 4, "max_items": 3, "diet": "omnivore", "exclude_tags": [],
+         "exclude_groups": [], "dislikes": "", "effective_kcal": 2100, "protein_pct": 0.3,
+         "carbs_pct": 0.4, "fat_pct": 0.3, "engine": "random"}
+
+
+def _plan(table, seed):
+    nested, _ = Planner(table, workers=0).generate_plan(table.foods, 4, PREFS, seed=seed)
+    return CompactPlan.from_nested(table, nested, MEAL_SLOTS)
+
+
+@pytest.fixture
+def plan(table):
+    return _plan(table, 3)
+
+
+def _assert_matches(shop, plan):
+    assert shop.entries() == shopping_table(plan, plan.qty_of)
+    fresh = PlanShopping(plan)
+    np.testing.assert_allclose(shop.qty, fresh.qty, atol=1e-9)
+    np.testing.assert_allclose(shop.grams, fresh.grams, atol=1e-9)
+
+
+def test_entries_match_the_old_table(plan):
+    # x.x25 količine: zaokruživanje mora biti isto kao u pandas-u (0.925 -> 0.92)
+    for d, m, i, q in ((0, 0, 0, 0.925), (1, 2, 0, 2.675), (2, 1, 1, 1.125)):
+        plan.set_qty(d, m, i, q)
+    _assert_matches(PlanShopping(plan), plan)
+    assert PlanShopping(plan).to_csv().splitlines()[0] == "Item,Qty,Grams,Kg"
+
+
+def test_deltas_follow_every_edit(plan, table):
+    rng = np.random.default_rng(1)
+    shop = PlanShopping(plan)
+    for step in range(120):
+        d = int(rng.integers(len(plan)))
+        m = int(rng.integers(plan.n_meals(d)))
+        kind = step % 5
+        if kind in (0, 1):
+            i = int(rng.integers(len(plan.meal_rows(d, m))))
+            plan.set_qty(d, m, i, float(rng.choice([0.5, 1.0, 1.5, 2.0, 3.5])))
+            shop.set_qty(d, m, i, plan.qty_of(d, m, i))
+        elif kind == 2:
+            i = int(rng.integers(len(plan.meal_rows(d, m))))
+            plan.set_item(d, m, i, int(rng.integers(len(table))))
+            shop.set_meal(d, m)
+        elif kind == 3:
+            rows = rng.choice(len(table), size=int(rng.integers(1, 5)), replace=False)
+            plan.set_meal(d, m, rows, plan.slot(d, m))
+            shop.set_meal(d, m)
+        elif step % 10 == 4:
+            meals = [(rng.choice(len(table), size=int(rng.integers(1, 4)), replace=False), slot)
+                     for slot in MEAL_SLOTS[:int(rng.integers(2, 5))]]
+            plan.set_day(d, meals)
+            shop.set_day(d)
+        else:
+            plan.reset_qty(d)
+            shop.set_day(d)
+        _assert_matches(shop, plan)
+
+
+def test_lists_of_several_plans_add_up(table):
+    plans = [_plan(table, seed) for seed in (1, 2, 3)]
+    plans[1].set_qty(0, 0, 0, 2.0)
+    merged = ShoppingList.of_plans(table, plans)
+    summed = ShoppingList(table)
+    for p in plans:
+        summed += PlanShopping(p)
+    np.testing.assert_allclose(merged.qty, summed.qty)
+    np.testing.assert_allclose(merged.grams, summed.grams)
+    nested = [day for p in plans for day in p]
+    qty = [p.qty_of(d, m, i) for p in plans for d in range(len(p))
+           for m in range(p.n_meals(d)) for i in range(len(p.meal_rows(d, m)))]
+    it = iter(qty)
+    assert merged.entries() == shopping_table(nested, lambda d, m, i: next(it))
+    with pytest.raises(ValueError):
+        merged += ShoppingList(type(table)(table.foods))
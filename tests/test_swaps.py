@@ -0,0 +1,61 @@
+import pytest
+
+from mealplan import DIET_RULES, MEAL_SLOTS, Planner, SwapIndex, foods_for_slot, swap_index
+from reference import filter_pool, suggest_swaps
+from reference import foods_for_slot as ref_foods_for_slot
+
+DIETS = ("omnivore", *DIET_RULES)
+
+
+def _prefs(diet):
+    return {"diet": diet, "exclude_tags": [], "exclude_groups": [], "dislikes": ""}
+
+
+def _flat(food):
+    # katalog drži makroe u "macros"; _macro_close gleda ključeve na samoj namirnici
+    m = food["macros"]
+    return dict(food, protein=m["p"], carbs=m["c"], fat=m["f"])
+
+
+def _names(foods):
+    return [f["name"] for f in foods]
+
+
+@pytest.fixture(scope="module")
+def planner(table):
+    return Planner(table, workers=0)
+
+
+@pytest.mark.parametrize("diet", DIETS)
+@pytest.mark.parametrize("slot", MEAL_SLOTS)
+def test_slot_pools_match_reference(planner, foods, diet, slot):
+    pool = foods_for_slot(planner.pool(_prefs(diet))[0], slot)
+    ref_pool = ref_foods_for_slot(filter_pool(foods, _prefs(diet)), slot)
+    assert _names(pool) == _names(ref_pool)
+    index = swap_index(pool)
+    assert swap_index(pool) is index
+    for item in list(pool) + [f for f in foods if f not in ref_pool]:
+        assert _names(planner.suggest_swaps(item, pool)) == \
+            _names(suggest_swaps(item, ref_pool)), item["name"]
+
+
+@pytest.mark.parametrize("diet", DIETS)
+@pytest.mark.parametrize("slot", MEAL_SLOTS)
+def test_macro_tolerance_matches_reference(foods, diet, slot):
+    flat = [_flat(f) for f in foods]
+    pool = ref_foods_for_slot(filter_pool(flat, _prefs(diet)), slot)
+    for topk, tol in ((5, 0.30), (3, 0.15), (50, 1.0)):
+        index = SwapIndex(pool, topk, tol)
+        for item in flat:
+            assert _names(index.suggest(item)) == \
+                _names(suggest_swaps(item, pool, topk=topk, tol=tol)), item["name"]
+
+
+def test_edited_item_is_scored_again(foods):
+    flat = [_flat(f) for f in foods]
+    index = SwapIndex(flat)
+    for item in flat[:20]:
+        edited = dict(item, protein=item["protein"] * 1.2 + 1, tags=["quick", "new_tag"])
+        assert _names(index.suggest(edited)) == _names(suggest_swaps(edited, flat))
+        renamed = dict(item, name=item["name"].upper() + " ")
+        assert _names(index.suggest(renamed)) == _names(suggest_swaps(renamed, flat))
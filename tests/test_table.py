@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from mealplan import FoodTable, item_macros, score_totals, target_vector
+from reference import _c_of, _f_of, _kcal_of, _p_of, score_meal
+
+# stari i novi format, aliasi, None i prazni makroi
+ODD_FOODS = [
+    {"name": "a", "group": "x", "macros": {"kcal": 100, "p": 10, "c": 5, "f": 2}},
+    {"name": "b", "group": "x", "kcal": 50, "protein": 4, "carbs": 6, "fat": 1},
+    {"name": "c", "kcal": "75", "p": 3.5, "c": None, "f": 0},
+    {"name": "d", "macros": {"kcal": None, "p": 1}, "kcal": 20, "fat": 7},
+    {"name": "e", "macros": "broken", "kcal": 30, "carbs": 2},
+    {"name": "f"},
+]
+
+
+def _old_macros(x):
+    return (_kcal_of(x), _p_of(x), _c_of(x), _f_of(x))
+
+
+@pytest.mark.parametrize("food", ODD_FOODS, ids=lambda f: f["name"])
+def test_item_macros_matches_old_accessors(food):
+    assert item_macros(food) == _old_macros(food)
+
+
+def test_columns_match_per_item_scan(foods, table):
+    old = np.array([_old_macros(f) for f in foods]).T
+    assert table.macros.shape == (4, len(foods))
+    np.testing.assert_array_equal(table.macros, old)
+    np.testing.assert_array_equal(table.kcal, old[0])
+    assert table.names == tuple(f["name"] for f in foods)
+    for i, f in enumerate(foods):
+        assert table.group_of(i) == f["group"]
+        assert table.tags_of(i) == tuple(f["tags"])
+        assert table.slots_of(i) == tuple(f["slots"])
+
+
+def test_odd_formats_table():
+    table = FoodTable(ODD_FOODS)
+    old = np.array([_old_macros(f) for f in ODD_FOODS]).T
+    np.testing.assert_array_equal(table.macros, old)
+    assert table.group_of(2) == "other"
+    assert table.tags_of(5) == () and table.slots_of(5) == ()
+
+
+def test_totals_and_scores_match_score_meal(foods, table):
+    rng = np.random.default_rng(7)
+    targets = {"kcal": 2000, "p": 150, "c": 200, "f": 60,
+               "kcal_meal": 600, "p_meal": 45, "c_meal": 60, "f_meal": 20}
+    tvec = target_vector(targets)
+    for _ in range(50):
+        rows = rng.choice(len(foods), size=rng.integers(1, 6), replace=False)
+        meal = [foods[i] for i in rows]
+        totals = table.totals(rows)
+        np.testing.assert_allclose(totals, np.sum([_old_macros(f) for f in meal], axis=0))
+        assert score_totals(totals, tvec) == pytest.approx(score_meal(meal, targets))
+        qty = rng.uniform(0.5, 2.0, size=len(rows))
+        np.testing.assert_allclose(
+            table.totals(rows, qty),
+            np.sum([np.multiply(_old_macros(f), q) for f, q in zip(meal, qty)], axis=0))
+
+
+def test_target_vector_falls_back_to_day_keys():
+    assert target_vector({"kcal": 1, "p": 2, "c": 3, "f": 4}).tolist() == [1, 2, 3, 4]
+    assert target_vector({"kcal": 1, "kcal_meal": 9, "p": 2}).tolist() == [9, 2, 0, 0]
+
+
+def test_items_totals_keeps_unknown_items(foods, table):
+    stranger = {"name": "not in catalog", "macros": {"kcal": 11, "p": 1, "c": 2, "f": 3}}
+    items = [foods[0], stranger, foods[5]]
+    qty = [2.0, 3.0, 1.0]
+    expected = sum(np.multiply(_old_macros(it), q) for it, q in zip(items, qty))
+    np.testing.assert_allclose(table.items_totals(items, qty), expected)
+    assert table.rows_of(items).tolist() == [0, -1, 5]
+
+
+def test_fingerprint_follows_content(foods, table):
+    assert FoodTable(foods).fingerprint == table.fingerprint
+    changed = [dict(f) for f in foods]
+    changed[3] = dict(changed[3], macros=dict(changed[3]["macros"], kcal=999))
+    assert FoodTable(changed).fingerprint != table.fingerprint
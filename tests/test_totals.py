@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from mealplan import MEAL_SLOTS, CompactPlan, Planner, PlanTotals
+from reference import macros_of_day
+
+PREFS = {"days": 4, "meals": 4, "max_items": 3, "diet": "omnivore", "exclude_tags": [],
+         "exclude_groups": [], "dislikes": "", "effective_kcal": 2100, "protein_pct": 0.3,
+         "carbs_pct": 0.4, "fat_pct": 0.3, "engine": "random"}
+
+
+@pytest.fixture
+def plan(table):
+    nested, _ = Planner(table, workers=0).generate_plan(table.foods, 4, PREFS, seed=3)
+    return CompactPlan.from_nested(table, nested, MEAL_SLOTS)
+
+
+def _old_days(plan):
+    """Day totals the old way, from items carrying their quantity."""
+    return np.array([macros_of_day([[dict(it, qty=plan.qty_of(d, m, i))
+                                     for i, it in enumerate(plan.items(d, m))]
+                                    for m in range(plan.n_meals(d))])
+                     for d in range(len(plan))])
+
+
+def _assert_matches(totals, plan):
+    days = _old_days(plan)
+    np.testing.assert_allclose(totals.days, days, atol=1e-6)
+    np.testing.assert_allclose(totals.total, days.sum(axis=0), atol=1e-6)
+    fresh = PlanTotals(plan, qty=plan.qty_of)
+    for d in range(len(plan)):
+        np.testing.assert_allclose(totals.meals[d], fresh.meals[d], atol=1e-6)
+
+
+def test_fresh_totals_match_the_old_sums(plan):
+    plan.set_qty(0, 1, 0, 2.5)
+    _assert_matches(PlanTotals(plan, qty=plan.qty_of), plan)
+    default = PlanTotals(plan)     # bez količina: sve 1.0
+    plan.reset_qty()
+    np.testing.assert_allclose(default.days, _old_days(plan), atol=1e-6)
+
+
+def test_deltas_follow_every_edit(plan, table):
+    rng = np.random.default_rng(0)
+    totals = PlanTotals(plan, qty=plan.qty_of)
+    for step in range(120):
+        d = int(rng.integers(len(plan)))
+        m = int(rng.integers(plan.n_meals(d)))
+        kind = step % 5
+        if kind in (0, 1):
+            i = int(rng.integers(len(plan.meal_rows(d, m))))
+            plan.set_qty(d, m, i, float(rng.choice([0.5, 1.0, 1.5, 2.0, 3.5])))
+            totals.set_qty(d, m, i, plan.qty_of(d, m, i))
+        elif kind == 2:
+            i = int(rng.integers(len(plan.meal_rows(d, m))))
+            plan.set_item(d, m, i, int(rng.integers(len(table))))
+            totals.set_meal(d, m, plan.items(d, m))
+        elif kind == 3:
+            rows = rng.choice(len(table), size=int(rng.integers(1, 5)), replace=False)
+            plan.set_meal(d, m, rows, plan.slot(d, m))
+            totals.set_meal(d, m, plan.items(d, m))
+        elif step % 10 == 4:
+            meals = [(rng.choice(len(table), size=int(rng.integers(1, 4)), replace=False), slot)
+                     for slot in MEAL_SLOTS[:int(rng.integers(2, 5))]]
+            plan.set_day(d, meals)
+            totals.set_day(d, plan[d])
+        else:
+            plan.reset_qty(d)
+            totals.set_day(d, plan[d])
+        _assert_matches(totals, plan)